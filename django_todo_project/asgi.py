@@ -9,8 +9,28 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_todo_project.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+# Sets up Django, so it must run before anything from todo_app is imported
+django_application = get_asgi_application()
+
+from todo_app.voice_stream import websocket_router  # noqa: E402
+
+# Server processes join scheduler leader election: runserver's reloaded child,
+# or every worker when SCHEDULER_AUTOSTART is set. Management commands load
+# the app without this module, so they never run the jobs.
+if os.environ.get('RUN_MAIN') == 'true' or getattr(settings, 'SCHEDULER_AUTOSTART', False):
+    from todo_app.scheduler import start as start_scheduler
+    start_scheduler()
+
+
+async def application(scope, receive, send):
+    # Django serves HTTP; WebSockets such as the streaming
+    # voice endpoint go to the app's own ASGI handlers
+    if scope['type'] == 'websocket':
+        await websocket_router(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
 from pathlib import Path
+from urllib.parse import urlsplit
 import os
 import logging
 from dotenv import load_dotenv
@@ -51,18 +52,24 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',  # API tokens identifying task owners
     'todo_app.apps.TodoAppConfig',       # Use AppConfig to trigger scheduler
     'django_apscheduler', # For background tasks
     'corsheaders',  # Enable CORS for Next.js frontend
 ]
 
 MIDDLEWARE = [
+    'todo_app.middleware.RequestMetricsMiddleware',  # First, so latency covers the whole stack
+    'todo_app.middleware.ServerTimingMiddleware',
+    'todo_app.middleware.CompressionMiddleware',  # Inside the two above, so they see the compressed response
+    'todo_app.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Must be high in order
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'todo_app.middleware.ApiTokenMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +93,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'django_todo_project.wsgi.application'
+# HTTP plus the streaming voice WebSocket; serve with uvicorn (see README)
+ASGI_APPLICATION = 'django_todo_project.asgi.application'
 
 
 # Database
@@ -99,9 +108,45 @@ DATABASES = {
         'PASSWORD': 'postgres',  # Replace with your PostgreSQL password
         'HOST': '127.0.0.1',             # Or your DB host
         'PORT': '5432',                  # Or your DB port
+        # Ping reused connections before handing them out, and drop dead ones
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection pooling (psycopg_pool, Django >= 5.1). Every process keeps between
+# DB_POOL_MIN_SIZE and DB_POOL_MAX_SIZE connections per database, so keep
+# DB_POOL_MAX_SIZE * processes below the server's max_connections.
+# With DB_POOL_ENABLED=False (e.g. behind PgBouncer) connections persist for DB_CONN_MAX_AGE seconds instead.
+if os.environ.get('DB_POOL_ENABLED', 'True').lower() == 'true':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),  # seconds to wait for a free connection
+            'max_idle': 300,
+            'max_lifetime': 3600,
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
+# Streaming read replicas of the default database, as comma-separated host[:port] values.
+# Read-only requests are spread across them round-robin; see todo_app.db_router.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), start=1):
+    host, _, port = replica.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['todo_app.db_router.ReplicaRouter']
+# After a write, the client reads from the primary for this long (should outlast replication lag)
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -149,32 +194,52 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Port for the Prometheus metrics HTTP server
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '8080'))
+
 # APScheduler settings
 APSCHEDULER_DATETIME_FORMAT = "N j, Y, f:s a"  # Default format
 APSCHEDULER_RUN_NOW_TIMEOUT = 25  # Seconds
 
+# Logging profile. 'development' writes every record synchronously to the console.
+# 'production' writes from a background thread (todo_app.log_handlers.AsyncStreamHandler),
+# logs at INFO and keeps only a sample of the DEBUG-level SQL statements.
+LOG_PROFILE = os.environ.get('LOG_PROFILE', 'development').lower()
+PRODUCTION_LOGGING = LOG_PROFILE == 'production'
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO' if PRODUCTION_LOGGING else 'DEBUG').upper()
+LOG_SQL_SAMPLE_RATE = float(os.environ.get('LOG_SQL_SAMPLE_RATE', '0.01' if PRODUCTION_LOGGING else '1'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'sql_sample': {
+            '()': 'todo_app.log_handlers.SampleFilter',
+            'rate': LOG_SQL_SAMPLE_RATE,
+        },
+    },
     'formatters': {
+        # Both formatters mask API keys, passwords and tokens
         'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
+            '()': 'todo_app.log_handlers.RedactingFormatter',
+            'fmt': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
             'style': '{',
         },
         'simple': {
-            'format': '{levelname} {message}',
+            '()': 'todo_app.log_handlers.RedactingFormatter',
+            'fmt': '{levelname} {message}',
             'style': '{',
         },
     },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            'class': 'todo_app.log_handlers.AsyncStreamHandler' if PRODUCTION_LOGGING else 'logging.StreamHandler',
             'formatter': 'verbose', 
         },
     },
     'root': {
         'handlers': ['console'],
-        'level': 'DEBUG', 
+        'level': LOG_LEVEL, 
     },
     'loggers': {
         'django': { 
@@ -185,23 +250,106 @@ LOGGING = {
         'django.db.backends': { 
             'handlers': ['console'],
             'level': 'DEBUG', 
+            'filters': ['sql_sample'],
             'propagate': False,
         },
         'django_apscheduler': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': LOG_LEVEL,
             'propagate': False,
         },
         'todo_app': { 
             'handlers': ['console'],
-            'level': 'DEBUG', 
+            'level': LOG_LEVEL, 
             'propagate': False, 
         },
     },
 }
 
-# CORS settings for Next.js frontend
-CORS_ALLOW_ALL_ORIGINS = True
-
 # Frontend URL for redirecting root endpoint
-FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3002')
\ No newline at end of file
+FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3002')
+
+# CORS settings for Next.js frontend. Requests carry the session cookie, so
+# only the frontend's origin (plus any in CORS_EXTRA_ORIGINS) may read responses
+_frontend = urlsplit(FRONTEND_URL)
+CORS_ALLOWED_ORIGINS = [f'{_frontend.scheme}://{_frontend.netloc}'] + [
+    origin.strip() for origin in os.environ.get('CORS_EXTRA_ORIGINS', '').split(',') if origin.strip()
+]
+# The frontend sends cookies so the read-your-writes marker reaches the API
+CORS_ALLOW_CREDENTIALS = True
+
+# Archive success/failure tasks older than this out of the live Task table
+TASK_ARCHIVE_AFTER_DAYS = int(os.environ.get('TASK_ARCHIVE_AFTER_DAYS', '30'))
+TASK_ARCHIVE_BATCH_SIZE = int(os.environ.get('TASK_ARCHIVE_BATCH_SIZE', '1000'))
+
+# Near-duplicate detection on task creation (see todo_app/dedup.py). Jaccard similarity
+# of the title and description words; below about 0.5 LSH starts missing matches.
+DUPLICATE_SIMILARITY_THRESHOLD = float(os.environ.get('DUPLICATE_SIMILARITY_THRESHOLD', '0.6'))
+# 'flag' creates the task and lists its duplicates, 'merge' folds it into the closest one;
+# clients can choose per request with "on_duplicate"
+DUPLICATE_ACTION = os.environ.get('DUPLICATE_ACTION', 'flag')
+
+# Admission control for Gemini calls (see todo_app/admission.py). The limits are per
+# process: set GEMINI_RATE_PER_MINUTE to the API quota divided by the number of processes.
+# Calls not admitted within their priority's wait are shed to the local voice parser.
+GEMINI_RATE_PER_MINUTE = float(os.environ.get('GEMINI_RATE_PER_MINUTE', '60'))
+GEMINI_BURST = int(os.environ.get('GEMINI_BURST', '5'))
+GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', '4'))
+GEMINI_MAX_QUEUE = int(os.environ.get('GEMINI_MAX_QUEUE', '50'))
+GEMINI_MAX_WAIT_SECONDS = {
+    'interactive': float(os.environ.get('GEMINI_INTERACTIVE_MAX_WAIT_SECONDS', '2')),
+    'batch': float(os.environ.get('GEMINI_BATCH_MAX_WAIT_SECONDS', '10')),
+    'background': float(os.environ.get('GEMINI_BACKGROUND_MAX_WAIT_SECONDS', '30')),
+}
+
+# Streaming voice WebSocket (/ws/voice, served by the ASGI app): Gemini is called
+# speculatively once the partial transcript has been unchanged this long, at most
+# VOICE_STREAM_MAX_SPECULATIVE_CALLS times per utterance
+VOICE_STREAM_STABLE_MS = int(os.environ.get('VOICE_STREAM_STABLE_MS', '600'))
+VOICE_STREAM_MAX_SPECULATIVE_CALLS = int(os.environ.get('VOICE_STREAM_MAX_SPECULATIVE_CALLS', '3'))
+
+# Default working window for /api/plan (clients can pass hours, start and tz)
+PLAN_HOURS_PER_DAY = float(os.environ.get('PLAN_HOURS_PER_DAY', '8'))
+PLAN_DAY_START_HOUR = float(os.environ.get('PLAN_DAY_START_HOUR', '9'))
+# Owners whose plan state each process keeps for incremental recomputation
+PLAN_CACHE_OWNERS = int(os.environ.get('PLAN_CACHE_OWNERS', '256'))
+
+# Recurring tasks: occurrences due within this many days exist as Task rows,
+# created by the scheduler; later ones are computed from the rule on read
+RECURRENCE_WINDOW_DAYS = int(os.environ.get('RECURRENCE_WINDOW_DAYS', '7'))
+
+# Reminders before task deadlines (see todo_app/reminders.py). Tasks created without a
+# `reminders` list get these offsets, in minutes before the deadline.
+REMINDER_DEFAULT_OFFSETS = [
+    int(minutes) for minutes in os.environ.get('REMINDER_DEFAULT_OFFSETS', '60').split(',') if minutes.strip()
+]
+# Dotted paths of ReminderSink classes; every due batch goes to each of them
+REMINDER_SINKS = os.environ.get('REMINDER_SINKS', 'todo_app.reminders.LogSink').split(',')
+REMINDER_FILE = os.environ.get('REMINDER_FILE', os.path.join(BASE_DIR, 'reminders.jsonl'))  # for FileSink
+REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', '500'))
+
+# Memory-mapped columnar store of finished tasks used by the analytics endpoint
+ANALYTICS_STORE_DIR = os.environ.get('ANALYTICS_STORE_DIR', os.path.join(BASE_DIR, 'analytics_store'))
+
+# Scheduler leader election: only one process (across workers and nodes) runs the jobs.
+# Set SCHEDULER_AUTOSTART=true for servers without RUN_MAIN, such as gunicorn or uvicorn
+# workers; it is read by wsgi.py and asgi.py, so management commands ignore it.
+SCHEDULER_AUTOSTART = os.environ.get('SCHEDULER_AUTOSTART', 'False').lower() == 'true'
+SCHEDULER_LEADER_BACKEND = os.environ.get('SCHEDULER_LEADER_BACKEND', 'auto')  # 'auto', 'postgres' or 'file'
+SCHEDULER_LEADER_RETRY_SECONDS = int(os.environ.get('SCHEDULER_LEADER_RETRY_SECONDS', '5'))
+
+# update_task_statuses_job is split into this many shards by task id; with more than one
+# worker the shards are scored in parallel in a process pool
+SCHEDULER_SHARD_COUNT = int(os.environ.get('SCHEDULER_SHARD_COUNT', '1'))
+SCHEDULER_SHARD_WORKERS = int(os.environ.get('SCHEDULER_SHARD_WORKERS', '1'))
+SCHEDULER_SHARD_LEASE_SECONDS = int(os.environ.get('SCHEDULER_SHARD_LEASE_SECONDS', '120'))
+
+# API responses at least this large are compressed (Brotli when the brotli package is installed, else gzip)
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+
+# Server-Timing header on API responses, and opt-in request profiling
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))  # e.g. 0.01 profiles 1% of requests
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')  # requests sending it as X-Profile-Token are always profiled
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '20'))  # keep only the slowest N profiles
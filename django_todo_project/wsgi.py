@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_todo_project.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Server processes join scheduler leader election: runserver's reloaded child,
+# or every worker when SCHEDULER_AUTOSTART is set. Management commands load
+# the app without this module, so they never run the jobs.
+if os.environ.get('RUN_MAIN') == 'true' or getattr(settings, 'SCHEDULER_AUTOSTART', False):
+    from todo_app.scheduler import start as start_scheduler
+    start_scheduler()
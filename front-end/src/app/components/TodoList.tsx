@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import axios from 'axios';
 import { 
   FaTasks, FaClock, FaCheckCircle, 
@@ -12,10 +12,18 @@ import {
 } from 'react-icons/fa';
 import TaskEditModal from './TaskEditModal';
 import { parseVoiceInput } from './voiceParser';
+import { COMPACT_ACCEPT, decodeCompact } from './compactTasks';
 
 // Define base API URL
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api';
 
+// Streaming voice endpoint: partial transcripts are sent while the user speaks
+const VOICE_STREAM_URL = process.env.NEXT_PUBLIC_VOICE_STREAM_URL
+  || API_BASE_URL.replace(/^http/, 'ws').replace(/\/api\/?$/, '/ws/voice');
+
+// Send cookies so reads after a write are served from the primary database
+axios.defaults.withCredentials = true;
+
 // Task interface based on the Django model
 interface Task {
   id: string;
@@ -44,6 +52,21 @@ interface Analytics {
   high_risk_tasks: Task[];
 }
 
+type TaskStatus = 'ongoing' | 'success' | 'failure';
+
+// Voice WebSocket of the current recording; awaitingText is the final transcript sent but not answered yet
+interface VoiceStream {
+  socket: WebSocket;
+  awaitingText: string | null;
+}
+
+// Opaque keyset cursors for the next page of each bucket (null when fully loaded)
+type NextCursors = Record<TaskStatus, string | null>;
+
+// True if `task` sorts after `last` in the backend's (deadline, id) page order
+const isAfter = (task: Task, last: Task): boolean =>
+  task.deadline > last.deadline || (task.deadline === last.deadline && task.id > last.id);
+
 export default function TodoList() {
   // State for tasks, forms, and UI
   const [tasks, setTasks] = useState<{
@@ -58,6 +81,18 @@ export default function TodoList() {
   
   const [activeTab, setActiveTab] = useState<'ongoing' | 'success' | 'failure'>('ongoing');
   const [loading, setLoading] = useState<boolean>(true);
+  const [nextCursors, setNextCursors] = useState<NextCursors>({
+    ongoing: null,
+    success: null,
+    failure: null
+  });
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
+  const loadMoreRef = useRef<HTMLDivElement | null>(null);
+  // Latest tasks/cursors for the polling callback, which is created only once
+  const tasksRef = useRef(tasks);
+  const nextCursorsRef = useRef(nextCursors);
+  tasksRef.current = tasks;
+  nextCursorsRef.current = nextCursors;
   const [formData, setFormData] = useState({
     title: '',
     description: '',
@@ -68,6 +103,7 @@ export default function TodoList() {
   const [isListening, setIsListening] = useState<boolean>(false);
   const [voiceStatus, setVoiceStatus] = useState<string>('');
   const [recognition, setRecognition] = useState<any>(null);
+  const voiceStreamRef = useRef<VoiceStream | null>(null);
   const [isEditModalOpen, setIsEditModalOpen] = useState<boolean>(false);
   const [currentEditTask, setCurrentEditTask] = useState<Task | null>(null);
 
@@ -84,46 +120,6 @@ export default function TodoList() {
   // Min date for the deadline input (current time)
   const minDate = formatDateForInput(new Date());
 
-  // Fetch analytics data
-  const fetchAnalytics = useCallback(async () => {
-    try {
-      const response = await axios.get(`${API_BASE_URL}/analytics`);
-      if (response.data) {
-        // Ensure we have a valid analytics structure with all required fields
-        const analyticsData = {
-          user_patterns: {
-            total_tasks: response.data.user_patterns?.total_tasks || 0,
-            success_rate: response.data.user_patterns?.success_rate || 0,
-            risk_profile: response.data.user_patterns?.risk_profile || 'Low'
-          },
-          total_high_risk: response.data.total_high_risk || 0,
-          high_risk_tasks: Array.isArray(response.data.high_risk_tasks) ? response.data.high_risk_tasks : []
-        };
-        setAnalytics(analyticsData);
-      } else {
-        throw new Error('Invalid or empty analytics data');
-      }
-    } catch (error) {
-      console.error('Error fetching analytics:', error);
-      // Create fallback analytics if API fails
-      const totalTasks = tasks.ongoing.length + tasks.success.length + tasks.failure.length;
-      const completedTasks = tasks.success.length;
-      const failedTasks = tasks.failure.length;
-      const successRate = (completedTasks + failedTasks) > 0 
-        ? Math.round((completedTasks / (completedTasks + failedTasks)) * 100) : 0;
-      
-      setAnalytics({
-        user_patterns: {
-          total_tasks: totalTasks,
-          success_rate: successRate,
-          risk_profile: 'Unavailable'
-        },
-        total_high_risk: 0,
-        high_risk_tasks: []
-      });
-    }
-  }, [tasks]);
-
   // Initialize voice recognition
   useEffect(() => {
     if (typeof window !== 'undefined' && ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window)) {
@@ -132,63 +128,126 @@ export default function TodoList() {
       const recognitionInstance = new SpeechRecognition();
       
       recognitionInstance.continuous = false;
-      recognitionInstance.interimResults = false;
+      // Interim results are streamed to the server while the user is still speaking
+      recognitionInstance.interimResults = true;
       recognitionInstance.lang = 'en-US';
-      
+
+      // Fill the form from a smart-voice result, whether it came over HTTP or the WebSocket
+      const applySmartResult = (task_data: any, duplicates: any[] = []) => {
+        // Get title and description from API response
+        const title = task_data.title || '';
+        const description = task_data.description || '';
+
+        setFormData({
+          title: title,
+          description: description,
+          deadline: task_data.deadline || formatDateForInput(new Date(Date.now() + 86400000)) // Default: tomorrow
+        });
+
+        const similar = duplicates.length ? ` (similar to existing task "${duplicates[0].title}")` : '';
+        setVoiceStatus(`Form filled with title "${title}"${description ? ` and description "${description}"` : ''}${similar}`);
+      };
+
+      const processWithHttp = async (voiceText: string) => {
+        try {
+          setVoiceStatus('Processing with Gemini AI...');
+          const response = await axios.post(`${API_BASE_URL}/smart-voice`, { voiceText });
+          if (response.data.success) {
+            applySmartResult(response.data.task_data, response.data.duplicates);
+          } else {
+            throw new Error(response.data.error || 'No task data received');
+          }
+        } catch (error: any) {
+          console.error('Smart voice processing error:', error);
+          setVoiceStatus(`Failed to process: ${error.message}`);
+        }
+      };
+
+      // One socket per recording; falls back to HTTP if it closes before the result arrives
+      const openVoiceStream = (): VoiceStream | null => {
+        if (typeof WebSocket === 'undefined') return null;
+        let socket: WebSocket;
+        try {
+          socket = new WebSocket(VOICE_STREAM_URL);
+        } catch (error) {
+          console.error('Voice stream unavailable:', error);
+          return null;
+        }
+        const stream: VoiceStream = { socket, awaitingText: null };
+        socket.onmessage = (event) => {
+          const message = JSON.parse(event.data);
+          if (message.type === 'preview') {
+            setVoiceStatus(`Hearing: "${message.title}"`);
+          } else if (message.type === 'result') {
+            stream.awaitingText = null;
+            if (message.success) {
+              applySmartResult(message.task_data, message.duplicates);
+            } else {
+              setVoiceStatus(`Failed to process: ${message.error}`);
+            }
+            socket.close();
+          }
+        };
+        socket.onclose = () => {
+          if (stream.awaitingText !== null) {
+            const voiceText = stream.awaitingText;
+            stream.awaitingText = null;
+            processWithHttp(voiceText);
+          }
+        };
+        return stream;
+      };
+
       recognitionInstance.onstart = () => {
         setIsListening(true);
         setVoiceStatus('Listening...');
+        voiceStreamRef.current = openVoiceStream();
         console.log('SpeechRecognition started');
       };
 
       
       recognitionInstance.onresult = async (event: any) => {
-        const voiceText = event.results[0][0].transcript;
+        const result = event.results[event.results.length - 1];
+        const voiceText = result[0].transcript;
+        const stream = voiceStreamRef.current;
+        const streaming = stream !== null && stream.socket.readyState === WebSocket.OPEN;
+
+        if (!result.isFinal) {
+          if (streaming) stream.socket.send(JSON.stringify({ type: 'partial', text: voiceText }));
+          return;
+        }
+
         console.log('SpeechRecognition result:', voiceText);
         setVoiceStatus('Processing voice command...');
         
-        try {
-          // First try client-side parsing with the voiceParser utility
-          if (voiceText.toLowerCase().includes('description') || voiceText.toLowerCase().includes('title')) {
-            const parsedResult = parseVoiceInput(voiceText);
-            
-            // If we have a title or description, use the parsed result
-            if (parsedResult.title || parsedResult.description) {
-              setFormData({
-                title: parsedResult.title,
-                description: parsedResult.description,
-                deadline: formatDateForInput(new Date(Date.now() + 86400000)) // Default: tomorrow
-              });
-              
-              setVoiceStatus(`Form filled with title "${parsedResult.title}" ${parsedResult.description ? `and description "${parsedResult.description}"` : ''}`);
-              return; // Exit early after successful parsing
-            }
-          }
+        // First try client-side parsing with the voiceParser utility
+        if (voiceText.toLowerCase().includes('description') || voiceText.toLowerCase().includes('title')) {
+          const parsedResult = parseVoiceInput(voiceText);
           
-          // If client-side parsing didn't work, use API
-          setVoiceStatus('Processing with Gemini AI...');
-          const response = await axios.post(`${API_BASE_URL}/smart-voice`, { voiceText });
-          if (response.data.success) {
-            const { task_data } = response.data;
-            
-            // Get title and description from API response
-            const title = task_data.title || '';
-            const description = task_data.description || '';
-            
+          // If we have a title or description, use the parsed result
+          if (parsedResult.title || parsedResult.description) {
             setFormData({
-              title: title, 
-              description: description,
-              deadline: task_data.deadline || formatDateForInput(new Date(Date.now() + 86400000)) // Default: tomorrow
+              title: parsedResult.title,
+              description: parsedResult.description,
+              deadline: formatDateForInput(new Date(Date.now() + 86400000)) // Default: tomorrow
             });
             
-            setVoiceStatus(`Form filled with title "${title}"${description ? ` and description "${description}"` : ''}`);
-          } else {
-            throw new Error(response.data.error || 'No task data received');
+            setVoiceStatus(`Form filled with title "${parsedResult.title}" ${parsedResult.description ? `and description "${parsedResult.description}"` : ''}`);
+            stream?.socket.close();
+            return; // Exit early after successful parsing
           }
-        } catch (error: any) {
-          console.error('Smart voice processing error:', error);
-          setVoiceStatus(`Failed to process: ${error.message}`);
         }
+
+        if (streaming) {
+          // The server has usually started Gemini on the partial transcript already
+          stream.awaitingText = voiceText;
+          stream.socket.send(JSON.stringify({ type: 'final', text: voiceText }));
+          return;
+        }
+
+        // If streaming isn't available, use the HTTP API
+        stream?.socket.close();
+        await processWithHttp(voiceText);
       };
       
       recognitionInstance.onerror = (event: any) => {
@@ -201,6 +260,11 @@ export default function TodoList() {
       recognitionInstance.onend = () => {
         setIsListening(false);
         console.log('SpeechRecognition ended');
+        // Nothing was recognized; otherwise the socket closes once its result arrives
+        const stream = voiceStreamRef.current;
+        if (stream !== null && stream.awaitingText === null) {
+          stream.socket.close();
+        }
         setTimeout(() => setVoiceStatus(''), 3000);
       };
       
@@ -222,18 +286,105 @@ export default function TodoList() {
     }
   };
 
-  // Fetch tasks from API
-  const fetchTasks = useCallback(async () => {
+  // Fetch the first page of every bucket and the analytics in one request.
+  // The endpoint sends an ETag with Cache-Control: no-cache, so the browser
+  // revalidates on every poll and unchanged data comes back as 304 Not Modified.
+  const fetchDashboard = useCallback(async () => {
     try {
-      const response = await axios.get(`${API_BASE_URL}/tasks`);
-      setTasks(response.data);
+      // Compact column-per-field task lists are a fraction of the plain JSON size
+      const response = await axios.get(`${API_BASE_URL}/dashboard`, { headers: { Accept: COMPACT_ACCEPT } });
+      const { next_cursors: freshCursors, analytics: freshAnalytics, ...freshTasks } = decodeCompact(response.data);
+      const current = tasksRef.current;
+      const merged = { ...current };
+      const mergedCursors = { ...nextCursorsRef.current };
+
+      (['ongoing', 'success', 'failure'] as TaskStatus[]).forEach(status => {
+        const fresh: Task[] = freshTasks[status] || [];
+        // Keep rows already loaded on scroll that lie beyond the refreshed first page
+        const tail = freshCursors[status] && fresh.length > 0
+          ? current[status].filter(task => isAfter(task, fresh[fresh.length - 1]))
+          : [];
+        merged[status] = [...fresh, ...tail];
+        if (tail.length === 0) {
+          mergedCursors[status] = freshCursors[status];
+        }
+      });
+
+      setTasks(merged);
+      setNextCursors(mergedCursors);
+      // Ensure we have a valid analytics structure with all required fields
+      setAnalytics({
+        user_patterns: {
+          total_tasks: freshAnalytics?.user_patterns?.total_tasks || 0,
+          success_rate: freshAnalytics?.user_patterns?.success_rate || 0,
+          risk_profile: freshAnalytics?.user_patterns?.risk_profile || 'Low'
+        },
+        total_high_risk: freshAnalytics?.total_high_risk || 0,
+        high_risk_tasks: Array.isArray(freshAnalytics?.high_risk_tasks) ? freshAnalytics.high_risk_tasks : []
+      });
       setLoading(false);
     } catch (error) {
-      console.error('Error fetching tasks:', error);
+      console.error('Error fetching dashboard:', error);
+      // Fallback analytics computed from the tasks already loaded
+      const current = tasksRef.current;
+      const totalTasks = current.ongoing.length + current.success.length + current.failure.length;
+      const completedTasks = current.success.length;
+      const failedTasks = current.failure.length;
+      const successRate = (completedTasks + failedTasks) > 0 
+        ? Math.round((completedTasks / (completedTasks + failedTasks)) * 100) : 0;
+      
+      setAnalytics({
+        user_patterns: {
+          total_tasks: totalTasks,
+          success_rate: successRate,
+          risk_profile: 'Unavailable'
+        },
+        total_high_risk: 0,
+        high_risk_tasks: []
+      });
       setLoading(false);
     }
   }, []);
 
+  // Fetch the next page of one bucket when the user scrolls to the end of it
+  const loadMoreTasks = useCallback(async (status: TaskStatus) => {
+    const cursor = nextCursors[status];
+    if (!cursor || loadingMore) return;
+
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API_BASE_URL}/tasks`, {
+        params: { status, cursor },
+        headers: { Accept: COMPACT_ACCEPT }
+      });
+      const data = decodeCompact(response.data);
+      setTasks(prev => {
+        const known = new Set(prev[status].map(task => task.id));
+        const page: Task[] = data.tasks.filter((task: Task) => !known.has(task.id));
+        return { ...prev, [status]: [...prev[status], ...page] };
+      });
+      setNextCursors(prev => ({ ...prev, [status]: data.next_cursor }));
+    } catch (error) {
+      console.error('Error loading more tasks:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [nextCursors, loadingMore]);
+
+  // Load the next page when the sentinel below the task grid scrolls into view
+  useEffect(() => {
+    const sentinel = loadMoreRef.current;
+    if (!sentinel || !nextCursors[activeTab]) return;
+
+    const observer = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting) {
+        loadMoreTasks(activeTab);
+      }
+    }, { rootMargin: '200px' });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [activeTab, nextCursors, loadMoreTasks]);
+
   // Create new task
   const createTask = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -246,7 +397,7 @@ export default function TodoList() {
         deadline
       });
       setFormData({ title: '', description: '', deadline: '' });
-      fetchTasks();
+      fetchDashboard();
     } catch (error) {
       console.error('Error creating task:', error);
     }
@@ -256,7 +407,7 @@ export default function TodoList() {
   const completeTask = async (taskId: string) => {
     try {
       await axios.post(`${API_BASE_URL}/tasks/${taskId}/complete`);
-      fetchTasks();
+      fetchDashboard();
     } catch (error) {
       console.error('Error completing task:', error);
     }
@@ -268,7 +419,7 @@ export default function TodoList() {
     
     try {
       await axios.delete(`${API_BASE_URL}/tasks/${taskId}`);
-      fetchTasks();
+      fetchDashboard();
     } catch (error) {
       console.error('Error deleting task:', error);
     }
@@ -307,7 +458,7 @@ export default function TodoList() {
       });
       
       setIsEditModalOpen(false);
-      fetchTasks();
+      fetchDashboard();
     } catch (error) {
       console.error('Error updating task:', error);
       alert('Failed to update task');
@@ -318,20 +469,18 @@ export default function TodoList() {
   useEffect(() => {
     // Initial data fetch after component is mounted
     const initialFetch = setTimeout(() => {
-      fetchTasks();
-      fetchAnalytics();
+      fetchDashboard();
     }, 100); // Short delay to ensure client-side hydration is complete
     
     const interval = setInterval(() => {
-      fetchTasks();
-      fetchAnalytics();
+      fetchDashboard();
     }, 30000); // Refresh every 30 seconds
     
     return () => {
       clearTimeout(initialFetch);
       clearInterval(interval);
     };
-  }, [fetchTasks, fetchAnalytics]);
+  }, [fetchDashboard]);
 
   return (
     <div className="w-full max-w-4xl mx-auto my-12 bg-white rounded-3xl shadow-xl overflow-hidden transform transition-all hover:shadow-2xl">
@@ -574,7 +723,7 @@ export default function TodoList() {
                 ? 'bg-white/25 text-white shadow-sm' 
                 : 'bg-indigo-100 text-indigo-700'
             }`}>
-              {tasks.ongoing.length}
+              {tasks.ongoing.length}{nextCursors.ongoing ? '+' : ''}
             </span>
           </button>
           <button
@@ -594,7 +743,7 @@ export default function TodoList() {
                 ? 'bg-white/25 text-white shadow-sm' 
                 : 'bg-green-100 text-green-700'
             }`}>
-              {tasks.success.length}
+              {tasks.success.length}{nextCursors.success ? '+' : ''}
             </span>
           </button>
           <button
@@ -614,7 +763,7 @@ export default function TodoList() {
                 ? 'bg-white/25 text-white shadow-sm' 
                 : 'bg-red-100 text-red-700'
             }`}>
-              {tasks.failure.length}
+              {tasks.failure.length}{nextCursors.failure ? '+' : ''}
             </span>
           </button>
         </div>
@@ -797,6 +946,13 @@ export default function TodoList() {
             ))
           )}
         </div>
+
+        {/* Sentinel that triggers loading the next page of the active bucket */}
+        {!loading && nextCursors[activeTab] && (
+          <div ref={loadMoreRef} className="flex items-center justify-center py-6 text-indigo-600">
+            {loadingMore && <FaSpinner className="animate-spin text-2xl" />}
+          </div>
+        )}
       </div>
 
       {/* Task Edit Modal */}
@@ -0,0 +1,95 @@
+/**
+ * Decoder for the compact task format of /api/dashboard, /api/tasks and
+ * /api/analytics (todo_app/wire.py on the server).
+ *
+ * Task lists arrive as one array per column, with epoch-second timestamps and
+ * status and risk level as indexes into the lists in `compact`. Decoding
+ * restores the fields of the plain JSON format, including the derived
+ * time_remaining and completion_probability.
+ */
+
+// Sent as the Accept header; servers without the format answer in plain JSON
+export const COMPACT_ACCEPT = 'application/vnd.todo.compact+json, application/json;q=0.5';
+
+const COMPACT_VERSION = 1;
+
+interface CompactHeader {
+  version: number;
+  now: number;
+  status: string[];
+  risk_level: string[];
+}
+
+interface ColumnBlock {
+  count: number;
+  columns: Record<string, (string | number | null)[]>;
+}
+
+const isColumnBlock = (value: unknown): value is ColumnBlock =>
+  typeof value === 'object' && value !== null && 'columns' in value && 'count' in value;
+
+const toIso = (seconds: number | null) => (seconds === null ? null : new Date(seconds * 1000).toISOString());
+
+// Same wording as Task.get_time_remaining on the server
+function timeRemaining(deadline: number | null, now: number): string {
+  if (deadline === null) return 'N/A';
+  if (deadline <= now) return 'Expired';
+  const minutesLeft = Math.floor((deadline - now) / 60);
+  const days = Math.floor(minutesLeft / 1440);
+  const hours = Math.floor((minutesLeft % 1440) / 60);
+  const minutes = minutesLeft % 60;
+  if (days > 0) return `${days}d ${hours}h ${minutes}m`;
+  if (hours > 0) return `${hours}h ${minutes}m`;
+  return `${minutes}m`;
+}
+
+function decodeTasks(block: ColumnBlock, header: CompactHeader) {
+  const { columns } = block;
+  const tasks = [];
+  for (let i = 0; i < block.count; i++) {
+    const deadline = columns.deadline[i] as number | null;
+    const riskScore = columns.risk_score[i] as number | null;
+    tasks.push({
+      id: columns.id[i],
+      title: columns.title[i],
+      description: columns.description[i],
+      deadline: toIso(deadline),
+      status: header.status[columns.status[i] as number],
+      created_at: toIso(columns.created_at[i] as number | null),
+      updated_at: toIso(columns.updated_at[i] as number | null),
+      time_remaining: timeRemaining(deadline, header.now),
+      estimated_duration: columns.estimated_duration[i],
+      complexity_score: columns.complexity_score[i],
+      risk_score: riskScore,
+      risk_level: header.risk_level[columns.risk_level[i] as number],
+      completion_probability: riskScore === null ? null : Math.round((1 - riskScore) * 1000) / 10,
+      series_id: columns.series_id[i],
+    });
+  }
+  return tasks;
+}
+
+function decodeValue(value: unknown, header: CompactHeader): unknown {
+  if (isColumnBlock(value)) return decodeTasks(value, header);
+  if (Array.isArray(value)) return value.map(item => decodeValue(item, header));
+  if (typeof value === 'object' && value !== null) {
+    return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, decodeValue(item, header)]));
+  }
+  return value;
+}
+
+/**
+ * Turn a response body into the plain JSON shape: compact bodies are decoded,
+ * plain JSON bodies are returned unchanged.
+ */
+// eslint-disable-next-line @typescript-eslint/no-explicit-any
+export function decodeCompact(data: any) {
+  const header: CompactHeader | undefined = data?.compact;
+  if (!header) return data;
+  if (header.version !== COMPACT_VERSION) {
+    throw new Error(`Unsupported compact format version ${header.version}`);
+  }
+  const rest = { ...data };
+  delete rest.compact;
+  return decodeValue(rest, header);
+}
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration, loaded automatically from the working directory.
+
+Enables prometheus_client multiprocess mode: every worker writes its metrics
+to memory-mapped files in PROMETHEUS_MULTIPROC_DIR, and the master runs the
+one exporter on METRICS_PORT that adds them up across workers, including
+the worker that holds scheduler leadership.
+"""
+import os
+import shutil
+import tempfile
+
+# Must be set before any worker imports prometheus_client
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'todo_app_prometheus')
+)
+
+
+def on_starting(server):
+    # Files left by a previous run would otherwise be added into the new totals
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def when_ready(server):
+    from todo_app.metrics import start_metrics_server
+    start_metrics_server(int(os.environ.get('METRICS_PORT', '8080')), aggregate=True)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges; its counters and histograms stay in the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,15 +1,75 @@
-from django.contrib import admin
-from .models import Task
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from .archive import archive_tasks, get_history_counts_by_owner, get_history_counts_by_series
+from .estimator import finish_tasks
+from .models import ArchivedTask, RecurringTask, Task
+from .pagination import EstimatedCountPaginator
+from .search import search_queryset
+from .sharding import rescore_tasks
+
+
+class RangeListFilter(admin.SimpleListFilter):
+    """
+    A fixed set of [low, high) ranges of `field`. Unlike a plain list_filter
+    on the field, the sidebar doesn't need a DISTINCT over the whole table.
+    """
+    field = None
+    ranges = ()  # (value, label, low, high); None leaves that end open
+
+    def lookups(self, request, model_admin):
+        return [(value, label) for value, label, _, _ in self.ranges]
+
+    def queryset(self, request, queryset):
+        for value, _, low, high in self.ranges:
+            if self.value() == value:
+                if low is not None:
+                    queryset = queryset.filter(**{f'{self.field}__gte': low})
+                if high is not None:
+                    queryset = queryset.filter(**{f'{self.field}__lt': high})
+        return queryset
+
+
+class RiskLevelFilter(RangeListFilter):
+    title = 'risk level'
+    parameter_name = 'risk'
+    field = 'risk_score'
+    # The bands of Task.get_risk_level
+    ranges = (
+        ('high', 'High (0.8+)', 0.8, None),
+        ('medium', 'Medium (0.5-0.8)', 0.5, 0.8),
+        ('low', 'Low (under 0.5)', None, 0.5),
+    )
+
+
+class ComplexityFilter(RangeListFilter):
+    title = 'complexity'
+    parameter_name = 'complexity'
+    field = 'complexity_score'
+    ranges = (
+        ('0-29', '0-29', None, 30),
+        ('30-49', '30-49', 30, 50),
+        ('50-69', '50-69', 50, 70),
+        ('70-89', '70-89', 70, 90),
+        ('90-100', '90-100', 90, None),
+    )
+
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
-    list_display = ('title', 'status', 'deadline', 'complexity_score', 'risk_score', 'created_at', 'updated_at')
-    list_filter = ('status', 'deadline', 'complexity_score', 'risk_score')
+    list_display = ('title', 'owner', 'status', 'deadline', 'complexity_score', 'risk_score', 'created_at', 'updated_at')
+    list_filter = ('status', 'deadline', ComplexityFilter, RiskLevelFilter)
     search_fields = ('title', 'description')
+    # Served by task_deadline_idx, so a page is an index range rather than a sort of the table
+    ordering = ('deadline', 'id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('complete_selected', 'rescore_selected', 'archive_selected')
     readonly_fields = ('id', 'created_at', 'updated_at')
+    raw_id_fields = ('owner',)
     fieldsets = (
         (None, {
-            'fields': ('title', 'description', 'deadline', 'status')
+            'fields': ('owner', 'title', 'description', 'deadline', 'status')
         }),
         ('AI Features', {
             'fields': ('estimated_duration', 'complexity_score', 'risk_score'),
@@ -24,4 +84,52 @@ class TaskAdmin(admin.ModelAdmin):
     def get_readonly_fields(self, request, obj=None):
         if obj: 
             return self.readonly_fields + ('id',)
-        return self.readonly_fields
\ No newline at end of file
+        return self.readonly_fields
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index (see search.py) instead of icontains scans
+        if not search_term.strip():
+            return queryset, False
+        try:
+            return search_queryset(queryset, search_term), False
+        except NotImplementedError:
+            return super().get_search_results(request, queryset, search_term)
+
+    # The actions below write with set-based updates in batches, not a save() per task
+
+    @admin.action(description='Complete selected ongoing tasks')
+    def complete_selected(self, request, queryset):
+        count = finish_tasks(queryset.select_related(None), 'success', timezone.now())
+        self.message_user(request, f'Completed {count} tasks.', messages.SUCCESS)
+
+    @admin.action(description='Recalculate risk scores of selected ongoing tasks')
+    def rescore_selected(self, request, queryset):
+        tasks = queryset.select_related(None).order_by()
+        owner_ids = set(tasks.values_list('owner_id', flat=True).distinct())
+        series_ids = set(tasks.filter(series__isnull=False).values_list('series_id', flat=True).distinct())
+        count = rescore_tasks(tasks, get_history_counts_by_owner(owner_ids), get_history_counts_by_series(series_ids))
+        self.message_user(request, f'Updated the risk scores of {count} tasks.', messages.SUCCESS)
+
+    @admin.action(description='Archive selected finished tasks')
+    def archive_selected(self, request, queryset):
+        count = archive_tasks(queryset.select_related(None))
+        self.message_user(request, f'Archived {count} tasks.', messages.SUCCESS)
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = ('title', 'owner', 'status', 'deadline', 'updated_at', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('title',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = [field.name for field in ArchivedTask._meta.fields]
+
+
+@admin.register(RecurringTask)
+class RecurringTaskAdmin(admin.ModelAdmin):
+    list_display = ('title', 'owner', 'frequency', 'interval', 'dtstart', 'until', 'next_occurrence')
+    list_filter = ('frequency',)
+    search_fields = ('title',)
+    readonly_fields = ('id', 'next_occurrence', 'success_count', 'failure_count', 'created_at', 'updated_at')
+    raw_id_fields = ('owner',)
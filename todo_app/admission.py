@@ -0,0 +1,146 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import GEMINI_ADMISSION_GAUGE, GEMINI_ADMISSION_WAIT_HISTOGRAM, GEMINI_SHED_COUNTER
+
+# Highest priority first: a user waiting on the response, then work a user
+# will wait on soon (speculative calls while they are still speaking) or bulk
+# work, then work nobody is waiting for
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+BACKGROUND = 'background'
+PRIORITIES = (INTERACTIVE, BATCH, BACKGROUND)
+
+DEFAULT_RATE_PER_MINUTE = 60
+DEFAULT_BURST = 5
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_QUEUE = 50
+DEFAULT_MAX_WAIT_SECONDS = {INTERACTIVE: 2.0, BATCH: 10.0, BACKGROUND: 30.0}
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity, clock):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_token(self):
+        """Seconds until a token is available, 0 if one is now"""
+        self.refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def take(self):
+        self.tokens -= 1
+
+
+class AdmissionController:
+    """
+    Admits upstream calls within a rate (token bucket) and a concurrency limit.
+
+    Waiting callers are served by priority, then in arrival order. A caller
+    still waiting after its priority's max wait, or arriving at a full queue,
+    is shed: acquire() returns False and the caller should fall back to local
+    processing instead of calling upstream.
+
+    `clock` and `wait(condition, timeout)` default to time.monotonic and
+    Condition.wait; tests can pass a fake clock whose wait advances it.
+    """
+
+    def __init__(self, rate_per_second, burst, max_concurrency, max_wait=None, max_queue=DEFAULT_MAX_QUEUE,
+                 clock=time.monotonic, wait=None):
+        self.bucket = TokenBucket(rate_per_second, burst, clock) if rate_per_second else None
+        self.max_concurrency = max_concurrency
+        self.max_wait = {**DEFAULT_MAX_WAIT_SECONDS, **(max_wait or {})}
+        self.max_queue = max_queue
+        self.clock = clock
+        self.wait = wait or (lambda condition, timeout: condition.wait(timeout))
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiters = []  # heap of (priority rank, arrival number)
+        self.arrivals = itertools.count()
+
+    def acquire(self, priority=INTERACTIVE):
+        """Wait for a slot; True when admitted (call release() afterwards), False when shed"""
+        start = self.clock()
+        deadline = start + self.max_wait[priority]
+        with self.condition:
+            if len(self.waiters) >= self.max_queue:
+                return self.shed(priority, 'queue_full', start)
+            entry = (PRIORITIES.index(priority), next(self.arrivals))
+            heapq.heappush(self.waiters, entry)
+            GEMINI_ADMISSION_GAUGE.labels('waiting').inc()
+            try:
+                while True:
+                    timeout = None
+                    if self.waiters[0] == entry and self.active < self.max_concurrency:
+                        timeout = self.bucket.time_until_token() if self.bucket else 0.0
+                        if timeout == 0:
+                            return self.admit(priority, start)
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        self.waiters.remove(entry)
+                        heapq.heapify(self.waiters)
+                        # The next waiter may be at the head now
+                        self.condition.notify_all()
+                        return self.shed(priority, 'timeout', start)
+                    self.wait(self.condition, remaining if timeout is None else min(timeout, remaining))
+            finally:
+                GEMINI_ADMISSION_GAUGE.labels('waiting').dec()
+
+    def admit(self, priority, start):
+        heapq.heappop(self.waiters)
+        if self.bucket:
+            self.bucket.take()
+        self.active += 1
+        GEMINI_ADMISSION_GAUGE.labels('in_flight').inc()
+        GEMINI_ADMISSION_WAIT_HISTOGRAM.labels(priority, 'admitted').observe(self.clock() - start)
+        # Let the next waiter check whether it can go too
+        self.condition.notify_all()
+        return True
+
+    def shed(self, priority, reason, start):
+        GEMINI_SHED_COUNTER.labels(priority, reason).inc()
+        GEMINI_ADMISSION_WAIT_HISTOGRAM.labels(priority, 'shed').observe(self.clock() - start)
+        return False
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            GEMINI_ADMISSION_GAUGE.labels('in_flight').dec()
+            self.condition.notify_all()
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """The process-wide controller for Gemini calls, configured from settings"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            rate_per_minute = getattr(settings, 'GEMINI_RATE_PER_MINUTE', DEFAULT_RATE_PER_MINUTE)
+            _controller = AdmissionController(
+                rate_per_second=rate_per_minute / 60,
+                burst=getattr(settings, 'GEMINI_BURST', DEFAULT_BURST),
+                max_concurrency=getattr(settings, 'GEMINI_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY),
+                max_wait=getattr(settings, 'GEMINI_MAX_WAIT_SECONDS', None),
+                max_queue=getattr(settings, 'GEMINI_MAX_QUEUE', DEFAULT_MAX_QUEUE),
+            )
+        return _controller
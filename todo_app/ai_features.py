@@ -1,9 +1,14 @@
 from datetime import datetime, timedelta
+from django.db.models import F, Sum
 from django.utils import timezone 
-from .models import Task 
+from .models import Task, TaskHistoryRollup
+from .archive import get_history_counts, get_history_counts_by_series
 import re
 
+from .profiling import timed_span
+
 # AI Features for Risk Assessment
+@timed_span('ai-scoring')
 def calculate_task_complexity(title, description):
     """Calculate task complexity score based on content analysis"""
     complexity_keywords = {
@@ -33,6 +38,7 @@ def calculate_task_complexity(title, description):
     
     return min(max(score, 0), 100)
 
+@timed_span('ai-scoring')
 def estimate_task_duration(title, description, complexity_score):
     """Estimate task duration based on content and complexity"""
     text = f"{title} {description}".lower() if description else title.lower()
@@ -62,8 +68,15 @@ def estimate_task_duration(title, description, complexity_score):
     
     return int(duration)
 
-def calculate_completion_probability(task, user_history_qs=None):
-    """Calculate probability of completing task on time using AI analysis"""
+@timed_span('ai-scoring')
+def calculate_completion_probability(task, user_history_qs=None, history_counts=None, series_history_counts=None):
+    """
+    Calculate probability of completing task on time using AI analysis.
+    `user_history_qs` is the task owner's terminal tasks. Batch callers can pass
+    precomputed (completed, successful) `history_counts` instead of a queryset
+    to avoid two count queries per task, and `series_history_counts` for an
+    occurrence of a recurring task.
+    """
     now = timezone.now() 
     if not task.deadline: # Handle case where deadline might not be set
         return 0.5 # Default risk if no deadline
@@ -102,10 +115,16 @@ def calculate_completion_probability(task, user_history_qs=None):
     else:
         risk_factors.append(0.0)  # Good buffer or task needs no time
     
-    # Historical performance 
-    if user_history_qs and user_history_qs.exists():
-        completed_tasks_count = user_history_qs.count()
-        successful_tasks_count = user_history_qs.filter(status='success').count()
+    # Historical performance, including tasks already moved to the archive
+    if history_counts is None and user_history_qs is not None:
+        history_counts = get_history_counts(user_history_qs, task.owner_id)
+    if series_history_counts is None and user_history_qs is not None and task.series_id:
+        series_history_counts = get_history_counts_by_series([task.series_id]).get(task.series_id)
+    # A recurring task's own record predicts its next occurrence better than the owner's overall one
+    if series_history_counts is not None and series_history_counts[0] > 0:
+        history_counts = series_history_counts
+    if history_counts is not None:
+        completed_tasks_count, successful_tasks_count = history_counts
         if completed_tasks_count > 0:
             completion_rate = successful_tasks_count / completed_tasks_count
             historical_risk = (1 - completion_rate) * 0.2 # Weighted less
@@ -116,36 +135,73 @@ def calculate_completion_probability(task, user_history_qs=None):
     return round(total_risk, 3)
 
 
-def analyze_user_patterns():
-    """Analyze user task completion patterns"""
-    all_tasks = Task.objects.all()
-    if all_tasks.count() < 3:
+def analyze_user_patterns(owner_id=None):
+    """Analyze one owner's task completion patterns (None: the shared anonymous workspace)"""
+    # Imported here so numpy is only loaded by processes that serve /api/analytics;
+    # the dashboard poll uses analyze_patterns_from_db
+    from .columnar import get_analytics_store
+    store = get_analytics_store()
+    if store.is_built():
+        return analyze_patterns_from_store(store, owner_id)
+    return analyze_patterns_from_db(owner_id)
+
+def analyze_patterns_from_db(owner_id=None):
+    """The basic analysis from SQL counts and sums, without the columnar store"""
+    # Archived tasks only survive as rollup totals, so they are added back here
+    rollup = TaskHistoryRollup.load(owner_id)
+    owner_tasks = Task.objects.filter(owner_id=owner_id)
+    total_tasks = owner_tasks.count() + rollup.total_count
+    if total_tasks < 3:
         return {"message": "Need more task history for analysis", "success_rate": None, "avg_completion_time": None, "risk_profile": None}
     
-    completed_tasks_qs = Task.objects.filter(status__in=['success', 'failure'])
+    completed_tasks_qs = owner_tasks.filter(status__in=['success', 'failure'])
+    completed_count = completed_tasks_qs.count() + rollup.total_count
     
-    if not completed_tasks_qs.exists():
+    if completed_count == 0:
         return {"message": "No completed tasks for analysis", "success_rate": None, "avg_completion_time": None, "risk_profile": None}
 
     successful_tasks_qs = completed_tasks_qs.filter(status='success')
-    success_rate = successful_tasks_qs.count() / completed_tasks_qs.count() if completed_tasks_qs.count() > 0 else 0
+    successful_count = successful_tasks_qs.count() + rollup.success_count
+    success_rate = successful_count / completed_count
     
     avg_completion_time_seconds = 0
-    if successful_tasks_qs.exists():
-        total_completion_seconds = sum(
-            [(t.updated_at - t.created_at).total_seconds() for t in successful_tasks_qs]
-        )
-        avg_completion_time_seconds = total_completion_seconds / successful_tasks_qs.count()
+    if successful_count > 0:
+        # None when all the successes are archived
+        completion_time = successful_tasks_qs.aggregate(total=Sum(F('updated_at') - F('created_at')))['total']
+        total_completion_seconds = (completion_time or timedelta()).total_seconds() + rollup.success_seconds_total
+        avg_completion_time_seconds = total_completion_seconds / successful_count
     
     avg_completion_hours = avg_completion_time_seconds / 3600
     
     return {
-        "total_tasks": all_tasks.count(),
+        "total_tasks": total_tasks,
         "success_rate": round(success_rate * 100, 1),
         "avg_completion_time_hours": round(avg_completion_hours, 1), # Changed key name for clarity
         "risk_profile": "low" if success_rate > 0.8 else "medium" if success_rate > 0.6 else "high"
     }
 
+def analyze_patterns_from_store(store, owner_id=None):
+    """
+    Same analysis as analyze_user_patterns, computed with vectorized reductions
+    over the columnar history store (which also covers archived tasks).
+    """
+    summary = store.summary(owner_id)
+    total_tasks = Task.objects.filter(owner_id=owner_id, status='ongoing').count() + summary['completed']
+    if total_tasks < 3:
+        return {"message": "Need more task history for analysis", "success_rate": None, "avg_completion_time": None, "risk_profile": None}
+    if summary['completed'] == 0:
+        return {"message": "No completed tasks for analysis", "success_rate": None, "avg_completion_time": None, "risk_profile": None}
+
+    success_rate = summary['success_rate']
+    return {
+        "total_tasks": total_tasks,
+        "success_rate": round(success_rate * 100, 1),
+        "avg_completion_time_hours": round(summary['avg_completion_hours'], 1),
+        "risk_profile": "low" if success_rate > 0.8 else "medium" if success_rate > 0.6 else "high",
+        "completion_time_percentiles_hours": summary.get('completion_time_percentiles_hours'),
+        "success_rate_by_complexity": summary['success_rate_by_complexity'],
+    }
+
 # Voice Command Parser
 def parse_voice_command(command):
     """Parse natural language voice commands into task data"""
@@ -5,9 +5,14 @@ class TodoAppConfig(AppConfig):
     name = 'todo_app'
 
     def ready(self):
-        import os
-        if os.environ.get('RUN_MAIN') != 'true':
-            return
-        # Start the APScheduler for auto-transitioning task statuses
-        from .scheduler import start as start_scheduler
-        start_scheduler()
\ No newline at end of file
+        from django.db.models.signals import post_migrate
+        from .search import refresh_sqlite_search_index
+        post_migrate.connect(refresh_sqlite_search_index, sender=self)
+
+        from django.db.models.signals import post_save
+        from .dedup import on_task_saved
+        post_save.connect(on_task_saved, sender='todo_app.Task', dispatch_uid='todo_app_dedup_index')
+        from .reminders import on_task_saved as move_reminders
+        post_save.connect(move_reminders, sender='todo_app.Task', dispatch_uid='todo_app_move_reminders')
+        # The scheduler is started by the server entry points (wsgi.py, asgi.py),
+        # so management commands such as migrate never join leader election
\ No newline at end of file
@@ -0,0 +1,138 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import ArchivedTask, RecurringTask, Task, TaskHistoryRollup
+
+TERMINAL_STATUSES = ['success', 'failure']
+DEFAULT_ARCHIVE_AFTER_DAYS = 30
+DEFAULT_ARCHIVE_BATCH_SIZE = 1000
+
+ARCHIVED_FIELDS = [
+    'id', 'owner_id', 'title', 'description', 'deadline', 'status', 'created_at', 'updated_at',
+    'estimated_duration', 'complexity_score', 'risk_score', 'series_id',
+]
+
+
+def archive_terminal_tasks(older_than=None, batch_size=None):
+    """
+    Move terminal tasks last updated more than `older_than` ago into ArchivedTask.
+
+    Rows are moved in batches, each in its own transaction together with the
+    matching TaskHistoryRollup and RecurringTask increments, so the history
+    statistics never count a task twice or lose it. Returns the number of tasks archived.
+    """
+    if older_than is None:
+        older_than = timedelta(days=getattr(settings, 'TASK_ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS))
+    cutoff = timezone.now() - older_than
+    return archive_tasks(Task.objects.filter(updated_at__lt=cutoff), batch_size)
+
+
+def archive_tasks(tasks_qs, batch_size=None):
+    """Move the terminal tasks of `tasks_qs` into ArchivedTask, as archive_terminal_tasks() does"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'TASK_ARCHIVE_BATCH_SIZE', DEFAULT_ARCHIVE_BATCH_SIZE)
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            # skip_locked keeps concurrent archivers from moving (and counting) the same rows
+            rows = list(
+                tasks_qs.filter(status__in=TERMINAL_STATUSES)
+                .select_for_update(skip_locked=True)
+                .order_by()
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+
+            ArchivedTask.objects.bulk_create([ArchivedTask(**row) for row in rows], ignore_conflicts=True)
+
+            by_owner = {}
+            for row in rows:
+                by_owner.setdefault(row['owner_id'], []).append(row)
+            for owner_id, owner_rows in by_owner.items():
+                successes = [row for row in owner_rows if row['status'] == 'success']
+                # unique_rollup_owner_or_shared makes a racing create fail, and get_or_create then reads the winner's row
+                rollup, _ = TaskHistoryRollup.objects.get_or_create(owner_id=owner_id)
+                TaskHistoryRollup.objects.filter(pk=rollup.pk).update(
+                    success_count=F('success_count') + len(successes),
+                    failure_count=F('failure_count') + len(owner_rows) - len(successes),
+                    success_seconds_total=F('success_seconds_total') + sum(
+                        (row['updated_at'] - row['created_at']).total_seconds() for row in successes
+                    ),
+                    updated_at=timezone.now(),
+                )
+            by_series = {}
+            for row in rows:
+                if row['series_id'] is not None:
+                    by_series.setdefault(row['series_id'], []).append(row)
+            for series_id, series_rows in by_series.items():
+                successes = sum(1 for row in series_rows if row['status'] == 'success')
+                RecurringTask.objects.filter(pk=series_id).update(
+                    success_count=F('success_count') + successes,
+                    failure_count=F('failure_count') + len(series_rows) - successes,
+                )
+            Task.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        archived += len(rows)
+        if len(rows) < batch_size:
+            break
+    return archived
+
+
+def get_history_counts(user_history_qs, owner_id=None):
+    """(completed, successful) counts over one owner's live terminal tasks plus their archived rollup"""
+    rollup = TaskHistoryRollup.load(owner_id)
+    completed = user_history_qs.count() + rollup.total_count
+    successful = user_history_qs.filter(status='success').count() + rollup.success_count
+    return completed, successful
+
+
+def get_history_counts_by_owner(owner_ids=None):
+    """
+    get_history_counts() for many owners at once: {owner_id: (completed, successful)}.
+    All owners when `owner_ids` is None; None in `owner_ids` is the anonymous workspace.
+    """
+    counts = {}
+    live = Task.objects.filter(status__in=TERMINAL_STATUSES)
+    rollups = TaskHistoryRollup.objects.all()
+    if owner_ids is not None:
+        owners = Q(owner_id__in=[owner_id for owner_id in owner_ids if owner_id is not None])
+        if None in owner_ids:
+            owners |= Q(owner__isnull=True)
+        live, rollups = live.filter(owners), rollups.filter(owners)
+    live = live.order_by().values('owner_id').annotate(
+        completed=Count('id'), successful=Count('id', filter=Q(status='success'))
+    )
+    for row in live:
+        counts[row['owner_id']] = (row['completed'], row['successful'])
+    for rollup in rollups:
+        completed, successful = counts.get(rollup.owner_id, (0, 0))
+        counts[rollup.owner_id] = (completed + rollup.total_count, successful + rollup.success_count)
+    return counts
+
+
+def get_history_counts_by_series(series_ids=None):
+    """
+    (completed, successful) per recurring series, over its live terminal
+    occurrences plus the archived totals kept on the series:
+    {series_id: (completed, successful)}. All series when `series_ids` is None.
+    """
+    live = Task.objects.filter(status__in=TERMINAL_STATUSES, series__isnull=False)
+    series = RecurringTask.objects.all()
+    if series_ids is not None:
+        live = live.filter(series_id__in=series_ids)
+        series = series.filter(id__in=series_ids)
+    counts = {}
+    live = live.order_by().values('series_id').annotate(
+        completed=Count('id'), successful=Count('id', filter=Q(status='success'))
+    )
+    for row in live:
+        counts[row['series_id']] = (row['completed'], row['successful'])
+    for row in series.filter(Q(success_count__gt=0) | Q(failure_count__gt=0)).values('id', 'success_count', 'failure_count'):
+        completed, successful = counts.get(row['id'], (0, 0))
+        counts[row['id']] = (completed + row['success_count'] + row['failure_count'], successful + row['success_count'])
+    return counts
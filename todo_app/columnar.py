@@ -0,0 +1,381 @@
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+
+from .models import ArchivedTask, Task, TaskHistoryRollup
+
+STATUS_CODES = {'failure': 0, 'success': 1}
+# Status of stored rows whose task was reopened; readers skip them
+TOMBSTONE = -1
+# Rows updated this long before the watermark are read again on each sync:
+# expiry stamps updated_at when the job starts but commits after its shards
+# finish, so those rows can land behind rows committed in the meantime
+SYNC_OVERLAP = timedelta(minutes=5)
+# Complexity buckets reported by the analytics; lower edges of each bucket after the first
+COMPLEXITY_EDGES = [30, 50, 70, 90]
+COMPLEXITY_LABELS = ['0-29', '30-49', '50-69', '70-89', '90-100']
+
+# Column name -> dtype. Timestamps are epoch seconds; task ids are split into two uint64 halves
+COLUMNS = {
+    'id_hi': np.uint64,
+    'id_lo': np.uint64,
+    'created_at': np.float64,
+    'updated_at': np.float64,
+    'deadline': np.float64,
+    'complexity': np.int16,
+    'duration': np.int32,
+    'status': np.int8,
+    'owner': np.int64,  # owner user id, NO_OWNER for the shared anonymous workspace
+}
+ROW_FIELDS = ['id', 'owner_id', 'created_at', 'updated_at', 'deadline', 'complexity_score', 'estimated_duration', 'status']
+INITIAL_CAPACITY = 1024
+META_FILE = 'meta.json'
+NO_OWNER = 0
+# Bumped when COLUMNS or the metadata change; stores in an older format count as not built until rebuilt
+FORMAT_VERSION = 3
+
+
+def _split_uuid(value):
+    n = value.int
+    return n >> 64, n & 0xFFFFFFFFFFFFFFFF
+
+
+@contextmanager
+def _snapshot():
+    """
+    Transaction in which every read sees the same committed data, so the rows
+    read and the counts compared with them agree (SQLite transactions already do)
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        yield
+
+
+def _archived_total():
+    """Tasks archived so far, from the TaskHistoryRollup totals (one row per owner)"""
+    return TaskHistoryRollup.objects.aggregate(total=Sum(F('success_count') + F('failure_count')))['total'] or 0
+
+
+class ColumnarStore:
+    """
+    Memory-mapped column files of terminal (success/failure) tasks.
+
+    Each column is a preallocated .npy file; meta.json records how many rows
+    are valid, so a writer fills the spare capacity first and only then
+    publishes the new length, and readers never see a half-written row.
+    Tasks that change after being stored are updated in place, or tombstoned
+    when they are reopened. Writers (the scheduler's sync, a rebuild from the
+    management command) are serialized by a lock file next to the store.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    # -- metadata ---------------------------------------------------------
+
+    def _meta_path(self, path=None):
+        return os.path.join(path or self.path, META_FILE)
+
+    def is_built(self):
+        if not os.path.exists(self._meta_path()):
+            return False
+        return self._read_meta().get('version') == FORMAT_VERSION
+
+    def _read_meta(self):
+        with open(self._meta_path()) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta, path=None):
+        target = self._meta_path(path)
+        tmp = f"{target}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, target)
+
+    def __len__(self):
+        """Number of stored tasks, tombstones excluded"""
+        return int((self.columns()['status'] != TOMBSTONE).sum())
+
+    @contextmanager
+    def _lock(self):
+        """Exclusive lock across processes for writers"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(f'{self.path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # -- reading ----------------------------------------------------------
+
+    def columns(self):
+        """Read-only memory-mapped views of every column, trimmed to the valid rows"""
+        if not self.is_built():
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        length = self._read_meta()['length']
+        return {
+            name: np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')[:length]
+            for name in COLUMNS
+        }
+
+    # -- writing ----------------------------------------------------------
+
+    def _create(self, path, capacity):
+        os.makedirs(path, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            np.lib.format.open_memmap(
+                os.path.join(path, f'{name}.npy'), mode='w+', dtype=dtype, shape=(capacity,)
+            ).flush()
+        self._write_meta({'version': FORMAT_VERSION, 'length': 0, 'capacity': capacity, 'watermark': None}, path)
+
+    def _grow(self, meta, needed):
+        capacity = meta['capacity']
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype in COLUMNS.items():
+            column_path = os.path.join(self.path, f'{name}.npy')
+            tmp_path = f'{column_path}.grow'
+            old = np.load(column_path, mmap_mode='r')
+            new = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(capacity,))
+            new[:meta['length']] = old[:meta['length']]
+            new.flush()
+            del old, new
+            os.replace(tmp_path, column_path)
+        meta['capacity'] = capacity
+
+    def append_rows(self, rows):
+        """Append task rows (dicts with ROW_FIELDS keys); returns the number appended"""
+        if not rows:
+            return 0
+        if not self.is_built():
+            self._create(self.path, INITIAL_CAPACITY)
+        meta = self._read_meta()
+        start, end = meta['length'], meta['length'] + len(rows)
+        if end > meta['capacity']:
+            self._grow(meta, end)
+
+        ids = [_split_uuid(row['id']) for row in rows]
+        values = {
+            'id_hi': [hi for hi, _ in ids],
+            'id_lo': [lo for _, lo in ids],
+            'created_at': [row['created_at'].timestamp() for row in rows],
+            'updated_at': [row['updated_at'].timestamp() for row in rows],
+            'deadline': [row['deadline'].timestamp() for row in rows],
+            'complexity': [row['complexity_score'] for row in rows],
+            'duration': [row['estimated_duration'] for row in rows],
+            'status': [STATUS_CODES[row['status']] for row in rows],
+            'owner': [row['owner_id'] or NO_OWNER for row in rows],
+        }
+        for name, dtype in COLUMNS.items():
+            column = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r+')
+            column[start:end] = np.asarray(values[name], dtype=dtype)
+            column.flush()
+            del column
+
+        # Publishing the new length last makes the appended rows visible atomically
+        meta['length'] = end
+        watermark = max(row['updated_at'] for row in rows).isoformat()
+        if meta['watermark'] is None or watermark > meta['watermark']:
+            meta['watermark'] = watermark
+        self._write_meta(meta)
+        return len(rows)
+
+    def _positions(self, ids):
+        """{(id_hi, id_lo): row index} for those of `ids` already stored, tombstones included"""
+        columns = self.columns()
+        keys = [_split_uuid(task_id) for task_id in ids]
+        candidates = np.nonzero(np.isin(columns['id_hi'], np.array([hi for hi, _ in keys], dtype=np.uint64)))[0]
+        wanted = set(keys)
+        return {
+            key: int(index)
+            for key, index in zip(zip(columns['id_hi'][candidates].tolist(), columns['id_lo'][candidates].tolist()), candidates)
+            if key in wanted
+        }
+
+    def _update_rows(self, updates):
+        """Overwrite stored rows in place: (row index, task row) pairs; non-terminal tasks become tombstones"""
+        if not updates:
+            return 0
+        positions = np.array([position for position, _ in updates])
+        rows = [row for _, row in updates]
+        values = {
+            'created_at': [row['created_at'].timestamp() for row in rows],
+            'updated_at': [row['updated_at'].timestamp() for row in rows],
+            'deadline': [row['deadline'].timestamp() for row in rows],
+            'complexity': [row['complexity_score'] for row in rows],
+            'duration': [row['estimated_duration'] for row in rows],
+            'status': [STATUS_CODES.get(row['status'], TOMBSTONE) for row in rows],
+            'owner': [row['owner_id'] or NO_OWNER for row in rows],
+        }
+        for name, column_values in values.items():
+            column = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r+')
+            column[positions] = np.asarray(column_values, dtype=COLUMNS[name])
+            column.flush()
+            del column
+        return len(updates)
+
+    def sync_from_db(self, batch_size=5000):
+        """
+        Apply the tasks changed since the last sync, re-reading SYNC_OVERLAP
+        before it: new terminal tasks are appended, stored ones are updated in
+        place, reopened ones tombstoned. Deleted tasks and rows committed
+        later than the overlap leave the store's count off from the
+        database's, and the store is then rebuilt. Returns the number of rows
+        appended or changed.
+        """
+        with self._lock(), _snapshot():
+            if not self.is_built():
+                return self._rebuild(batch_size)
+            watermark = self._read_meta()['watermark']
+            qs = Task.objects.all()
+            if watermark:
+                qs = qs.filter(updated_at__gte=datetime.fromisoformat(watermark) - SYNC_OVERLAP)
+            rows = list(qs.order_by('updated_at').values(*ROW_FIELDS))
+
+            synced = 0
+            if rows:
+                positions = self._positions([row['id'] for row in rows])
+                stored_updated_at = self.columns()['updated_at']
+                new_rows, updates = [], []
+                for row in rows:
+                    position = positions.get(_split_uuid(row['id']))
+                    if position is not None:
+                        # Rows in the overlap are read again and are usually unchanged
+                        if stored_updated_at[position] != row['updated_at'].timestamp():
+                            updates.append((position, row))
+                    elif row['status'] in STATUS_CODES:
+                        new_rows.append(row)
+                synced += self._update_rows(updates)
+                for i in range(0, len(new_rows), batch_size):
+                    synced += self.append_rows(new_rows[i:i + batch_size])
+                # Edits of ongoing or reopened tasks move the watermark too
+                meta = self._read_meta()
+                meta['watermark'] = max(meta['watermark'] or '', rows[-1]['updated_at'].isoformat())
+                self._write_meta(meta)
+
+            # Archived rows are counted from the rebuild plus what the rollups
+            # gained since, not by counting the ever-growing archive table
+            meta = self._read_meta()
+            archived = meta['archived'] + _archived_total() - meta['archived_rollup']
+            if len(self) != Task.objects.filter(status__in=STATUS_CODES).count() + archived:
+                return self._rebuild(batch_size)
+            return synced
+
+    def rebuild_from_db(self, batch_size=5000):
+        """Rebuild the store from live terminal tasks and the archive; returns the row count"""
+        with self._lock(), _snapshot():
+            return self._rebuild(batch_size)
+
+    def _rebuild(self, batch_size):
+        tmp_path = f'{self.path}.rebuild'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        self._create(tmp_path, INITIAL_CAPACITY)
+        building = ColumnarStore(tmp_path)
+
+        archived_rollup = _archived_total()
+        counts = []
+        for qs in (Task.objects.filter(status__in=STATUS_CODES), ArchivedTask.objects.all()):
+            count = 0
+            batch = []
+            for row in qs.order_by().values(*ROW_FIELDS).iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    count += building.append_rows(batch)
+                    batch = []
+            count += building.append_rows(batch)
+            counts.append(count)
+        live, archived = counts
+        meta = building._read_meta()
+        meta.update(archived=archived, archived_rollup=archived_rollup)
+        building._write_meta(meta)
+
+        old_path = f'{self.path}.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return live + archived
+
+    # -- verification -----------------------------------------------------
+
+    def check_consistency(self):
+        """Compare the store with the database; returns a list of problems (empty if consistent)"""
+        columns = self.columns()
+        live = columns['status'] != TOMBSTONE
+        columns = {name: column[live] for name, column in columns.items()}
+        stored = set(zip(columns['id_hi'].tolist(), columns['id_lo'].tolist()))
+        problems = []
+        if len(stored) != len(columns['id_hi']):
+            problems.append(f"{len(columns['id_hi']) - len(stored)} duplicate rows in the store")
+
+        db_status = {}
+        for qs in (Task.objects.filter(status__in=STATUS_CODES), ArchivedTask.objects.all()):
+            for task_id, status in qs.order_by().values_list('id', 'status').iterator(chunk_size=5000):
+                db_status[_split_uuid(task_id)] = STATUS_CODES[status]
+
+        missing = len(db_status.keys() - stored)
+        extra = len(stored - db_status.keys())
+        if missing:
+            problems.append(f"{missing} terminal tasks missing from the store")
+        if extra:
+            problems.append(f"{extra} stored rows no longer terminal in the database")
+
+        keys = zip(columns['id_hi'].tolist(), columns['id_lo'].tolist(), columns['status'].tolist())
+        changed = sum(1 for hi, lo, status in keys if db_status.get((hi, lo), status) != status)
+        if changed:
+            problems.append(f"{changed} stored rows with a stale status")
+        return problems
+
+    # -- analytics --------------------------------------------------------
+
+    def summary(self, owner_id=None):
+        """Vectorized completion statistics over one owner's stored terminal tasks"""
+        columns = self.columns()
+        mine = (columns['owner'] == (owner_id or NO_OWNER)) & (columns['status'] != TOMBSTONE)
+        columns = {name: column[mine] for name, column in columns.items()}
+        status = columns['status']
+        completed = len(status)
+        if completed == 0:
+            return {'completed': 0}
+
+        succeeded = status == 1
+        completion_hours = (columns['updated_at'][succeeded] - columns['created_at'][succeeded]) / 3600
+
+        buckets = np.digitize(columns['complexity'], COMPLEXITY_EDGES)
+        bucket_totals = np.bincount(buckets, minlength=len(COMPLEXITY_LABELS))
+        bucket_successes = np.bincount(buckets, weights=succeeded, minlength=len(COMPLEXITY_LABELS))
+
+        summary = {
+            'completed': completed,
+            'successful': int(succeeded.sum()),
+            'success_rate': float(succeeded.mean()),
+            'avg_completion_hours': float(completion_hours.mean()) if len(completion_hours) else 0.0,
+            'success_rate_by_complexity': {
+                label: round(float(bucket_successes[i] / bucket_totals[i]) * 100, 1) if bucket_totals[i] else None
+                for i, label in enumerate(COMPLEXITY_LABELS)
+            },
+        }
+        if len(completion_hours):
+            p50, p90, p99 = np.percentile(completion_hours, [50, 90, 99])
+            summary['completion_time_percentiles_hours'] = {
+                'p50': round(float(p50), 1), 'p90': round(float(p90), 1), 'p99': round(float(p99), 1),
+            }
+        return summary
+
+
+def get_analytics_store():
+    path = getattr(settings, 'ANALYTICS_STORE_DIR', os.path.join(settings.BASE_DIR, 'analytics_store'))
+    return ColumnarStore(path)
@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+
+from django.db import connections
+
+from .metrics import (
+    DB_POOL_BAD_RETURNS_COUNTER,
+    DB_POOL_CHECKOUTS_COUNTER,
+    DB_POOL_CONNECTIONS_GAUGE,
+    DB_POOL_ERRORS_COUNTER,
+    DB_POOL_QUEUED_COUNTER,
+    DB_POOL_WAIT_SECONDS_COUNTER,
+    DB_POOL_WAITING_GAUGE,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 15
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def get_pools():
+    """psycopg_pool pools created so far in this process, by alias"""
+    pools = {}
+    for alias in connections:
+        connection = connections[alias]
+        # Only the PostgreSQL backend pools; reading .pool does not open it
+        if connection.vendor == 'postgresql' and connection.settings_dict['OPTIONS'].get('pool'):
+            pools[alias] = connection.pool
+    return pools
+
+
+def collect_pool_stats():
+    """
+    Copy psycopg_pool statistics into the Prometheus metrics.
+
+    pop_stats() resets the pool's counters, so each call adds what happened
+    since the previous one.
+    """
+    for alias, pool in get_pools().items():
+        stats = pool.pop_stats()
+        size, idle = stats.get('pool_size', 0), stats.get('pool_available', 0)
+        DB_POOL_CONNECTIONS_GAUGE.labels(alias, 'in_use').set(size - idle)
+        DB_POOL_CONNECTIONS_GAUGE.labels(alias, 'idle').set(idle)
+        DB_POOL_CONNECTIONS_GAUGE.labels(alias, 'max').set(stats.get('pool_max', 0))
+        DB_POOL_WAITING_GAUGE.labels(alias).set(stats.get('requests_waiting', 0))
+        DB_POOL_CHECKOUTS_COUNTER.labels(alias).inc(stats.get('requests_num', 0))
+        DB_POOL_QUEUED_COUNTER.labels(alias).inc(stats.get('requests_queued', 0))
+        DB_POOL_WAIT_SECONDS_COUNTER.labels(alias).inc(stats.get('requests_wait_ms', 0) / 1000)
+        DB_POOL_ERRORS_COUNTER.labels(alias).inc(stats.get('requests_errors', 0))
+        DB_POOL_BAD_RETURNS_COUNTER.labels(alias).inc(stats.get('returns_bad', 0) + stats.get('connections_lost', 0))
+
+
+def start_pool_metrics(interval=DEFAULT_INTERVAL_SECONDS):
+    """Collect pool statistics every `interval` seconds in a daemon thread (once per process)"""
+    global _thread
+    with _thread_lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run, args=(interval,), name='db-pool-metrics', daemon=True)
+        _thread.start()
+
+
+def _run(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            collect_pool_stats()
+        except Exception as e:
+            logger.warning(f"Collecting connection pool metrics failed: {e}")
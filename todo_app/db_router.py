@@ -0,0 +1,119 @@
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Cookie set after a write so the same client reads from the primary until replicas catch up
+PRIMARY_PIN_COOKIE = 'todo_primary_pin'
+DEFAULT_READ_YOUR_WRITES_SECONDS = 5
+
+# Per-request routing state, set by ReplicaRoutingMiddleware; None outside requests
+_routing = ContextVar('todo_app_replica_routing', default=None)
+
+_cycle = None
+_cycle_aliases = None
+_cycle_lock = threading.Lock()
+
+
+class RoutingState:
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+        self.primary_reads = False  # set by read_from_primary()
+        self.replica = None  # chosen on the first read, then kept for the whole request
+
+
+def get_replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def next_replica():
+    """Round-robin over DATABASE_REPLICAS"""
+    global _cycle, _cycle_aliases
+    aliases = get_replica_aliases()
+    with _cycle_lock:
+        if aliases != _cycle_aliases:
+            _cycle, _cycle_aliases = itertools.cycle(aliases), aliases
+        return next(_cycle)
+
+
+def start_routing(use_replicas):
+    """Start tracking the current request; returns a token for stop_routing()"""
+    return _routing.set(RoutingState(use_replicas))
+
+
+def stop_routing(token):
+    state = _routing.get()
+    _routing.reset(token)
+    return state
+
+
+@contextmanager
+def unpinned_writes():
+    """
+    Writes inside the block don't pin the request or its client to the primary.
+
+    For idempotent housekeeping that a GET does on the side, like expiring
+    overdue tasks; the change reaches every client through replication anyway.
+    """
+    state = _routing.get()
+    wrote = state.wrote if state is not None else False
+    try:
+        yield
+    finally:
+        if state is not None:
+            state.wrote = wrote
+
+
+def read_from_primary():
+    """
+    Send the rest of the current request's reads to the primary without
+    pinning the client, e.g. after an unpinned_writes() block that changed
+    rows the request is about to read back.
+    """
+    state = _routing.get()
+    if state is not None:
+        state.primary_reads = True
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a replica, round-robin, only inside read-only requests that
+    ReplicaRoutingMiddleware marked as eligible and that have not written yet.
+    A request reads from one replica throughout, so its queries see a single
+    replication position instead of mixing replicas that lag differently.
+
+    Everything else (writes, POST handlers, scheduler jobs, management commands,
+    select_for_update inside transactions) stays on the primary, so callers
+    never need .using(). Migrations only run against the primary; replicas get
+    the schema through replication.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state.use_replicas or state.wrote or state.primary_reads or not get_replica_aliases():
+            return PRIMARY
+        if state.replica is None:
+            state.replica = next_replica()
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            # Later reads in this request must see the write
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replica_aliases():
+            return False
+        return None
@@ -0,0 +1,202 @@
+import hashlib
+import re
+
+from django.conf import settings
+
+from .models import Task, TaskLshBand
+from .profiling import timed_span
+
+# MinHash signature of NUM_PERM values, split into BANDS bands of ROWS values.
+# Two tasks become candidates when any band matches, which happens with
+# probability 1 - (1 - s**ROWS)**BANDS for Jaccard similarity s: 0.93 at
+# s = 0.5, above 0.99 from s = 0.6, and 0.15 for unrelated text at s = 0.2.
+# Changing these needs `manage.py rebuild_duplicate_index`.
+NUM_PERM = 60
+BANDS = 20
+ROWS = NUM_PERM // BANDS
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.6
+# Bounds the work when an owner has many near-identical tasks
+MAX_CANDIDATES = 100
+# 'flag' creates the task and lists its duplicates; 'merge' folds it into the closest one
+DUPLICATE_ACTIONS = ('flag', 'merge')
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed coefficients: band keys are stored, so they must match across processes and restarts
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % (_MERSENNE_PRIME - 1) + 1,
+     int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+]
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Filler and scheduling words that voice input adds around the same task
+# ("submit the report tomorrow at 5pm"); the deadline is compared separately
+IGNORED_WORDS = frozenset('''
+    a an the to of for on at by in and or my our with about please
+    remind me i need create add new task
+    today tonight tomorrow next week weeks day days hour hours minute minutes month
+    monday tuesday wednesday thursday friday saturday sunday am pm morning afternoon evening
+'''.split())
+
+
+def tokenize(title, description=''):
+    """Word set used for similarity"""
+    text = f"{title} {description or ''}".lower()
+    return {word for word in _WORD_RE.findall(text) if word not in IGNORED_WORDS and not word.isdigit()}
+
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), 'big')
+
+
+def minhash(tokens):
+    hashes = [_token_hash(token) for token in tokens]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def band_keys(tokens):
+    """One signed 64-bit key per band, the values stored in TaskLshBand.key"""
+    if not tokens:
+        return []
+    signature = minhash(tokens)
+    keys = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr((band, values)).encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def get_similarity_threshold():
+    return getattr(settings, 'DUPLICATE_SIMILARITY_THRESHOLD', DEFAULT_SIMILARITY_THRESHOLD)
+
+
+def get_duplicate_action(requested=None):
+    """The client's `on_duplicate` choice if valid, else DUPLICATE_ACTION"""
+    if requested in DUPLICATE_ACTIONS:
+        return requested
+    return getattr(settings, 'DUPLICATE_ACTION', 'flag')
+
+
+def index_task(task):
+    """Replace the task's LSH bands; only ongoing tasks are indexed"""
+    index_tasks([task])
+
+
+def index_tasks(tasks):
+    """
+    index_task() for many saved tasks, e.g. rows from bulk_create(), which
+    sends no post_save. Tasks whose stored bands already match their title,
+    description, status and owner are left alone, so saves that change other
+    fields cost one lookup instead of rewriting every band.
+    """
+    wanted = {
+        task.pk: {(task.owner_id, key) for key in band_keys(tokenize(task.title, task.description))}
+        if task.status == 'ongoing' else set()
+        for task in tasks
+    }
+    stored = {pk: set() for pk in wanted}
+    for task_id, owner_id, key in TaskLshBand.objects.filter(task_id__in=wanted).values_list('task_id', 'owner_id', 'key'):
+        stored[task_id].add((owner_id, key))
+    stale = [pk for pk, bands in wanted.items() if bands != stored[pk]]
+    if not stale:
+        return
+    TaskLshBand.objects.filter(task_id__in=stale).delete()
+    TaskLshBand.objects.bulk_create(
+        TaskLshBand(task_id=pk, owner_id=owner_id, key=key)
+        for pk in stale
+        for owner_id, key in wanted[pk]
+    )
+
+
+@timed_span('dedup')
+def find_duplicates(title, description='', owner_id=None, exclude_id=None, threshold=None, limit=5):
+    """
+    Ongoing tasks of `owner_id` whose title and description are at least
+    `threshold` similar (Jaccard over tokenize()) to the given text, most
+    similar first, as (task, similarity) pairs.
+
+    LSH narrows the search to tasks sharing a band with the text, one indexed
+    lookup whatever the number of tasks, and only those candidates are compared.
+    """
+    threshold = get_similarity_threshold() if threshold is None else threshold
+    tokens = tokenize(title, description)
+    keys = band_keys(tokens)
+    if not keys:
+        return []
+
+    candidate_ids = TaskLshBand.objects.filter(owner_id=owner_id, key__in=keys).values('task_id')
+    # Bands of tasks that left 'ongoing' through bulk updates linger until
+    # the task is indexed again or deleted, so the status is checked here
+    candidates = Task.objects.filter(id__in=candidate_ids, status='ongoing')
+    if exclude_id is not None:
+        candidates = candidates.exclude(id=exclude_id)
+    candidates = candidates.order_by()[:MAX_CANDIDATES]
+
+    matches = []
+    for task in candidates:
+        similarity = jaccard(tokens, tokenize(task.title, task.description))
+        if similarity >= threshold:
+            matches.append((task, similarity))
+    matches.sort(key=lambda match: match[1], reverse=True)
+    return matches[:limit]
+
+
+def duplicates_payload(matches):
+    return [
+        {'id': str(task.id), 'title': task.title, 'similarity': round(similarity, 3)}
+        for task, similarity in matches
+    ]
+
+
+def merge_into(existing, description, deadline):
+    """Fold a duplicate create into the existing task: keep the earlier deadline and any missing description"""
+    changed = []
+    if deadline and deadline < existing.deadline:
+        existing.deadline = deadline
+        changed.append('deadline')
+    if description and not existing.description:
+        existing.description = description
+        changed.append('description')
+    if changed:
+        existing.save(update_fields=[*changed, 'updated_at'])
+    return existing
+
+
+def on_task_saved(sender, instance, update_fields=None, **kwargs):
+    """post_save receiver keeping the LSH index in step with single-row saves"""
+    if update_fields is not None and not {'title', 'description', 'status', 'owner'} & set(update_fields):
+        return
+    index_task(instance)
+
+
+def rebuild_index(batch_size=5000):
+    """Re-index every ongoing task, for bulk-loaded rows and band layout changes"""
+    TaskLshBand.objects.all().delete()
+    indexed = 0
+    batch = []
+    tasks = Task.objects.filter(status='ongoing').only('id', 'owner_id', 'title', 'description')
+    for task in tasks.iterator(chunk_size=batch_size):
+        batch.extend(
+            TaskLshBand(task_id=task.pk, owner_id=task.owner_id, key=key)
+            for key in band_keys(tokenize(task.title, task.description))
+        )
+        indexed += 1
+        if len(batch) >= batch_size:
+            TaskLshBand.objects.bulk_create(batch)
+            batch = []
+    TaskLshBand.objects.bulk_create(batch)
+    return indexed
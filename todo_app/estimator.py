@@ -0,0 +1,164 @@
+import hashlib
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from .ai_features import calculate_task_complexity, estimate_task_duration
+from .dedup import tokenize
+from .models import EstimatorBucket
+
+# Tokens are hashed into a fixed table, so its size doesn't grow with the vocabulary.
+# Changing this invalidates the learned table (delete the EstimatorBucket rows).
+NUM_BUCKETS = 1 << 18
+
+# Completion time (created_at to success) is the only duration signal and also
+# counts time the task sat untouched, so it is clamped to a working day
+MIN_DURATION_MINUTES = 5
+MAX_DURATION_MINUTES = 480
+
+# The keyword heuristics act as a prior worth this many observations, with
+# this variance (in log minutes)
+PRIOR_WEIGHT = 3
+DURATION_PRIOR_VARIANCE = 0.5
+
+# Complexity points added per unit of log(learned / heuristic duration): about
+# +20 when tasks with these words take twice as long as the keywords suggest.
+# Outcomes are left out on purpose; failures already weigh in the risk score.
+COMPLEXITY_PER_LOG_DURATION = 30
+
+FINISH_BATCH_SIZE = 1000
+
+
+def feature_buckets(title, description=''):
+    """Hashed bag-of-words features: the distinct table rows for the text's tokens"""
+    return sorted({
+        int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), 'big') % NUM_BUCKETS
+        for token in tokenize(title, description)
+    })
+
+
+def combine(prior, stats, prior_variance):
+    """
+    Blend the prior with the tokens' running means.
+
+    `stats` holds (count, sum, sum of squares) per token. Each token's mean is
+    weighted by its precision, count / variance, with the variance shrunk
+    towards `prior_variance`, so tokens seen often and with consistent
+    outcomes count most. The words of one task were all learned from the same
+    tasks, so together they weigh as much as the most precise one, not the sum.
+    """
+    weighted, total_weight, evidence = 0.0, 0.0, 0.0
+    for count, total, squares in stats:
+        if not count:
+            continue
+        mean = total / count
+        spread = max(squares - total * mean, 0.0)
+        variance = (spread + prior_variance * PRIOR_WEIGHT) / (count + PRIOR_WEIGHT)
+        weight = count / variance
+        weighted += mean * weight
+        total_weight += weight
+        evidence = max(evidence, weight)
+    if not total_weight:
+        return prior
+    prior_weight = PRIOR_WEIGHT / prior_variance
+    return (prior * prior_weight + weighted / total_weight * evidence) / (prior_weight + evidence)
+
+
+def estimate_task(title, description=''):
+    """
+    (complexity_score, estimated_duration) for a new task: the keyword
+    heuristics of ai_features, corrected by how long successful tasks with the
+    same words took. Complexity moves with the ratio of the learned duration
+    to the heuristic one. One indexed query.
+    """
+    complexity = calculate_task_complexity(title, description)
+    duration = estimate_task_duration(title, description, complexity)
+    rows = list(
+        EstimatorBucket.objects.filter(bucket__in=feature_buckets(title, description)).values_list(
+            'duration_count', 'duration_sum', 'duration_sq_sum'
+        )
+    )
+    if not rows:
+        # Cold start: nothing learned about these words yet
+        return complexity, duration
+
+    learned_duration = min(max(
+        math.exp(combine(math.log(duration), rows, DURATION_PRIOR_VARIANCE)),
+        MIN_DURATION_MINUTES,
+    ), MAX_DURATION_MINUTES)
+    learned_complexity = complexity + COMPLEXITY_PER_LOG_DURATION * math.log(learned_duration / duration)
+    return int(round(min(max(learned_complexity, 0), 100))), int(round(learned_duration))
+
+
+def learn(outcomes):
+    """
+    Fold finished tasks into the table: `outcomes` are (title, description,
+    status, completion minutes or None) tuples. Only successes carry a
+    duration, so failures leave the table unchanged. Costs a couple of queries
+    per distinct update, whatever the size of the history.
+    """
+    increments = defaultdict(lambda: [0, 0.0, 0.0])
+    for title, description, status, minutes in outcomes:
+        if status != 'success' or minutes is None:
+            continue
+        log_minutes = math.log(min(max(minutes, MIN_DURATION_MINUTES), MAX_DURATION_MINUTES))
+        for bucket in feature_buckets(title, description):
+            increment = increments[bucket]
+            increment[0] += 1
+            increment[1] += log_minutes
+            increment[2] += log_minutes ** 2
+    if not increments:
+        return
+
+    # Buckets with identical increments share one UPDATE; for one task that is all of them
+    by_increment = defaultdict(list)
+    for bucket, increment in increments.items():
+        by_increment[tuple(increment)].append(bucket)
+    EstimatorBucket.objects.bulk_create([EstimatorBucket(bucket=bucket) for bucket in increments], ignore_conflicts=True)
+    for (duration_count, duration_sum, duration_sq_sum), buckets in by_increment.items():
+        EstimatorBucket.objects.filter(bucket__in=buckets).update(
+            duration_count=F('duration_count') + duration_count,
+            duration_sum=F('duration_sum') + duration_sum,
+            duration_sq_sum=F('duration_sq_sum') + duration_sq_sum,
+        )
+
+
+def learn_from_task(task):
+    """learn() from one task that just finished"""
+    minutes = (task.updated_at - task.created_at).total_seconds() / 60 if task.status == 'success' else None
+    learn([(task.title, task.description, task.status, minutes)])
+
+
+def finish_tasks(tasks_qs, status, now):
+    """
+    Set the ongoing tasks of `tasks_qs` to `status` ('success' or 'failure')
+    and learn from them; returns how many were finished. The rows are locked
+    while they are read, so concurrent finishes (scheduler shards,
+    request-time expiry, admin actions) don't learn from the same task twice.
+    """
+    with transaction.atomic():
+        rows = list(
+            tasks_qs.filter(status='ongoing')
+            .select_for_update(skip_locked=True).order_by()
+            .values_list('id', 'title', 'description', 'created_at')
+        )
+        if not rows:
+            return 0
+        for start in range(0, len(rows), FINISH_BATCH_SIZE):
+            batch = rows[start:start + FINISH_BATCH_SIZE]
+            # updated_at is set explicitly because update() skips auto_now
+            tasks_qs.model.objects.filter(id__in=[task_id for task_id, *_ in batch]).update(
+                status=status, updated_at=now
+            )
+            learn([
+                (title, description, status, (now - created_at).total_seconds() / 60 if status == 'success' else None)
+                for _, title, description, created_at in batch
+            ])
+    return len(rows)
+
+
+def expire_overdue(tasks_qs, now):
+    """Fail the ongoing tasks of `tasks_qs` whose deadline passed (see finish_tasks); returns how many"""
+    return finish_tasks(tasks_qs.filter(deadline__lt=now), 'failure', now)
@@ -1,9 +1,15 @@
-import google.generativeai as genai
 import json
 import os
 import logging
+import time
 from datetime import datetime
 from django.conf import settings
+from django.utils import timezone
+
+from .admission import INTERACTIVE, get_admission_controller
+from .ai_features import parse_voice_command
+from .metrics import GEMINI_CALL_HISTOGRAM
+from .profiling import timed_span
 
 logger = logging.getLogger('todo_app')
 
@@ -15,26 +21,78 @@ def init_gemini_api():
     if _gemini_initialized:
         return True
     api_key = os.environ.get('GEMINI_API_KEY')
-    logger.debug(f"init_gemini_api: GEMINI_API_KEY={api_key}")
     if not api_key:
         logger.warning("GEMINI_API_KEY not found in environment variables")
         return False
     
-    genai.configure(api_key=api_key)
+    get_genai().configure(api_key=api_key)
     _gemini_initialized = True
     return True
 
+def get_genai():
+    # The SDK takes most of a second to import, so only processes that call Gemini load it.
+    # Tests patch this to return a fake module.
+    import google.generativeai as genai
+    return genai
+
+def local_parse_result(voice_input):
+    """The local regex parser's reading of the input, shaped like a Gemini result"""
+    parsed = parse_voice_command(voice_input)
+    deadline = parsed['deadline']
+    return {
+        "success": True,
+        "task_data": {
+            "title": parsed['title'],
+            "description": parsed['description'],
+            "deadline": timezone.localtime(deadline).strftime('%Y-%m-%dT%H:%M') if deadline else "",
+        },
+        "original_input": voice_input,
+        "shed": True
+    }
+
+# Extract the task JSON object from Gemini's raw response text
+def extract_task_json(raw_text):
+    try:
+        # First try direct parsing of raw_text
+        task_data = json.loads(raw_text)
+    except json.JSONDecodeError:
+        # Fallback: extract JSON inside markdown or text
+        import re
+        pattern = r'```json\s*([\s\S]*?)\s*```|```\s*([\s\S]*?)\s*```|(\{[\s\S]*?\})'
+        match = re.search(pattern, raw_text)
+        if match:
+            json_str = next(g for g in match.groups() if g)
+            task_data = json.loads(json_str)
+        else:
+            raise ValueError("Could not extract valid JSON from Gemini response")
+            
+    # Validate the structure
+    if not isinstance(task_data, dict):
+        raise ValueError("Response is not a dictionary")
+    return task_data
+
 # Process the voice input with Gemini
-def process_with_gemini(voice_input):
-    logger.debug(f"process_with_gemini called with voice_input={voice_input}")
+@timed_span('gemini')
+def process_with_gemini(voice_input, priority=INTERACTIVE):
+    """
+    Structure the voice input with Gemini. Calls go through the process-wide
+    admission controller; when no slot frees up in time for `priority` the
+    local parser's result is returned instead, marked "shed".
+    """
+    logger.debug("process_with_gemini called with voice_input=%s", voice_input)
     # Check API initialization
     if not init_gemini_api():
         logger.warning("GEMINI_API_KEY missing, using fallback for process_with_gemini")
+        GEMINI_CALL_HISTOGRAM.labels('not_configured').observe(0)
         return {
             "success": True,
             "task_data": {"title": voice_input, "description": "", "deadline": ""},
             "original_input": voice_input
         }
+    admission = get_admission_controller()
+    if not admission.acquire(priority):
+        logger.warning("Gemini call shed at %s priority, using the local parser", priority)
+        return local_parse_result(voice_input)
     try:
         # Define the prompt for Gemini
         prompt = f"""
@@ -55,7 +113,7 @@ def process_with_gemini(voice_input):
         Return ONLY the JSON object with no additional text.
         """
         
-        logger.debug(f"process_with_gemini: prompt={prompt}")
+        logger.debug("process_with_gemini: prompt=%s", prompt)
         
         # Configure the model
         generation_config = {
@@ -65,13 +123,19 @@ def process_with_gemini(voice_input):
         }
         
         # Get the Gemini model
-        model = genai.GenerativeModel(
+        model = get_genai().GenerativeModel(
             model_name="gemini-1.5-pro",
             generation_config=generation_config
         )
         
         # Generate the response
-        response = model.generate_content(prompt)
+        call_start = time.perf_counter()
+        try:
+            response = model.generate_content(prompt)
+        except Exception:
+            GEMINI_CALL_HISTOGRAM.labels('error').observe(time.perf_counter() - call_start)
+            raise
+        call_duration = time.perf_counter() - call_start
         # Retrieve text from response
         raw_text = None
         if hasattr(response, 'text') and response.text:
@@ -82,22 +146,11 @@ def process_with_gemini(voice_input):
             raw_text = str(response)
         
         try:
-            # First try direct parsing of raw_text
-            task_data = json.loads(raw_text)
-        except json.JSONDecodeError:
-            # Fallback: extract JSON inside markdown or text
-            import re
-            pattern = r'```json\s*([\s\S]*?)\s*```|```\s*([\s\S]*?)\s*```|(\{[\s\S]*?\})'
-            match = re.search(pattern, raw_text)
-            if match:
-                json_str = next(g for g in match.groups() if g)
-                task_data = json.loads(json_str)
-            else:
-                raise ValueError("Could not extract valid JSON from Gemini response")
-                
-        # Validate the structure
-        if not isinstance(task_data, dict):
-            raise ValueError("Response is not a dictionary")
+            task_data = extract_task_json(raw_text)
+        except ValueError:
+            GEMINI_CALL_HISTOGRAM.labels('invalid_response').observe(call_duration)
+            raise
+        GEMINI_CALL_HISTOGRAM.labels('success').observe(call_duration)
         
         required_keys = ['title', 'description']
         for key in required_keys:
@@ -120,10 +173,12 @@ def process_with_gemini(voice_input):
         }
         
     except Exception as e:
-        logger.error(f"Error processing with Gemini: {str(e)}", exc_info=True)
+        logger.error("Error processing with Gemini: %s", e, exc_info=True)
         # Fallback: return the raw voice input as title if Gemini fails
         return {
             "success": True,
             "task_data": {"title": voice_input, "description": "", "deadline": ""},
             "original_input": voice_input
         }
+    finally:
+        admission.release()
@@ -1,46 +1,61 @@
 from django.utils import timezone
 from .models import Task
-from .ai_features import calculate_completion_probability
+from .archive import archive_terminal_tasks, get_history_counts_by_owner, get_history_counts_by_series
+from .columnar import get_analytics_store
+from .recurrence import materialize_recurring_tasks
+from .reminders import deliver_due_reminders
 from django_apscheduler.jobstores import DjangoJobStore
 from django_apscheduler.models import DjangoJobExecution
+from django_apscheduler.util import close_old_connections
 from apscheduler.schedulers.background import BackgroundScheduler
 import logging
 
-from .metrics import JOB_SUCCESS_COUNTER, JOB_FAILURE_COUNTER, JOB_DURATION_HISTOGRAM
+from .metrics import JOB_SUCCESS_COUNTER, JOB_FAILURE_COUNTER, JOB_DURATION_HISTOGRAM, JOB_SHARD_LAG_GAUGE
+from .sharding import claim_shards, release_shard, run_shards, shard_count
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
+# Jobs run on APScheduler's worker threads, outside the request cycle that normally
+# hands connections back to the pool; close_old_connections does that around each run
+
+@close_old_connections
 def update_task_statuses_job():
     """
     Background job to update statuses of expired tasks and recalculate risk scores, with Prometheus monitoring.
+
+    The work is split into SCHEDULER_SHARD_COUNT shards by task id. Shards are
+    claimed through ShardLease rows and scored inline or, with
+    SCHEDULER_SHARD_WORKERS > 1, in parallel in a process pool.
     """
     job_id = 'update_task_statuses_job'
-    with JOB_DURATION_HISTOGRAM.labels(job_id).time():
+    claimed = []
+    with JOB_DURATION_HISTOGRAM.labels(job_id, 'all').time():
         try:
             now = timezone.now()
             updated_expired_count = 0
             updated_risk_score_count = 0
 
-            # Update expired tasks
-            expired_tasks = Task.objects.filter(deadline__lt=now, status='ongoing')
-            for task in expired_tasks:
-                task.status = 'failure'
-                task.save()
-                updated_expired_count += 1
-
-            # Update risk scores for ongoing tasks
-            ongoing_tasks = Task.objects.filter(status='ongoing')
-            user_history_qs = Task.objects.filter(status__in=['success', 'failure'])
-            for task in ongoing_tasks:
-                new_risk_score = calculate_completion_probability(task, user_history_qs)
-                if task.risk_score != new_risk_score:
-                    task.risk_score = new_risk_score
-                    task.save()
-                    updated_risk_score_count += 1
+            # History statistics are shared by each owner's tasks, so count them once per run
+            history_counts_by_owner = get_history_counts_by_owner()
+            history_counts_by_series = get_history_counts_by_series()
+            count = shard_count()
+            claimed = claim_shards(job_id, count, now)
+            for shard, lag in claimed:
+                JOB_SHARD_LAG_GAUGE.labels(job_id, str(shard)).set(lag)
+
+            results = run_shards(
+                [shard for shard, _ in claimed], count, now, history_counts_by_owner, history_counts_by_series
+            )
+
+            for shard, expired_count, rescored_count, duration in results:
+                JOB_DURATION_HISTOGRAM.labels(job_id, str(shard)).observe(duration)
+                release_shard(job_id, shard)
+                updated_expired_count += expired_count
+                updated_risk_score_count += rescored_count
 
             if updated_expired_count > 0 or updated_risk_score_count > 0:
-                logger.info(f"Background job: Updated {updated_expired_count} expired tasks and risk scores for {updated_risk_score_count} ongoing tasks.")
+                logger.info(f"Background job: Updated {updated_expired_count} expired tasks and risk scores for {updated_risk_score_count} ongoing tasks across {len(results)} of {count} shards.")
             else:
                 logger.info("Background job: No tasks required status or risk score updates.")
 
@@ -48,4 +63,78 @@ def update_task_statuses_job():
         except Exception as e:
             JOB_FAILURE_COUNTER.labels(job_id).inc()
             logger.error(f"Scheduler job {job_id} failed: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            # Free unfinished shards now instead of waiting for their leases to expire
+            for shard, _ in claimed:
+                release_shard(job_id, shard, completed=False)
+            raise
+
+
+@close_old_connections
+def archive_terminal_tasks_job():
+    """
+    Background job moving old success/failure tasks out of the live Task table, with Prometheus monitoring.
+    """
+    job_id = 'archive_terminal_tasks_job'
+    with JOB_DURATION_HISTOGRAM.labels(job_id, 'all').time():
+        try:
+            archived_count = archive_terminal_tasks()
+            logger.info(f"Background job: Archived {archived_count} terminal tasks.")
+            JOB_SUCCESS_COUNTER.labels(job_id).inc()
+        except Exception as e:
+            JOB_FAILURE_COUNTER.labels(job_id).inc()
+            logger.error(f"Scheduler job {job_id} failed: {e}", exc_info=True)
+            raise
+
+
+@close_old_connections
+def sync_analytics_store_job():
+    """
+    Background job syncing finished, changed and reopened tasks into the columnar analytics store, with Prometheus monitoring.
+    """
+    job_id = 'sync_analytics_store_job'
+    with JOB_DURATION_HISTOGRAM.labels(job_id, 'all').time():
+        try:
+            synced_count = get_analytics_store().sync_from_db()
+            if synced_count > 0:
+                logger.info(f"Background job: Synced {synced_count} tasks into the analytics store.")
+            JOB_SUCCESS_COUNTER.labels(job_id).inc()
+        except Exception as e:
+            JOB_FAILURE_COUNTER.labels(job_id).inc()
+            logger.error(f"Scheduler job {job_id} failed: {e}", exc_info=True)
+            raise
+
+
+@close_old_connections
+def materialize_recurring_tasks_job():
+    """
+    Background job creating the Task rows of recurring task occurrences entering the window, with Prometheus monitoring.
+    """
+    job_id = 'materialize_recurring_tasks_job'
+    with JOB_DURATION_HISTOGRAM.labels(job_id, 'all').time():
+        try:
+            created_count = materialize_recurring_tasks()
+            if created_count > 0:
+                logger.info(f"Background job: Materialized {created_count} recurring task occurrences.")
+            JOB_SUCCESS_COUNTER.labels(job_id).inc()
+        except Exception as e:
+            JOB_FAILURE_COUNTER.labels(job_id).inc()
+            logger.error(f"Scheduler job {job_id} failed: {e}", exc_info=True)
+            raise
+
+
+@close_old_connections
+def deliver_reminders_job():
+    """
+    Background job delivering due task reminders to the REMINDER_SINKS, with Prometheus monitoring.
+    """
+    job_id = 'deliver_reminders_job'
+    with JOB_DURATION_HISTOGRAM.labels(job_id, 'all').time():
+        try:
+            delivered_count = deliver_due_reminders()
+            if delivered_count > 0:
+                logger.info(f"Background job: Delivered {delivered_count} reminders.")
+            JOB_SUCCESS_COUNTER.labels(job_id).inc()
+        except Exception as e:
+            JOB_FAILURE_COUNTER.labels(job_id).inc()
+            logger.error(f"Scheduler job {job_id} failed: {e}", exc_info=True)
+            raise
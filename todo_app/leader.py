@@ -0,0 +1,162 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import SCHEDULER_LEADER_GAUGE, SCHEDULER_LEADER_TRANSITIONS_COUNTER
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = 'todo_app.scheduler'
+DEFAULT_RETRY_SECONDS = 5
+
+
+def create_unpooled_connection(alias):
+    """
+    A new connection wrapper for `alias` that bypasses the connection pool.
+
+    Closing a pooled connection only returns it to the pool, with its session
+    (and any advisory lock) still alive.
+    """
+    connection = connections.create_connection(alias)
+    options = {key: value for key, value in connection.settings_dict['OPTIONS'].items() if key != 'pool'}
+    connection.settings_dict = {**connection.settings_dict, 'OPTIONS': options}
+    return connection
+
+
+class PostgresAdvisoryLock:
+    """
+    Session-level pg_try_advisory_lock held on a dedicated connection.
+
+    PostgreSQL releases the lock as soon as that connection ends, so a dead
+    leader frees it without waiting for a lease to expire.
+    """
+
+    def __init__(self, name=LOCK_NAME, alias='default'):
+        self.key = zlib.crc32(name.encode())
+        self.alias = alias
+        self.connection = None
+
+    def acquire(self):
+        if self.connection is None:
+            # Not the thread-local request connection, which Django closes per request
+            self.connection = create_unpooled_connection(self.alias)
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [self.key])
+                return cursor.fetchone()[0]
+        except Exception:
+            self.release()
+            raise
+
+    def is_held(self):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT 1 FROM pg_locks WHERE locktype = %s AND objid = %s AND pid = pg_backend_pid() AND granted',
+                    ['advisory', self.key]
+                )
+                return cursor.fetchone() is not None
+        except Exception:
+            return False
+
+    def release(self):
+        if self.connection is not None:
+            try:
+                # Closing the session releases the advisory lock
+                self.connection.close()
+            finally:
+                self.connection = None
+
+
+class FileLock:
+    """flock()-based stand-in for local development and SQLite setups on one host"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(tempfile.gettempdir(), f'{LOCK_NAME}.lock')
+        self.fd = None
+
+    def acquire(self):
+        import fcntl
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def is_held(self):
+        # The kernel holds the lock until our descriptor is closed
+        return self.fd is not None
+
+    def release(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def get_scheduler_lock():
+    backend = getattr(settings, 'SCHEDULER_LEADER_BACKEND', 'auto')
+    if backend == 'auto':
+        backend = 'postgres' if connections['default'].vendor == 'postgresql' else 'file'
+    if backend == 'postgres':
+        return PostgresAdvisoryLock()
+    if backend == 'file':
+        return FileLock(getattr(settings, 'SCHEDULER_LOCK_FILE', None))
+    raise ValueError(f"Unknown SCHEDULER_LEADER_BACKEND: {backend}")
+
+
+class LeaderElector:
+    """
+    Runs `on_elected` in exactly one process among all candidates sharing the lock.
+
+    Every candidate retries the lock every `retry_seconds`; the leader uses the
+    same tick to confirm it still holds it and calls `on_demoted` if it doesn't.
+    Failover therefore takes at most one retry interval.
+    """
+
+    def __init__(self, on_elected, on_demoted, lock=None, retry_seconds=None):
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.lock = lock or get_scheduler_lock()
+        self.retry_seconds = retry_seconds or getattr(settings, 'SCHEDULER_LEADER_RETRY_SECONDS', DEFAULT_RETRY_SECONDS)
+        self.is_leader = False
+
+    def start(self):
+        # The lock's database connection belongs to this thread, which runs
+        # for the life of the process; exiting releases the lock
+        SCHEDULER_LEADER_GAUGE.set(0)
+        threading.Thread(target=self._run, name='scheduler-leader-election', daemon=True).start()
+
+    def tick(self):
+        """One election round; exposed separately so it can be driven without the thread"""
+        try:
+            if self.is_leader:
+                if not self.lock.is_held():
+                    logger.warning("Scheduler leadership lost")
+                    self.lock.release()
+                    self._set_leader(False)
+            elif self.lock.acquire():
+                logger.info(f"Process {os.getpid()} elected scheduler leader")
+                self._set_leader(True)
+        except Exception as e:
+            logger.error(f"Scheduler leader election failed: {e}", exc_info=True)
+            if self.is_leader:
+                self._set_leader(False)
+
+    def _run(self):
+        while True:
+            self.tick()
+            time.sleep(self.retry_seconds)
+
+    def _set_leader(self, is_leader):
+        self.is_leader = is_leader
+        SCHEDULER_LEADER_GAUGE.set(1 if is_leader else 0)
+        SCHEDULER_LEADER_TRANSITIONS_COUNTER.labels('elected' if is_leader else 'demoted').inc()
+        (self.on_elected if is_leader else self.on_demoted)()
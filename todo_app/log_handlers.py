@@ -0,0 +1,90 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import re
+from logging.handlers import QueueHandler, QueueListener
+
+from .metrics import LOG_RECORDS_DROPPED_COUNTER
+
+REDACTED = '[REDACTED]'
+
+# Environment variables whose values never belong in a log line
+SECRET_ENV_VARS = ('GEMINI_API_KEY', 'DJANGO_SECRET_KEY', 'DATABASE_PASSWORD')
+
+# key=value / "key": "value" pairs and bearer tokens, whatever the value
+SECRET_PATTERN = re.compile(
+    r'''(?i)((?:api[_-]?key|secret|password|passwd|token|authorization)["']?\s*[:=]\s*["']?(?:bearer\s+)?)[^\s"',&]+'''
+)
+
+
+class RedactingFormatter(logging.Formatter):
+    """Formatter that masks secrets in the fully formatted line, tracebacks included"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.secrets = [value for value in (os.environ.get(name) for name in SECRET_ENV_VARS) if value]
+
+    def format(self, record):
+        return redact(super().format(record), self.secrets)
+
+
+def redact(text, secrets=()):
+    for secret in secrets:
+        text = text.replace(secret, REDACTED)
+    return SECRET_PATTERN.sub(rf'\1{REDACTED}', text)
+
+
+class SampleFilter(logging.Filter):
+    """Passes only `rate` of the DEBUG records; INFO and above always pass"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class AsyncStreamHandler(QueueHandler):
+    """
+    Writes to a stream from a background QueueListener thread.
+
+    The calling thread only puts the record on a bounded in-memory queue, and
+    formatting (including redaction) happens on the listener thread. The queue
+    stays in-process, so records are not pre-formatted the way QueueHandler
+    does for multiprocessing queues. When the queue is full the record is
+    dropped and counted rather than blocking the request.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        self.target = logging.StreamHandler(stream)
+        super().__init__(queue.Queue(maxsize))
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        # Flush whatever is still queued when the process exits
+        atexit.register(self.stop_listener)
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED_COUNTER.inc()
+
+    def stop_listener(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def close(self):
+        self.stop_listener()
+        self.target.close()
+        super().close()
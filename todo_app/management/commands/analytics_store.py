@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from todo_app.columnar import get_analytics_store
+
+
+class Command(BaseCommand):
+    help = 'Rebuild, sync or verify the columnar analytics store of finished tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['rebuild', 'sync', 'check'])
+
+    def handle(self, *args, **options):
+        store = get_analytics_store()
+        action = options['action']
+        start = time.perf_counter()
+
+        if action == 'rebuild':
+            count = store.rebuild_from_db()
+            self.stdout.write(f"Rebuilt {store.path} with {count} tasks in {time.perf_counter() - start:.2f}s")
+        elif action == 'sync':
+            count = store.sync_from_db()
+            self.stdout.write(f"Synced {count} tasks into {store.path}")
+        else:
+            if not store.is_built():
+                raise CommandError(f"No analytics store at {store.path}; run 'analytics_store rebuild' first")
+            problems = store.check_consistency()
+            if problems:
+                for problem in problems:
+                    self.stderr.write(problem)
+                raise CommandError("Analytics store is inconsistent with the database; run 'analytics_store rebuild'")
+            self.stdout.write(self.style.SUCCESS(f"{len(store)} stored tasks match the database"))
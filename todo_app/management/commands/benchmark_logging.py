@@ -0,0 +1,69 @@
+import logging
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from todo_app.log_handlers import AsyncStreamHandler, RedactingFormatter, SampleFilter
+
+FORMAT = '{levelname} {asctime} {module} {process:d} {thread:d} {message}'
+SQL = 'SELECT "todo_app_task"."id", "todo_app_task"."title" FROM "todo_app_task" WHERE "todo_app_task"."status" = %s'
+
+
+class Command(BaseCommand):
+    help = 'Compare request-thread logging throughput of the development and production logging profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=20000, help='Records logged per thread')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent logging threads')
+        parser.add_argument('--sample-rate', type=float, default=0.01, help='DEBUG SQL sample rate for the production profile')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryFile('w') as stream:
+            sync_handler = logging.StreamHandler(stream)
+            sync_handler.setFormatter(RedactingFormatter(FORMAT, style='{'))
+            sync_rate = self.run_case('sync, every SQL record', sync_handler, None, options)
+
+            # Unbounded queue, so the benchmark never drops records
+            async_handler = AsyncStreamHandler(stream, maxsize=0)
+            async_handler.setFormatter(RedactingFormatter(FORMAT, style='{'))
+            try:
+                async_rate = self.run_case('async, every SQL record', async_handler, None, options)
+                sampled_rate = self.run_case(
+                    f"async, {options['sample_rate']:.0%} SQL sample", async_handler,
+                    SampleFilter(options['sample_rate']), options
+                )
+            finally:
+                async_handler.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Production profile: {async_rate / sync_rate:.1f}x (async) and "
+            f"{sampled_rate / sync_rate:.1f}x (async + sampling) the development throughput"
+        ))
+
+    def run_case(self, label, handler, sample_filter, options):
+        logger = logging.getLogger(f'todo_app.benchmark_logging.{id(handler)}.{id(sample_filter)}')
+        logger.handlers = [handler]
+        logger.filters = [sample_filter] if sample_filter else []
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+
+        def work():
+            for i in range(options['records']):
+                logger.debug('(%.3f) %s; args=%s; alias=%s', 0.0004, SQL, ('ongoing',), 'default')
+
+        threads = [threading.Thread(target=work) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        if isinstance(handler, AsyncStreamHandler):
+            handler.queue.join()
+        drained = time.perf_counter() - start
+
+        rate = options['records'] * options['threads'] / elapsed
+        self.stdout.write(f"{label:<28} {rate:>12,.0f} records/s on the calling threads, all written after {drained:.2f}s")
+        return rate
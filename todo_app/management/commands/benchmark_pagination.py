@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from todo_app.models import Task
+from todo_app.pagination import encode_cursor, paginate_by_deadline
+from todo_app.synthetic import remove_seeded_tasks, seed_tasks
+
+
+class Command(BaseCommand):
+    help = 'Compare deep-page latency of keyset pagination against OFFSET pagination'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic tasks before benchmarking (e.g. 1000000)')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded tasks afterwards')
+        parser.add_argument('--status', default='success', help='Status bucket to page through')
+        parser.add_argument('--limit', type=int, default=50, help='Page size')
+        parser.add_argument('--depths', default='0,1000,10000,100000,500000',
+                            help='Comma-separated row offsets to measure')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per depth')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.stdout.write(f"Seeded {seed_tasks(options['seed'])} tasks")
+        try:
+            self.run_benchmark(options)
+        finally:
+            if options['seed'] and not options['keep']:
+                self.stdout.write(f"Removed {remove_seeded_tasks()} seeded tasks")
+
+    def run_benchmark(self, options):
+        status, limit, repeat = options['status'], options['limit'], options['repeat']
+        bucket = Task.objects.filter(status=status)
+        total = bucket.count()
+        self.stdout.write(f"{total} '{status}' tasks, page size {limit}")
+        self.stdout.write(f"{'depth':>10} {'offset ms':>12} {'keyset ms':>12}")
+
+        for depth in (int(d) for d in options['depths'].split(',')):
+            if depth >= total:
+                continue
+            # Cursor for the row just before `depth`; looked up once, outside the timing
+            cursor = None
+            if depth:
+                cursor = encode_cursor(bucket.order_by('deadline', 'id')[depth - 1])
+
+            offset_times, keyset_times = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(bucket.order_by('deadline', 'id')[depth:depth + limit])
+                offset_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                paginate_by_deadline(bucket, cursor, limit)
+                keyset_times.append(time.perf_counter() - start)
+
+            self.stdout.write(
+                f"{depth:>10} {statistics.median(offset_times) * 1000:>12.2f} "
+                f"{statistics.median(keyset_times) * 1000:>12.2f}"
+            )
@@ -0,0 +1,46 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from todo_app.search import search_tasks
+from todo_app.synthetic import NOUNS, VERBS, remove_seeded_tasks, seed_tasks
+
+
+class Command(BaseCommand):
+    help = 'Measure full-text search latency percentiles against a p95 budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic tasks before benchmarking (e.g. 1000000)')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded tasks afterwards')
+        parser.add_argument('--queries', type=int, default=200, help='Number of timed searches')
+        parser.add_argument('--limit', type=int, default=20, help='Results per page')
+        parser.add_argument('--budget-ms', type=float, default=20.0, help='p95 latency budget')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.stdout.write(f"Seeded {seed_tasks(options['seed'])} tasks")
+        try:
+            self.run_benchmark(options)
+        finally:
+            if options['seed'] and not options['keep']:
+                self.stdout.write(f"Removed {remove_seeded_tasks()} seeded tasks")
+
+    def run_benchmark(self, options):
+        terms = VERBS + NOUNS
+        timings = []
+        for _ in range(options['queries']):
+            query = ' '.join(random.sample(terms, random.randint(1, 2)))
+            start = time.perf_counter()
+            search_tasks(query, options['limit'])
+            timings.append((time.perf_counter() - start) * 1000)
+
+        cuts = statistics.quantiles(timings, n=100)
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        self.stdout.write(f"p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms")
+        if p95 > options['budget_ms']:
+            self.stderr.write(self.style.ERROR(f"p95 exceeds the {options['budget_ms']} ms budget"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"p95 within the {options['budget_ms']} ms budget"))
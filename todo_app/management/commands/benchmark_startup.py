@@ -0,0 +1,69 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Loads the WSGI app and the URLconf (and so every view module), like a worker
+# boot followed by its first request, and prints the elapsed seconds
+STARTUP_SCRIPT = (
+    "import time; start = time.perf_counter()\n"
+    "import django_todo_project.wsgi\n"
+    "from django.urls import get_resolver; get_resolver().url_patterns\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \| +(\S+)$')
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start time of the WSGI app in fresh interpreters against a budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Number of cold starts to time')
+        parser.add_argument('--budget-ms', type=float, default=600.0, help='Median cold-start budget')
+        parser.add_argument('--top', type=int, default=15, help='Number of packages to list in the import-time breakdown')
+
+    def handle(self, *args, **options):
+        timings = [self.cold_start() * 1000 for _ in range(options['runs'])]
+        median = statistics.median(timings)
+        self.stdout.write(f"cold start: median {median:.0f} ms  min {min(timings):.0f} ms  max {max(timings):.0f} ms")
+
+        self.stdout.write("Import time per top-level package (ms, from -X importtime):")
+        for self_us, package in self.slowest_imports(options['top']):
+            self.stdout.write(f"  {self_us / 1000:8.1f}  {package}")
+
+        if median > options['budget_ms']:
+            raise CommandError(f"Median cold start {median:.0f} ms exceeds the {options['budget_ms']:.0f} ms budget")
+        self.stdout.write(self.style.SUCCESS(f"Median cold start within the {options['budget_ms']:.0f} ms budget"))
+
+    def run_child(self, *python_args):
+        env = os.environ.copy()
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'django_todo_project.settings')
+        # Keep the child from joining scheduler leader election
+        env.pop('RUN_MAIN', None)
+        env['SCHEDULER_AUTOSTART'] = 'false'
+        env['METRICS_PORT'] = '0'
+        result = subprocess.run(
+            [sys.executable, *python_args, '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"App failed to start:\n{result.stderr}")
+        return result
+
+    def cold_start(self):
+        return float(self.run_child().stdout.strip().splitlines()[-1])
+
+    def slowest_imports(self, top):
+        """Import time of the app's cold start summed per top-level package, slowest first"""
+        totals = {}
+        for line in self.run_child('-X', 'importtime').stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                package = match.group(2).split('.')[0]
+                totals[package] = totals.get(package, 0) + int(match.group(1))
+        return sorted(((self_us, package) for package, self_us in totals.items()), reverse=True)[:top]
@@ -0,0 +1,71 @@
+import gzip
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from todo_app.synthetic import random_task
+from todo_app.wire import COMPACT_JSON, COMPACT_MSGPACK, JSON, compact_header, decode_tasks, encode_tasks, msgpack
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = 'Compare response bytes and encode/parse time of the plain JSON and compact task formats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000, help='Tasks in the response')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per format')
+        parser.add_argument('--random-seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        rng = random.Random(options['random_seed'])
+        tasks = [random_task(now, rng=rng) for _ in range(options['tasks'])]
+        for task in tasks:
+            task.updated_at = task.created_at
+
+        formats = [JSON, COMPACT_JSON] + ([COMPACT_MSGPACK] if msgpack is not None else [])
+        self.stdout.write(f"{len(tasks)} tasks, median of {options['repeat']} runs")
+        self.stdout.write(
+            f"{'format':>8} {'bytes':>10} {'gzip':>10} {'brotli':>10} {'encode ms':>10} {'parse ms':>10}"
+        )
+        for fmt in formats:
+            encode_times, parse_times = [], []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                body = self.encode(tasks, fmt, now)
+                encode_times.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                rows = self.parse(body, fmt)
+                parse_times.append((time.perf_counter() - start) * 1000)
+            assert len(rows) == len(tasks)
+
+            gzipped = len(gzip.compress(body, compresslevel=6))
+            brotli_bytes = str(len(brotli.compress(body, quality=4))) if brotli is not None else '-'
+            self.stdout.write(
+                f"{fmt:>8} {len(body):>10} {gzipped:>10} {brotli_bytes:>10} "
+                f"{statistics.median(encode_times):>10.2f} {statistics.median(parse_times):>10.2f}"
+            )
+
+    def encode(self, tasks, fmt, now):
+        """The bytes the API would send for a list of `tasks`"""
+        data = {'tasks': encode_tasks(tasks, fmt, now)}
+        if fmt == COMPACT_MSGPACK:
+            return msgpack.packb(dict(data, compact=compact_header(now)))
+        if fmt == COMPACT_JSON:
+            return json.dumps(dict(data, compact=compact_header(now)), separators=(',', ':')).encode()
+        return json.dumps(data).encode()
+
+    def parse(self, body, fmt):
+        """Back to one dict per task, as the frontend does"""
+        data = msgpack.unpackb(body) if fmt == COMPACT_MSGPACK else json.loads(body)
+        if fmt == JSON:
+            return data['tasks']
+        return decode_tasks(data['tasks'], data['compact'])
@@ -0,0 +1,343 @@
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+
+from todo_app.synthetic import SEED_TITLE_PREFIX, NOUNS, VERBS, random_title, remove_seeded_tasks, seed_tasks
+
+# Share of each operation in the traffic; roughly what the frontend does
+# (it polls the dashboard every few seconds) plus occasional edits
+DEFAULT_MIX = 'poll=55,create=12,complete=10,voice=8,smart_voice=5,analytics=10'
+
+VOICE_WHEN = ['tomorrow', 'today at 5pm', 'next week', 'in 3 days', 'in 2 hours', 'by 9am', 'next friday']
+
+RESULTS_DIR = 'loadtest_results'
+
+
+class InProcessTransport:
+    """Requests through django.test.Client, one per thread, without a server"""
+
+    def __init__(self, headers):
+        self.headers = {f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()}
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+        data = json.dumps(body) if body is not None else None
+        kwargs = {'content_type': 'application/json'} if data is not None else {}
+        response = client.generic(method, path, data or '', **kwargs, **self.headers)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content
+
+    def close_thread(self):
+        # Each worker thread opened its own database connections
+        connections.close_all()
+
+
+class HttpTransport:
+    """Requests to a running server, e.g. http://127.0.0.1:8000"""
+
+    def __init__(self, base_url, headers):
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=dict(self.headers))
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def close_thread(self):
+        pass
+
+
+def stub_gemini(latency):
+    """Stand-in for process_with_gemini that sleeps like the API and echoes the text"""
+
+    def process_with_gemini(voice_input):
+        time.sleep(latency)
+        deadline = (timezone.now() + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M')
+        return {
+            'success': True,
+            'task_data': {'title': voice_input[:200], 'description': '', 'deadline': deadline},
+            'original_input': voice_input,
+        }
+
+    return process_with_gemini
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def summarize(timings, errors, elapsed):
+    ordered = sorted(timings)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput_rps': round(len(ordered) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(statistics.fmean(ordered), 2) if ordered else None,
+        'p50_ms': round(percentile(ordered, 50), 2) if ordered else None,
+        'p95_ms': round(percentile(ordered, 95), 2) if ordered else None,
+        'p99_ms': round(percentile(ordered, 99), 2) if ordered else None,
+        'max_ms': round(ordered[-1], 2) if ordered else None,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Run mixed API traffic in-process or against a server and report per-endpoint throughput and latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server (default: in-process test client)')
+        parser.add_argument('--token', help='API token sent as "Authorization: Token <key>"')
+        parser.add_argument('--requests', type=int, default=2000, help='Total timed requests')
+        parser.add_argument('--warmup', type=int, default=50, help='Untimed requests before the run')
+        parser.add_argument('--concurrency', type=int, default=4, help='Worker threads')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help='Comma-separated operation=weight pairs')
+        parser.add_argument('--gemini-latency-ms', type=float, default=800.0,
+                            help='Latency of the stubbed Gemini call (in-process only)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic tasks before the run (in-process database)')
+        parser.add_argument('--keep', action='store_true', help='Keep seeded and created tasks afterwards')
+        parser.add_argument('--random-seed', type=int, help='Seed for reproducible traffic')
+        parser.add_argument('--output', help=f'Results file (default: {RESULTS_DIR}/<timestamp>.json)')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+
+    def handle(self, *args, **options):
+        self.mix = self.parse_mix(options['mix'])
+        self.rng = random.Random(options['random_seed'])
+        self.rng_lock = threading.Lock()
+        self.created_ids = []
+        self.ids_lock = threading.Lock()
+
+        headers = {'Authorization': f"Token {options['token']}"} if options['token'] else {}
+        if options['url']:
+            self.transport = HttpTransport(options['url'], headers)
+            target = options['url']
+            gemini = None
+            self.stdout.write("Gemini is not stubbed on a remote server; run it without GEMINI_API_KEY "
+                              "to use the local fallback")
+        else:
+            self.transport = InProcessTransport(headers)
+            target = 'in-process'
+            gemini = mock.patch('todo_app.views.process_with_gemini',
+                                stub_gemini(options['gemini_latency_ms'] / 1000))
+
+        if options['seed']:
+            self.stdout.write(f"Seeded {seed_tasks(options['seed'], rng=self.rng)} tasks")
+        try:
+            if gemini is not None:
+                gemini.start()
+            try:
+                self.prefetch_ongoing()
+                self.run_phase(options['warmup'], options['concurrency'])
+                results, elapsed = self.run_phase(options['requests'], options['concurrency'])
+            finally:
+                if gemini is not None:
+                    gemini.stop()
+        finally:
+            if not options['keep']:
+                self.cleanup(options['seed'])
+
+        report = self.build_report(results, elapsed, target, options)
+        self.print_report(report)
+        if options['compare']:
+            self.print_comparison(report, options['compare'])
+        self.save_report(report, options['output'])
+
+    def parse_mix(self, value):
+        mix = {}
+        for pair in value.split(','):
+            name, _, weight = pair.partition('=')
+            name = name.strip()
+            if not hasattr(self, f'op_{name}'):
+                raise CommandError(f"Unknown operation {name!r} in --mix")
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Invalid weight for {name!r} in --mix")
+        return mix
+
+    def choice(self, seq):
+        with self.rng_lock:
+            return self.rng.choice(seq)
+
+    def pick_operation(self):
+        with self.rng_lock:
+            return self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+    def prefetch_ongoing(self):
+        """
+        Ongoing synthetic task ids for the complete operation, fetched the way a
+        client would. Only seeded or harness-created tasks are ever completed.
+        """
+        status, content = self.transport.request('GET', '/api/tasks?status=ongoing&limit=100')
+        if status != 200:
+            raise CommandError(f"GET /api/tasks returned {status}: {content[:200]!r}")
+        self.ongoing_ids = [
+            task['id'] for task in json.loads(content)['tasks'] if task['title'].startswith(SEED_TITLE_PREFIX)
+        ]
+
+    # Operations: each returns (endpoint label, HTTP status)
+
+    def op_poll(self):
+        return 'GET /api/dashboard', self.transport.request('GET', '/api/dashboard')[0]
+
+    def op_analytics(self):
+        return 'GET /api/analytics', self.transport.request('GET', '/api/analytics')[0]
+
+    def op_create(self):
+        with self.rng_lock:
+            deadline = timezone.now() + timedelta(minutes=self.rng.randint(30, 60 * 24 * 14))
+            title = f"{SEED_TITLE_PREFIX}{random_title(self.rng)}"
+        status, content = self.transport.request('POST', '/api/tasks', {
+            'title': title,
+            'description': f"{title} for the {self.choice(NOUNS)}",
+            'deadline': deadline.isoformat(),
+        })
+        self.remember(status, content, lambda data: data['id'])
+        return 'POST /api/tasks', status
+
+    def op_complete(self):
+        with self.ids_lock:
+            task_id = self.ongoing_ids.pop() if self.ongoing_ids else None
+        if task_id is None:
+            # Nothing left to complete; keep the request count honest
+            return self.op_create()
+        status, _ = self.transport.request('POST', f'/api/tasks/{task_id}/complete')
+        return 'POST /api/tasks/<id>/complete', status
+
+    def op_voice(self):
+        command = f"add task {SEED_TITLE_PREFIX}{self.choice(VERBS)} the {self.choice(NOUNS)} {self.choice(VOICE_WHEN)}"
+        status, content = self.transport.request('POST', '/api/voice-command', {'command': command})
+        self.remember(status, content, lambda data: data['task']['id'])
+        return 'POST /api/voice-command', status
+
+    def op_smart_voice(self):
+        text = f"I need to {self.choice(VERBS)} the {self.choice(NOUNS)} {self.choice(VOICE_WHEN)}"
+        return 'POST /api/smart-voice', self.transport.request('POST', '/api/smart-voice', {'voiceText': text})[0]
+
+    def remember(self, status, content, get_id):
+        if status == 201:
+            task_id = get_id(json.loads(content))
+            with self.ids_lock:
+                self.created_ids.append(task_id)
+                self.ongoing_ids.append(task_id)
+
+    def run_phase(self, total, concurrency):
+        """Runs `total` operations over `concurrency` threads; returns per-endpoint timings and wall time"""
+        results = {}
+        results_lock = threading.Lock()
+        remaining = [total]
+
+        def worker():
+            try:
+                while True:
+                    with results_lock:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                    operation = getattr(self, f'op_{self.pick_operation()}')
+                    start = time.perf_counter()
+                    try:
+                        endpoint, status = operation()
+                        failed = status >= 400
+                    except Exception as e:
+                        endpoint, failed = f'{operation.__name__} ({type(e).__name__})', True
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    with results_lock:
+                        timings, errors = results.setdefault(endpoint, ([], [0]))
+                        timings.append(elapsed_ms)
+                        errors[0] += failed
+            finally:
+                self.transport.close_thread()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - start
+
+    def cleanup(self, seeded):
+        removed = 0
+        for task_id in self.created_ids:
+            status, _ = self.transport.request('DELETE', f'/api/tasks/{task_id}')
+            removed += status < 400
+        self.stdout.write(f"Removed {removed} tasks created by the run")
+        if seeded:
+            self.stdout.write(f"Removed {remove_seeded_tasks()} seeded tasks")
+
+    def build_report(self, results, elapsed, target, options):
+        all_timings = [t for timings, _ in results.values() for t in timings]
+        return {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'target': target,
+            'database': settings.DATABASES['default']['ENGINE'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'mix': self.mix,
+            'gemini_latency_ms': None if options['url'] else options['gemini_latency_ms'],
+            'elapsed_s': round(elapsed, 3),
+            'total': summarize(all_timings, sum(errors[0] for _, errors in results.values()), elapsed),
+            'endpoints': {
+                endpoint: summarize(timings, errors[0], elapsed)
+                for endpoint, (timings, errors) in sorted(results.items())
+            },
+        }
+
+    def print_report(self, report):
+        self.stdout.write(f"{report['requests']} requests over {report['concurrency']} threads "
+                          f"in {report['elapsed_s']:.1f}s against {report['target']}")
+        self.stdout.write(f"{'endpoint':<32} {'count':>6} {'err':>4} {'req/s':>8} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for endpoint, row in [*report['endpoints'].items(), ('total', report['total'])]:
+            self.stdout.write(f"{endpoint:<32} {row['requests']:>6} {row['errors']:>4} {row['throughput_rps']:>8.1f} "
+                              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+    def print_comparison(self, report, path):
+        with open(path) as f:
+            baseline = json.load(f)
+        self.stdout.write(f"Change against {path} (p50 / p95 / p99):")
+        rows = [*report['endpoints'].items(), ('total', report['total'])]
+        for endpoint, row in rows:
+            before = baseline['total'] if endpoint == 'total' else baseline['endpoints'].get(endpoint)
+            if not before:
+                continue
+            changes = ' / '.join(
+                f"{(row[key] - before[key]) / before[key]:+.0%}" if before[key] else 'n/a'
+                for key in ('p50_ms', 'p95_ms', 'p99_ms')
+            )
+            self.stdout.write(f"  {endpoint:<32} {changes}")
+
+    def save_report(self, report, path):
+        if not path:
+            os.makedirs(os.path.join(settings.BASE_DIR, RESULTS_DIR), exist_ok=True)
+            path = os.path.join(settings.BASE_DIR, RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results saved to {path}"))
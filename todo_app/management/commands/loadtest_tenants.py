@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from todo_app.models import Task
+from todo_app.synthetic import seed_tasks
+from todo_app.views import dashboard_api
+
+TENANT_PREFIX = 'bench-tenant-'
+
+
+class Command(BaseCommand):
+    help = 'Seed many owners with skewed task counts and show per-owner dashboard latency tracks owner size, not table size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=50, help='Number of synthetic owners')
+        parser.add_argument('--tasks', type=int, default=200000, help='Total synthetic tasks, Zipf-distributed over owners')
+        parser.add_argument('--requests', type=int, default=30, help='Timed dashboard requests per measured owner')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic owners and their tasks afterwards')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        tenants = self.seed(User, options['tenants'], options['tasks'])
+        try:
+            self.run_benchmark(tenants, options['requests'])
+        finally:
+            if not options['keep']:
+                removed, _ = Task.objects.filter(owner__username__startswith=TENANT_PREFIX).delete()
+                # Archived tasks and rollups cascade with their owner
+                User.objects.filter(username__startswith=TENANT_PREFIX).delete()
+                self.stdout.write(f"Removed {removed} synthetic tasks and {len(tenants)} synthetic owners")
+
+    def seed(self, User, tenant_count, task_count):
+        # Zipf-like sizes: a few large owners and a long tail of small ones
+        weights = [1 / rank ** 1.1 for rank in range(1, tenant_count + 1)]
+        sizes = [max(1, int(task_count * weight / sum(weights))) for weight in weights]
+        tenants = []
+        for i, size in enumerate(sizes):
+            user, _ = User.objects.get_or_create(username=f'{TENANT_PREFIX}{i}')
+            seed_tasks(size, owner_id=user.pk)
+            tenants.append((user, size))
+        self.stdout.write(f"Seeded {sum(sizes)} tasks over {tenant_count} owners "
+                          f"(largest {sizes[0]}, smallest {sizes[-1]})")
+        return tenants
+
+    def run_benchmark(self, tenants, request_count):
+        factory = RequestFactory()
+        self.stdout.write(f"{Task.objects.count()} tasks in the table")
+        self.stdout.write(f"{'owner tasks':>12} {'p50 ms':>10} {'p95 ms':>10}")
+
+        # Largest, median and smallest owner
+        for user, size in (tenants[0], tenants[len(tenants) // 2], tenants[-1]):
+            timings = []
+            for _ in range(request_count):
+                request = factory.get('/api/dashboard')
+                request.user = user
+                start = time.perf_counter()
+                dashboard_api(request)
+                timings.append((time.perf_counter() - start) * 1000)
+            cuts = statistics.quantiles(timings, n=100)
+            self.stdout.write(f"{size:>12} {cuts[49]:>10.2f} {cuts[94]:>10.2f}")
@@ -0,0 +1,41 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from todo_app.synthetic import remove_seeded_tasks, seed_tasks
+
+
+class Command(BaseCommand):
+    help = 'Bulk-insert synthetic tasks with realistic status, deadline, text and risk distributions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, nargs='?', default=10000, help='Number of tasks to insert')
+        parser.add_argument('--owner', help='Username that owns the tasks (default: the shared workspace)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+        parser.add_argument('--random-seed', type=int, help='Seed for reproducible data')
+        parser.add_argument('--remove', action='store_true', help='Remove previously seeded tasks instead')
+
+    def handle(self, *args, **options):
+        if options['remove']:
+            self.stdout.write(f"Removed {remove_seeded_tasks()} seeded tasks")
+            return
+
+        owner_id = None
+        if options['owner']:
+            User = get_user_model()
+            try:
+                owner_id = User.objects.get(username=options['owner']).pk
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['owner']!r}")
+
+        start = time.perf_counter()
+        created = seed_tasks(
+            options['count'], batch_size=options['batch_size'], owner_id=owner_id,
+            rng=random.Random(options['random_seed']),
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {created} tasks in {elapsed:.1f}s ({created / max(elapsed, 1e-9):,.0f} rows/s)"
+        ))
@@ -1,6 +1,7 @@
-from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess, start_http_server
 import logging
 import errno
+import os
 
 # Initialize logger and state tracking
 logger = logging.getLogger(__name__)
@@ -18,23 +19,192 @@ JOB_FAILURE_COUNTER = Counter(
     'Total number of failed scheduler job executions',
     ['job_id']
 )
+# shard is 'all' for a whole job run, or the shard number for one shard of a sharded job
 JOB_DURATION_HISTOGRAM = Histogram(
     'scheduler_job_duration_seconds',
     'Duration of scheduler job executions in seconds',
-    ['job_id']
+    ['job_id', 'shard']
+)
+JOB_SHARD_LAG_GAUGE = Gauge(
+    'scheduler_job_shard_lag_seconds',
+    'Seconds since a shard of a sharded scheduler job last completed, measured when it is claimed',
+    ['job_id', 'shard'],
+    multiprocess_mode='livemax'
+)
+
+# multiprocess_mode only applies under PROMETHEUS_MULTIPROC_DIR: summed over live
+# processes, the leader gauge reads 1 when exactly one process leads
+SCHEDULER_LEADER_GAUGE = Gauge(
+    'scheduler_leader',
+    'Whether this process currently holds scheduler leadership (1) or not (0)',
+    multiprocess_mode='livesum'
+)
+SCHEDULER_LEADER_TRANSITIONS_COUNTER = Counter(
+    'scheduler_leader_transitions_total',
+    'Number of times this process gained or lost scheduler leadership',
+    ['transition']
+)
+
+# HTTP request metrics, recorded by middleware.RequestMetricsMiddleware.
+# route is the matched URL pattern (e.g. 'api/tasks/<uuid:task_id>') to keep label cardinality bounded
+HTTP_REQUEST_DURATION_HISTOGRAM = Histogram(
+    'http_request_duration_seconds',
+    'Latency of HTTP requests in seconds',
+    ['route', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+HTTP_RESPONSE_BYTES_HISTOGRAM = Histogram(
+    'http_response_bytes',
+    'Size of HTTP response bodies in bytes',
+    ['route', 'method'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+HTTP_DB_QUERIES_HISTOGRAM = Histogram(
+    'http_request_db_queries',
+    'Number of database queries executed per HTTP request',
+    ['route', 'method'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+HTTP_DB_DURATION_HISTOGRAM = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries per HTTP request in seconds',
+    ['route', 'method'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# Upstream Gemini API calls; outcome is 'success', 'error', 'invalid_response' or 'not_configured'
+GEMINI_CALL_HISTOGRAM = Histogram(
+    'gemini_call_duration_seconds',
+    'Latency of Gemini API calls in seconds',
+    ['outcome'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+)
+
+# Admission control in front of Gemini (see admission.py): time from asking for a
+# slot to being admitted or shed, and why calls were shed ('timeout', 'queue_full')
+GEMINI_ADMISSION_WAIT_HISTOGRAM = Histogram(
+    'gemini_admission_wait_seconds',
+    'Time Gemini calls waited for admission, by priority and outcome (admitted, shed)',
+    ['priority', 'outcome'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+)
+GEMINI_SHED_COUNTER = Counter(
+    'gemini_shed_total',
+    'Gemini calls shed to the local parser instead of calling the API',
+    ['priority', 'reason']
+)
+GEMINI_ADMISSION_GAUGE = Gauge(
+    'gemini_admission_calls',
+    'Gemini calls waiting for admission or in flight, by state (waiting, in_flight)',
+    ['state'],
+    multiprocess_mode='livesum'
+)
+
+# Streaming voice (/ws/voice): time from the final transcript to the structured result,
+# and whether the speculative Gemini call started during speech could be used
+VOICE_STREAM_RESULT_HISTOGRAM = Histogram(
+    'voice_stream_result_seconds',
+    'Time from the final transcript to the result on the voice WebSocket',
+    ['speculative'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
 )
+# outcome is 'hit' (its result was used) or 'miss' (the transcript changed or the client left)
+VOICE_STREAM_SPECULATION_COUNTER = Counter(
+    'voice_stream_speculative_calls_total',
+    'Speculative Gemini calls started on the voice WebSocket, by outcome',
+    ['outcome']
+)
+
+# Reminder delivery (see reminders.py): lag from remind_at to delivery, reminders handed
+# to each sink, and time per batch, which together give the delivery throughput
+REMINDER_LAG_HISTOGRAM = Histogram(
+    'reminder_delivery_lag_seconds',
+    'Time from a reminder being due to its delivery',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 3600)
+)
+REMINDER_DELIVERED_COUNTER = Counter(
+    'reminders_delivered_total',
+    'Reminders delivered, by sink',
+    ['sink']
+)
+REMINDER_BATCH_DURATION_HISTOGRAM = Histogram(
+    'reminder_batch_duration_seconds',
+    'Time to deliver one batch of reminders to every sink and mark it sent',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+# Log records dropped because the async logging queue was full
+LOG_RECORDS_DROPPED_COUNTER = Counter(
+    'log_records_dropped_total',
+    'Total number of log records dropped by the non-blocking log handler'
+)
+
+# Database connection pool, per alias; gauges are summed over live worker processes
+DB_POOL_CONNECTIONS_GAUGE = Gauge(
+    'db_pool_connections',
+    'Connections held by the pool, by state (in_use, idle) and limit (max)',
+    ['alias', 'state'],
+    multiprocess_mode='livesum'
+)
+DB_POOL_WAITING_GAUGE = Gauge(
+    'db_pool_waiting_requests',
+    'Threads currently waiting for a pooled connection',
+    ['alias'],
+    multiprocess_mode='livesum'
+)
+DB_POOL_CHECKOUTS_COUNTER = Counter(
+    'db_pool_checkouts_total',
+    'Connections handed out by the pool',
+    ['alias']
+)
+DB_POOL_QUEUED_COUNTER = Counter(
+    'db_pool_queued_checkouts_total',
+    'Checkouts that had to wait because no connection was idle',
+    ['alias']
+)
+DB_POOL_WAIT_SECONDS_COUNTER = Counter(
+    'db_pool_wait_seconds_total',
+    'Total time spent waiting for a pooled connection',
+    ['alias']
+)
+DB_POOL_ERRORS_COUNTER = Counter(
+    'db_pool_checkout_errors_total',
+    'Checkouts that failed, e.g. timed out waiting for a connection',
+    ['alias']
+)
+DB_POOL_BAD_RETURNS_COUNTER = Counter(
+    'db_pool_bad_returns_total',
+    'Connections found broken when returned to the pool or by a health check',
+    ['alias']
+)
+
 
+def multiprocess_enabled():
+    """True when prometheus_client writes metrics to shared files in PROMETHEUS_MULTIPROC_DIR"""
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
 
-def start_metrics_server(port: int = 9090):
+
+def start_metrics_server(port: int = 9090, aggregate: bool = False):
     """
     Start Prometheus HTTP metrics server on given port.
+
+    In multiprocess mode (PROMETHEUS_MULTIPROC_DIR set, e.g. by gunicorn.conf.py)
+    each worker only writes its metric files; a single exporter started with
+    aggregate=True, normally in the gunicorn master, serves the sum over all
+    processes, and calls from workers are no-ops.
     """
     global _started_ports
+    registry = REGISTRY
+    if multiprocess_enabled():
+        if not aggregate:
+            return
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
     # Avoid restarting on the same port
     if port in _started_ports:
         return
     try:
-        start_http_server(port)
+        start_http_server(port, registry=registry)
         _started_ports.add(port)
     except OSError as e:
         if e.errno == errno.EADDRINUSE:
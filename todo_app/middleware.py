@@ -0,0 +1,239 @@
+import hmac
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from rest_framework.authtoken.models import Token
+
+try:
+    import brotli
+except ImportError:  # Optional: without it, responses are only gzipped
+    brotli = None
+
+from .db_pool import start_pool_metrics
+from .db_router import (
+    DEFAULT_READ_YOUR_WRITES_SECONDS,
+    PRIMARY_PIN_COOKIE,
+    get_replica_aliases,
+    start_routing,
+    stop_routing,
+)
+from .metrics import (
+    HTTP_DB_DURATION_HISTOGRAM,
+    HTTP_DB_QUERIES_HISTOGRAM,
+    HTTP_REQUEST_DURATION_HISTOGRAM,
+    HTTP_RESPONSE_BYTES_HISTOGRAM,
+    start_metrics_server,
+)
+from .profiling import add_span_time, save_profile, span, start_profiler, start_recording, stop_recording
+from .wire import MEDIA_TYPES, accepted_values
+
+DEFAULT_COMPRESSION_MIN_BYTES = 1024
+# Quality 4 of 11 compresses about as fast as gzip and still smaller
+BROTLI_QUALITY = 4
+COMPRESSIBLE_TYPES = {'application/json', *MEDIA_TYPES.values()}
+
+
+class QueryTimer:
+    """connection.execute_wrapper() hook counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.duration += elapsed
+            self.count += 1
+            add_span_time('db', elapsed)
+
+
+def get_route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else 'unmatched'
+
+
+class RequestMetricsMiddleware:
+    """
+    Records Prometheus latency, response size and DB query metrics for every request.
+
+    Place it first in MIDDLEWARE so the latency covers the whole middleware stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Every serving process exports its metrics, not only the scheduler's
+        start_metrics_server(getattr(settings, 'METRICS_PORT', 8080))
+        start_pool_metrics()
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        route, method = get_route(request), request.method
+        HTTP_REQUEST_DURATION_HISTOGRAM.labels(route, method, str(response.status_code)).observe(duration)
+        HTTP_DB_QUERIES_HISTOGRAM.labels(route, method).observe(timer.count)
+        HTTP_DB_DURATION_HISTOGRAM.labels(route, method).observe(timer.duration)
+        if not response.streaming:
+            HTTP_RESPONSE_BYTES_HISTOGRAM.labels(route, method).observe(len(response.content))
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a Server-Timing header (db, serialize, ai-scoring, gemini, total) to API
+    responses, and captures a cProfile of a sample of requests.
+
+    Profiling is opt-in: PROFILE_SAMPLE_RATE profiles that fraction of requests,
+    and a request whose X-Profile-Token header matches PROFILE_TOKEN is always
+    profiled. Only the PROFILE_KEEP slowest profiles are kept in PROFILE_DIR.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        profiler = start_profiler() if self.should_profile(request) else None
+        token = start_recording()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - start
+            recorder = stop_recording(token)
+            if profiler is not None:
+                profiler.disable()
+
+        if profiler is not None:
+            save_profile(profiler, get_route(request), duration)
+        if getattr(settings, 'SERVER_TIMING_ENABLED', True):
+            response['Server-Timing'] = recorder.header_value(duration)
+            # Lets the cross-origin frontend read the timings in the browser's dev tools
+            response['Timing-Allow-Origin'] = '*'
+        return response
+
+    def should_profile(self, request):
+        profile_token = getattr(settings, 'PROFILE_TOKEN', '')
+        header_token = request.headers.get('X-Profile-Token', '')
+        if profile_token and header_token and hmac.compare_digest(header_token, profile_token):
+            return True
+        sample_rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+        return sample_rate > 0 and random.random() < sample_rate
+
+
+class CompressionMiddleware:
+    """
+    Compresses API responses of at least COMPRESSION_MIN_BYTES with Brotli
+    (if the optional brotli package is installed) or gzip, whichever the
+    client's Accept-Encoding allows. Smaller responses are sent as they are:
+    there the CPU time costs more than the bytes save.
+
+    Place it after ServerTimingMiddleware, so the time shows up as `compress`,
+    and after RequestMetricsMiddleware, so response sizes are the compressed ones.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = getattr(settings, 'COMPRESSION_MIN_BYTES', DEFAULT_COMPRESSION_MIN_BYTES)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in COMPRESSIBLE_TYPES or response.streaming:
+            return response
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if len(response.content) < self.min_bytes or response.has_header('Content-Encoding'):
+            return response
+
+        accepted = accepted_values(request.headers.get('Accept-Encoding', ''))
+        with span('compress'):
+            if brotli is not None and 'br' in accepted:
+                encoding, content = 'br', brotli.compress(response.content, quality=BROTLI_QUALITY)
+            elif 'gzip' in accepted:
+                # compress_string pads the gzip header randomly, against BREACH
+                encoding, content = 'gzip', compress_string(response.content, max_random_bytes=100)
+            else:
+                return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # The ETag was computed on the uncompressed body
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets read-only requests read from DATABASE_REPLICAS (see db_router.ReplicaRouter).
+
+    Read-your-writes: a request that writes sets a short-lived cookie, and the
+    same client keeps reading from the primary until it expires, which should
+    outlast the replication lag.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_replica_aliases():
+            return self.get_response(request)
+
+        use_replicas = request.method in self.SAFE_METHODS and PRIMARY_PIN_COOKIE not in request.COOKIES
+        token = start_routing(use_replicas)
+        try:
+            response = self.get_response(request)
+        finally:
+            state = stop_routing(token)
+
+        if state.wrote:
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE, '1',
+                max_age=getattr(settings, 'READ_YOUR_WRITES_SECONDS', DEFAULT_READ_YOUR_WRITES_SECONDS),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class ApiTokenMiddleware:
+    """
+    Authenticates `Authorization: Token <key>` requests (rest_framework.authtoken
+    keys) as the token's user, for API clients without a session.
+
+    Place it after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+        if keyword == 'Token':
+            token = Token.objects.select_related('user').filter(key=key.strip()).first()
+            if token is None or not token.user.is_active:
+                return JsonResponse({'error': 'Invalid token'}, status=401)
+            request.user = token.user
+        return self.get_response(request)
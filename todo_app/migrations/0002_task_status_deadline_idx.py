@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'deadline', 'id'], name='task_status_deadline_idx'),
+        ),
+    ]
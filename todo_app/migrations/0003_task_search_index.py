@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from todo_app.search import install_search_index, uninstall_search_index
+
+
+def forwards(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index over title and description: a generated tsvector column
+    with a GIN index on PostgreSQL, an FTS5 table with triggers on SQLite.
+    """
+
+    dependencies = [
+        ('todo_app', '0002_task_status_deadline_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
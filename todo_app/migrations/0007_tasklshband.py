@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:46
+
+import hashlib
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of the todo_app.dedup hashing as it was when this migration was
+# written, so later changes to dedup.py cannot alter or break the backfill.
+# Bands written with a different layout are replaced by rebuild_duplicate_index.
+NUM_PERM = 60
+BANDS = 20
+ROWS = NUM_PERM // BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % (_MERSENNE_PRIME - 1) + 1,
+     int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+]
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+IGNORED_WORDS = frozenset('''
+    a an the to of for on at by in and or my our with about please
+    remind me i need create add new task
+    today tonight tomorrow next week weeks day days hour hours minute minutes month
+    monday tuesday wednesday thursday friday saturday sunday am pm morning afternoon evening
+'''.split())
+
+
+def tokenize(title, description=''):
+    text = f"{title} {description or ''}".lower()
+    return {word for word in _WORD_RE.findall(text) if word not in IGNORED_WORDS and not word.isdigit()}
+
+
+def band_keys(tokens):
+    if not tokens:
+        return []
+    hashes = [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), 'big') for token in tokens]
+    signature = [min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH for a, b in _PERMUTATIONS]
+    keys = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr((band, values)).encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def index_ongoing_tasks(apps, schema_editor):
+    Task = apps.get_model('todo_app', 'Task')
+    TaskLshBand = apps.get_model('todo_app', 'TaskLshBand')
+    tasks = Task.objects.filter(status='ongoing').only('id', 'owner_id', 'title', 'description')
+    batch = []
+    for task in tasks.iterator(chunk_size=2000):
+        batch.extend(
+            TaskLshBand(task_id=task.pk, owner_id=task.owner_id, key=key)
+            for key in band_keys(tokenize(task.title, task.description))
+        )
+        if len(batch) >= 5000:
+            TaskLshBand.objects.bulk_create(batch)
+            batch = []
+    TaskLshBand.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0006_task_owner'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskLshBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('owner', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_bands', to='todo_app.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'key'], name='task_lsh_owner_key_idx')],
+            },
+        ),
+        migrations.RunPython(index_ongoing_tasks, migrations.RunPython.noop),
+    ]
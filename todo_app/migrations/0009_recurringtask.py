@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:58
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0008_task_owner_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='occurrence',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='RecurringTask',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('estimated_duration', models.IntegerField(default=60)),
+                ('complexity_score', models.IntegerField(default=50)),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], max_length=10)),
+                ('interval', models.PositiveIntegerField(default=1)),
+                ('weekdays', models.CharField(blank=True, default='', max_length=20)),
+                ('dtstart', models.DateTimeField()),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('time_zone', models.CharField(default='UTC', max_length=64)),
+                ('next_occurrence', models.DateTimeField(blank=True, null=True)),
+                ('success_count', models.BigIntegerField(default=0)),
+                ('failure_count', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recurring_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_occurrences', to='todo_app.recurringtask'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='series',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='todo_app.recurringtask'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence'), name='unique_series_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringtask',
+            index=models.Index(fields=['next_occurrence'], name='recurring_next_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringtask',
+            index=models.Index(fields=['owner', 'next_occurrence'], name='recurring_owner_next_idx'),
+        ),
+    ]
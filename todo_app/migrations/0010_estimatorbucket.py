@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0009_recurringtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstimatorBucket',
+            fields=[
+                ('bucket', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('duration_count', models.BigIntegerField(default=0)),
+                ('duration_sum', models.FloatField(default=0.0)),
+                ('duration_sq_sum', models.FloatField(default=0.0)),
+                ('outcome_count', models.BigIntegerField(default=0)),
+                ('failure_count', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0013_task_scored_at'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='estimatorbucket',
+            name='failure_count',
+        ),
+        migrations.RemoveField(
+            model_name='estimatorbucket',
+            name='outcome_count',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:31
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_shared_rollups(apps, schema_editor):
+    """Fold duplicate shared-workspace rows, left by concurrent archivers, into the oldest one"""
+    TaskHistoryRollup = apps.get_model('todo_app', 'TaskHistoryRollup')
+    rollups = list(TaskHistoryRollup.objects.filter(owner__isnull=True).order_by('id'))
+    if len(rollups) < 2:
+        return
+    kept, duplicates = rollups[0], rollups[1:]
+    for rollup in duplicates:
+        kept.success_count += rollup.success_count
+        kept.failure_count += rollup.failure_count
+        kept.success_seconds_total += rollup.success_seconds_total
+    kept.save()
+    TaskHistoryRollup.objects.filter(id__in=[rollup.id for rollup in duplicates]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0014_remove_estimatorbucket_outcomes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_shared_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='taskhistoryrollup',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('owner', models.Value(0)), name='unique_rollup_owner_or_shared'),
+        ),
+    ]
@@ -1,8 +1,13 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
+from datetime import timedelta, timezone as dt_timezone
 import uuid
 
+from .profiling import timed_span
+
 class Task(models.Model):
     STATUS_CHOICES = [
         ('ongoing', 'Ongoing'),
@@ -11,6 +16,11 @@ class Task(models.Model):
     ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # None is the shared workspace of unauthenticated clients
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+        related_name='tasks', db_index=False  # covered by the owner-led indexes below
+    )
     title = models.CharField(max_length=200)
     description = models.TextField(null=True, blank=True)
     deadline = models.DateTimeField()
@@ -21,11 +31,22 @@ class Task(models.Model):
     estimated_duration = models.IntegerField(default=60)  # minutes
     complexity_score = models.IntegerField(default=50)  # 0-100
     risk_score = models.FloatField(default=0.5)  # 0-1 probability
+    # Set when the scheduler rescores the task, which leaves updated_at alone
+    scored_at = models.DateTimeField(null=True, blank=True)
+
+    # Set on occurrences materialized from a RecurringTask (see recurrence.py);
+    # `occurrence` is the scheduled deadline, kept if the deadline is moved
+    series = models.ForeignKey(
+        'RecurringTask', null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='occurrences', db_index=False  # covered by unique_series_occurrence
+    )
+    occurrence = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.title
 
-    def to_dict(self):
+    @timed_span('serialize')
+    def to_dict(self, now=None):
         return {
             'id': str(self.id),
             'title': self.title,
@@ -34,18 +55,19 @@ class Task(models.Model):
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'time_remaining': self.get_time_remaining(),
+            'time_remaining': self.get_time_remaining(now),
             'estimated_duration': self.estimated_duration,
             'complexity_score': self.complexity_score,
             'risk_score': self.risk_score,
             'risk_level': self.get_risk_level(),
-            'completion_probability': round((1 - self.risk_score) * 100, 1) if self.risk_score is not None else None
+            'completion_probability': round((1 - self.risk_score) * 100, 1) if self.risk_score is not None else None,
+            'series_id': str(self.series_id) if self.series_id else None
         }
 
-    def get_time_remaining(self):
+    def get_time_remaining(self, now=None):
         if not self.deadline:
             return "N/A"
-        now = timezone.now() # Use timezone.now() for timezone-aware comparison
+        now = now or timezone.now() # Use timezone.now() for timezone-aware comparison
         if self.deadline > now:
             diff = self.deadline - now
             days = diff.days
@@ -72,4 +94,219 @@ class Task(models.Model):
             return 'low'
 
     class Meta:
-        ordering = ['deadline'] # Default ordering for tasks
\ No newline at end of file
+        ordering = ['deadline'] # Default ordering for tasks
+        indexes = [
+            # Per-owner queries: keyset pagination of each status bucket (see pagination.py),
+            # history counts and expiry of one owner's overdue tasks
+            models.Index(fields=['owner', 'status', 'deadline', 'id'], name='task_owner_status_deadline_idx'),
+            # Scheduler sweeps across every owner
+            models.Index(fields=['status', 'deadline', 'id'], name='task_status_deadline_idx'),
+            # Incremental plan sync: one owner's rows changed since the last sync (see planning.py)
+            models.Index(fields=['owner', 'updated_at'], name='task_owner_updated_idx'),
+            models.Index(fields=['owner', 'scored_at'], name='task_owner_scored_idx'),
+            # Admin changelist order across every owner (see TaskAdmin.ordering)
+            models.Index(fields=['deadline', 'id'], name='task_deadline_idx'),
+        ]
+        constraints = [
+            # Lets materialization be retried without creating an occurrence twice
+            models.UniqueConstraint(fields=['series', 'occurrence'], name='unique_series_occurrence'),
+        ]
+
+class ArchivedTask(models.Model):
+    """Terminal task moved out of the live Task table by the archive job"""
+    id = models.UUIDField(primary_key=True, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='archived_tasks'
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(null=True, blank=True)
+    deadline = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    estimated_duration = models.IntegerField(default=60)
+    complexity_score = models.IntegerField(default=50)
+    risk_score = models.FloatField(default=0.5)
+    series = models.ForeignKey(
+        'RecurringTask', null=True, blank=True, on_delete=models.SET_NULL, related_name='archived_occurrences'
+    )
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        ordering = ['-updated_at']
+
+
+class TaskHistoryRollup(models.Model):
+    """
+    Running totals carried forward from archived tasks, so history
+    statistics stay correct after the rows leave the Task table. One row per owner.
+    """
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='task_history_rollup'
+    )
+    success_count = models.BigIntegerField(default=0)
+    failure_count = models.BigIntegerField(default=0)
+    # Sum of (updated_at - created_at) over archived successful tasks
+    success_seconds_total = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def load(cls, owner_id=None):
+        """Return the owner's rollup row, or an unsaved zeroed one if nothing of theirs is archived yet"""
+        return cls.objects.filter(owner_id=owner_id).first() or cls(owner_id=owner_id)
+
+    @property
+    def total_count(self):
+        return self.success_count + self.failure_count
+
+    class Meta:
+        constraints = [
+            # The OneToOne's unique index lets any number of NULL owners through;
+            # this keeps the shared workspace to a single row too
+            models.UniqueConstraint(Coalesce('owner', Value(0)), name='unique_rollup_owner_or_shared'),
+        ]
+
+
+class ShardLease(models.Model):
+    """Claim on one shard of a sharded scheduler job, so each shard runs in one worker at a time"""
+    job_id = models.CharField(max_length=100)
+    shard = models.IntegerField()
+    owner = models.CharField(max_length=200, blank=True, default='')
+    leased_until = models.DateTimeField(null=True, blank=True)
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.job_id}[{self.shard}]"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job_id', 'shard'], name='unique_job_shard'),
+        ]
+
+
+class TaskLshBand(models.Model):
+    """One MinHash band of an ongoing task, for near-duplicate lookups (see dedup.py)"""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='lsh_bands')
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+        related_name='+', db_index=False  # covered by task_lsh_owner_key_idx
+    )
+    key = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'key'], name='task_lsh_owner_key_idx'),
+        ]
+
+
+class RecurringTask(models.Model):
+    """
+    Template and rule (an RRULE subset, see recurrence.py) of a recurring task.
+    Only the occurrences due within RECURRENCE_WINDOW_DAYS exist as Task rows;
+    later ones are computed from the rule when read.
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+        related_name='recurring_tasks', db_index=False  # covered by recurring_owner_next_idx
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(null=True, blank=True)
+    estimated_duration = models.IntegerField(default=60)  # minutes
+    complexity_score = models.IntegerField(default=50)  # 0-100
+
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveIntegerField(default=1)
+    weekdays = models.CharField(max_length=20, blank=True, default='')  # BYDAY of weekly rules, e.g. 'MO,WE'
+    dtstart = models.DateTimeField()  # deadline of the first occurrence
+    until = models.DateTimeField(null=True, blank=True)
+    time_zone = models.CharField(max_length=64, default='UTC')  # occurrences keep their wall-clock time here
+    # First occurrence not yet materialized; None once the series has ended
+    next_occurrence = models.DateTimeField(null=True, blank=True)
+
+    # Outcomes of archived occurrences (see archive.py); live ones are counted from Task
+    success_count = models.BigIntegerField(default=0)
+    failure_count = models.BigIntegerField(default=0)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
+
+    def get_rule(self):
+        parts = [f'FREQ={self.frequency.upper()}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.weekdays:
+            parts.append(f'BYDAY={self.weekdays}')
+        if self.until:
+            parts.append(f"UNTIL={self.until.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')}")
+        return ';'.join(parts)
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'title': self.title,
+            'description': self.description,
+            'rule': self.get_rule(),
+            'start': self.dtstart.isoformat(),
+            'until': self.until.isoformat() if self.until else None,
+            'timezone': self.time_zone,
+            'next_occurrence': self.next_occurrence.isoformat() if self.next_occurrence else None,
+            'estimated_duration': self.estimated_duration,
+            'complexity_score': self.complexity_score,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Materialization job: series with occurrences entering the window
+            models.Index(fields=['next_occurrence'], name='recurring_next_idx'),
+            # Calendar reads of one owner's upcoming occurrences
+            models.Index(fields=['owner', 'next_occurrence'], name='recurring_owner_next_idx'),
+        ]
+
+
+class EstimatorBucket(models.Model):
+    """
+    One row of the hashed bag-of-words table behind estimator.estimate_task:
+    running sums over the successful tasks containing a token that hashes here.
+    """
+    bucket = models.PositiveIntegerField(primary_key=True)
+    # log(minutes from creation to success), over successful tasks
+    duration_count = models.BigIntegerField(default=0)
+    duration_sum = models.FloatField(default=0.0)
+    duration_sq_sum = models.FloatField(default=0.0)
+
+
+class Reminder(models.Model):
+    """A notification due `offset` before its task's deadline (see reminders.py)"""
+    task = models.ForeignKey(
+        Task, on_delete=models.CASCADE, related_name='reminders',
+        db_index=False  # covered by unique_task_reminder_offset
+    )
+    offset = models.DurationField()
+    # deadline - offset, kept in step with the deadline so due reminders are an index range
+    remind_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Only unsent reminders are indexed, so the index stays as small as the backlog
+            models.Index(fields=['remind_at'], name='reminder_due_idx', condition=Q(sent_at__isnull=True)),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'offset'], name='unique_task_reminder_offset'),
+        ]
@@ -0,0 +1,56 @@
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from rest_framework.authtoken.models import Token
+
+from .models import Task
+
+
+def get_owner_id(request):
+    """
+    Id of the user whose tasks the request works on: the session user, or the
+    user of an `Authorization: Token <key>` header (see ApiTokenMiddleware).
+    None is the shared workspace of unauthenticated clients.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    return None
+
+
+def owned_tasks(request):
+    """Task queryset scoped to the request's owner; every per-owner index leads with owner"""
+    return Task.objects.filter(owner_id=get_owner_id(request))
+
+
+class InvalidCredentials(Exception):
+    pass
+
+
+def get_scope_owner_id(scope):
+    """
+    get_owner_id() for an ASGI WebSocket scope, which Django's middleware
+    never sees. Browsers can't set headers on a WebSocket, so an API token
+    comes as the `token` query parameter; otherwise the session cookie is used.
+
+    Raises InvalidCredentials for an unknown token or inactive user.
+    """
+    token_key = parse_qs(scope.get('query_string', b'').decode()).get('token', [''])[0]
+    if token_key:
+        token = Token.objects.select_related('user').filter(key=token_key).first()
+        if token is None or not token.user.is_active:
+            raise InvalidCredentials('Invalid token')
+        return token.user.pk
+
+    headers = dict(scope.get('headers', []))
+    cookies = SimpleCookie(headers.get(b'cookie', b'').decode('latin-1'))
+    session_cookie = cookies.get(settings.SESSION_COOKIE_NAME)
+    if session_cookie is None:
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_cookie.value)
+    user = get_user(SimpleNamespace(session=session))
+    return user.pk if user.is_authenticated else None
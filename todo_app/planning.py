@@ -0,0 +1,272 @@
+import bisect
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task
+
+DEFAULT_HOURS_PER_DAY = 8
+DEFAULT_DAY_START_HOUR = 9
+DEFAULT_PLAN_LIMIT = 100
+MAX_PLAN_LIMIT = 1000
+
+# Rows updated or rescored this long before the last sync started are fetched
+# again, for transactions that committed after it with an earlier timestamp
+SYNC_OVERLAP = timedelta(seconds=30)
+
+PLAN_FIELDS = ('id', 'title', 'deadline', 'estimated_duration', 'risk_score')
+
+
+class InvalidPlanOptions(ValueError):
+    """Raised for unusable plan query parameters"""
+
+
+class WorkCalendar:
+    """
+    Working time as one daily window of `hours_per_day` hours from
+    `day_start_hour` in `tz`. Instants map to minutes of working time since
+    midnight of `origin`'s day, so the working time between two instants is a
+    subtraction.
+    """
+
+    def __init__(self, origin, hours_per_day, day_start_hour, tz):
+        self.tz = tz
+        self.window = int(hours_per_day * 60)
+        self.start = int(day_start_hour * 60)
+        self.base_date = origin.astimezone(tz).date()
+
+    def to_work_minutes(self, instant):
+        local = instant.astimezone(self.tz)
+        days = (local.date() - self.base_date).days
+        minute_of_day = local.hour * 60 + local.minute + local.second / 60
+        return days * self.window + min(max(minute_of_day - self.start, 0), self.window)
+
+    def to_instant(self, work_minutes, end=False):
+        """Inverse of to_work_minutes; with end=True a day boundary maps to the earlier day's close"""
+        days, minute = divmod(work_minutes, self.window) if self.window else (0, 0)
+        if end and minute == 0 and days > 0:
+            days, minute = days - 1, self.window
+        day = self.base_date + timedelta(days=int(days))
+        local = datetime.combine(day, dt_time(), tzinfo=self.tz) + timedelta(minutes=self.start + minute)
+        return local.astimezone(dt_timezone.utc)
+
+
+class PlanItem:
+    __slots__ = ('id', 'title', 'deadline', 'duration', 'risk_score', 'key')
+
+    def __init__(self, row):
+        self.id = str(row['id'])
+        self.title = row['title']
+        self.deadline = row['deadline']
+        self.duration = max(1, row['estimated_duration'] or 1)
+        self.risk_score = row['risk_score'] if row['risk_score'] is not None else 0.5
+        self.key = (self.deadline, self.id)
+
+    def weight(self):
+        # Tasks more likely to fail are worth protecting first
+        return 0.5 + self.risk_score
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'deadline': self.deadline.isoformat(),
+            'estimated_duration': self.duration,
+            'risk_score': self.risk_score,
+        }
+
+
+def build_plan(items, now, calendar):
+    """
+    Schedule `items` (sorted by deadline) back to back in working time from `now`.
+
+    Moore-Hodgson: walk the tasks in earliest-deadline-first order and,
+    whenever the running total misses the current deadline, drop the
+    scheduled tasks with the most minutes per unit of weight. What remains
+    meets every deadline in EDF order; the dropped tasks are reported as late.
+    O(n log n) in the number of tasks.
+
+    Returns (schedule, late): (item, start, end, slack) tuples in working
+    minutes, and (item, reason, available minutes) tuples.
+    """
+    now_minutes = calendar.to_work_minutes(now)
+    # Working minutes between now and each deadline
+    available = [calendar.to_work_minutes(item.deadline) - now_minutes for item in items]
+
+    elapsed = 0
+    heap = []
+    dropped = set()
+    for index, item in enumerate(items):
+        heapq.heappush(heap, (-item.duration / item.weight(), index))
+        elapsed += item.duration
+        # With weights the dropped task can be shorter than the one just
+        # added, so keep dropping until the deadline is met again
+        while elapsed > available[index]:
+            _, worst = heapq.heappop(heap)
+            dropped.add(worst)
+            elapsed -= items[worst].duration
+
+    # Plain tuples: get_plan serializes only the page it returns
+    schedule, late = [], []
+    cursor = 0
+    for index, item in enumerate(items):
+        if index in dropped:
+            late.append((item, 'too_long' if item.duration > available[index] else 'conflict', available[index]))
+            continue
+        start, cursor = cursor, cursor + item.duration
+        schedule.append((item, now_minutes + start, now_minutes + cursor, available[index] - cursor))
+    return schedule, late
+
+
+class OwnerPlanState:
+    """One owner's ongoing tasks, kept sorted by deadline and synced with the database by deltas"""
+
+    def __init__(self):
+        self.items = []  # sorted by PlanItem.key
+        self.by_id = {}
+        self.synced_at = None  # start of the last sync
+        self.version = 0
+        self.result_key = None
+        self.result = None
+        self.lock = threading.Lock()
+
+    def remove(self, task_id):
+        item = self.by_id.pop(task_id)
+        del self.items[bisect.bisect_left(self.items, item.key, key=lambda i: i.key)]
+
+    def upsert(self, row):
+        """Insert or replace a task; returns False when nothing the plan uses changed"""
+        item = PlanItem(row)
+        existing = self.by_id.get(item.id)
+        if existing is not None:
+            if (existing.title, existing.key, existing.duration, existing.risk_score) == \
+                    (item.title, item.key, item.duration, item.risk_score):
+                return False
+            self.remove(item.id)
+        bisect.insort(self.items, item, key=lambda i: i.key)
+        self.by_id[item.id] = item
+        return True
+
+    def sync(self, owner_id):
+        """
+        Apply what changed since the last sync: rows of the owner updated or
+        rescored since then (any status, so completed tasks drop out), then a full id
+        reconciliation only if the ongoing count still disagrees, which is
+        what a hard delete leaves behind. The first sync loads everything.
+        """
+        tasks = Task.objects.filter(owner_id=owner_id)
+        started_at = timezone.now()
+        changed = False
+        if self.synced_at is None:
+            rows = list(tasks.filter(status='ongoing').values(*PLAN_FIELDS, 'status'))
+        else:
+            since = self.synced_at - SYNC_OVERLAP
+            rows = list(
+                tasks.filter(Q(updated_at__gt=since) | Q(scored_at__gt=since)).values(*PLAN_FIELDS, 'status')
+            )
+
+        for row in rows:
+            if row['status'] == 'ongoing':
+                changed = self.upsert(row) or changed
+            elif str(row['id']) in self.by_id:
+                self.remove(str(row['id']))
+                changed = True
+        self.synced_at = started_at
+
+        ongoing = tasks.filter(status='ongoing')
+        if ongoing.count() != len(self.by_id):
+            current_ids = {str(task_id) for task_id in ongoing.values_list('id', flat=True)}
+            for task_id in self.by_id.keys() - current_ids:
+                self.remove(task_id)
+            missing = current_ids - self.by_id.keys()
+            for row in ongoing.filter(id__in=missing).values(*PLAN_FIELDS):
+                self.upsert(row)
+            changed = True
+        if changed:
+            self.version += 1
+
+
+class PlanCache:
+    """Per-process plan state of the most recently planned owners"""
+
+    def __init__(self, max_owners):
+        self.max_owners = max_owners
+        self.states = OrderedDict()
+        self.lock = threading.Lock()
+
+    def state_for(self, owner_id):
+        with self.lock:
+            state = self.states.pop(owner_id, None) or OwnerPlanState()
+            self.states[owner_id] = state
+            while len(self.states) > self.max_owners:
+                self.states.popitem(last=False)
+            return state
+
+
+_cache = PlanCache(getattr(settings, 'PLAN_CACHE_OWNERS', 256))
+
+
+def parse_plan_options(params):
+    """hours, start, tz and limit query parameters, with defaults from settings"""
+    try:
+        hours = float(params.get('hours') or getattr(settings, 'PLAN_HOURS_PER_DAY', DEFAULT_HOURS_PER_DAY))
+        start = float(params.get('start') or getattr(settings, 'PLAN_DAY_START_HOUR', DEFAULT_DAY_START_HOUR))
+        limit = int(params.get('limit') or DEFAULT_PLAN_LIMIT)
+    except ValueError:
+        raise InvalidPlanOptions('hours, start and limit must be numbers')
+    if not 0 < hours <= 24 or not 0 <= start or start + hours > 24:
+        raise InvalidPlanOptions('The working window (start, start + hours) must fit in one day')
+    if limit < 1:
+        raise InvalidPlanOptions('limit must be positive')
+    try:
+        tz = ZoneInfo(params.get('tz') or settings.TIME_ZONE)
+    except (ValueError, ZoneInfoNotFoundError):
+        raise InvalidPlanOptions('Unknown time zone')
+    return {'hours_per_day': hours, 'day_start_hour': start, 'tz': tz, 'limit': min(limit, MAX_PLAN_LIMIT)}
+
+
+def get_plan(owner_id, hours_per_day, day_start_hour, tz, limit, now=None):
+    """
+    The owner's plan, recomputed only when one of their ongoing tasks changed,
+    the minute changed, or the options differ from the last call.
+    """
+    now = (now or timezone.now()).replace(second=0, microsecond=0)
+    state = _cache.state_for(owner_id)
+    with state.lock:
+        state.sync(owner_id)
+        key = (state.version, now, hours_per_day, day_start_hour, tz.key)
+        calendar = WorkCalendar(now, hours_per_day, day_start_hour, tz)
+        if state.result_key != key:
+            # Overdue tasks are about to be expired, so they aren't planned
+            state.result = build_plan([item for item in state.items if item.deadline > now], now, calendar)
+            state.result_key = key
+        schedule, late = state.result
+
+    return {
+        'generated_at': now.isoformat(),
+        'hours_per_day': hours_per_day,
+        'day_start_hour': day_start_hour,
+        'timezone': tz.key,
+        'scheduled_count': len(schedule),
+        'late_count': len(late),
+        'planned_minutes': sum(item.duration for item, *_ in schedule),
+        'schedule': [
+            {
+                'task': item.to_dict(),
+                'start': calendar.to_instant(start).isoformat(),
+                'end': calendar.to_instant(end, end=True).isoformat(),
+                'slack_minutes': round(slack),
+            }
+            for item, start, end, slack in schedule[:limit]
+        ],
+        'late': [
+            {'task': item.to_dict(), 'reason': reason, 'available_minutes': round(max(available, 0))}
+            for item, reason, available in late[:limit]
+        ],
+    }
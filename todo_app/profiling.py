@@ -0,0 +1,116 @@
+import cProfile
+import functools
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+DEFAULT_PROFILE_KEEP = 20
+
+_recorder = ContextVar('todo_app_span_recorder', default=None)
+
+
+class SpanRecorder:
+    """Total time per named phase for the current request"""
+
+    def __init__(self):
+        self.totals = {}
+        self._active = set()
+
+    def add(self, name, seconds):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    def header_value(self, total_seconds):
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.totals.items()]
+        entries.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ', '.join(entries)
+
+
+def start_recording():
+    return _recorder.set(SpanRecorder())
+
+
+def stop_recording(token):
+    recorder = _recorder.get()
+    _recorder.reset(token)
+    return recorder
+
+
+def add_span_time(name, seconds):
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add(name, seconds)
+
+
+@contextmanager
+def span(name):
+    """
+    Time a named phase of the current request for the Server-Timing header.
+
+    A no-op outside a request; nested spans with the same name count once.
+    """
+    recorder = _recorder.get()
+    if recorder is None or name in recorder._active:
+        yield
+        return
+    recorder._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder._active.discard(name)
+        recorder.add(name, time.perf_counter() - start)
+
+
+def timed_span(name):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_profile_dir():
+    return getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+def save_profile(profiler, route, duration):
+    """
+    Keep the profile if it is among the PROFILE_KEEP slowest on disk.
+
+    File names start with the zero-padded duration in microseconds, so sorting
+    them by name orders them by duration.
+    """
+    directory = get_profile_dir()
+    keep = getattr(settings, 'PROFILE_KEEP', DEFAULT_PROFILE_KEEP)
+    os.makedirs(directory, exist_ok=True)
+    existing = sorted(name for name in os.listdir(directory) if name.endswith('.prof'))
+    prefix = f"{int(duration * 1_000_000):012d}"
+    if len(existing) >= keep and prefix <= existing[0][:12]:
+        return None
+
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+    path = os.path.join(directory, f"{prefix}-{slug}-{int(time.time())}.prof")
+    profiler.dump_stats(path)
+    for name in sorted(existing + [os.path.basename(path)])[:-keep]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def start_profiler():
+    """Return an enabled cProfile.Profile, or None if another profiler is already active"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
@@ -0,0 +1,291 @@
+import calendar
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dateutil import parser
+from django.conf import settings
+from django.utils import timezone
+
+from .ai_features import calculate_completion_probability
+from .archive import get_history_counts_by_owner, get_history_counts_by_series
+from .dedup import index_tasks
+from .estimator import estimate_task
+from .models import RecurringTask, Task
+from .reminders import parse_offsets, set_reminders
+
+DEFAULT_WINDOW_DAYS = 7
+MAX_CALENDAR_DAYS = 92
+MAX_CALENDAR_ENTRIES = 2000
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+
+
+class InvalidRecurrence(ValueError):
+    """Raised for a rule or start outside the supported RRULE subset"""
+
+
+def get_window():
+    return timedelta(days=getattr(settings, 'RECURRENCE_WINDOW_DAYS', DEFAULT_WINDOW_DAYS))
+
+
+def parse_rule(rule, tz):
+    """
+    FREQ=DAILY|WEEKLY|MONTHLY with optional INTERVAL, BYDAY (weekly only) and
+    UNTIL, e.g. 'FREQ=WEEKLY;BYDAY=MO,TH;UNTIL=20271231T000000Z'. A date-only
+    UNTIL includes that whole day in `tz`. Returns RecurringTask field values.
+    """
+    parts = {}
+    for part in rule.strip().upper().removeprefix('RRULE:').split(';'):
+        if part:
+            name, _, value = part.partition('=')
+            parts[name] = value
+    unsupported = parts.keys() - {'FREQ', 'INTERVAL', 'BYDAY', 'UNTIL'}
+    if unsupported:
+        raise InvalidRecurrence(f"Unsupported rule parts: {', '.join(sorted(unsupported))}")
+    if parts.get('FREQ') not in FREQUENCIES:
+        raise InvalidRecurrence('FREQ must be DAILY, WEEKLY or MONTHLY')
+
+    fields = {'frequency': parts['FREQ'].lower(), 'weekdays': '', 'until': None}
+    try:
+        fields['interval'] = int(parts.get('INTERVAL', 1))
+    except ValueError:
+        raise InvalidRecurrence('INTERVAL must be a number')
+    if not 1 <= fields['interval'] <= 366:
+        raise InvalidRecurrence('INTERVAL must be between 1 and 366')
+
+    if 'BYDAY' in parts:
+        days = parts['BYDAY'].split(',')
+        if fields['frequency'] != 'weekly' or not all(day in WEEKDAYS for day in days):
+            raise InvalidRecurrence('BYDAY takes MO..SU and is only supported with FREQ=WEEKLY')
+        fields['weekdays'] = ','.join(sorted(set(days), key=WEEKDAYS.index))
+
+    if 'UNTIL' in parts:
+        try:
+            until = parser.isoparse(parts['UNTIL'])
+        except ValueError:
+            raise InvalidRecurrence('UNTIL must be YYYYMMDD or YYYYMMDDTHHMMSSZ')
+        if len(parts['UNTIL']) == 8:
+            until = datetime.combine(until.date(), dt_time(23, 59, 59), tzinfo=tz)
+        elif until.tzinfo is None:
+            until = until.replace(tzinfo=tz)
+        fields['until'] = until.astimezone(dt_timezone.utc)
+    return fields
+
+
+def build_series(owner_id, data):
+    """Unsaved RecurringTask from an API payload: title, description, rule, start and timezone"""
+    title = data.get('title')
+    if not title:
+        raise InvalidRecurrence('Title is required')
+    if not data.get('rule'):
+        raise InvalidRecurrence('rule is required')
+    try:
+        tz = ZoneInfo(data.get('timezone') or settings.TIME_ZONE)
+    except (ValueError, ZoneInfoNotFoundError):
+        raise InvalidRecurrence('Unknown time zone')
+    try:
+        start = parser.isoparse(data.get('start') or '')
+    except ValueError:
+        raise InvalidRecurrence('start must be an ISO 8601 date and time')
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=tz)
+
+    description = data.get('description', '')
+    complexity, duration = estimate_task(title, description)
+    series = RecurringTask(
+        owner_id=owner_id,
+        title=title,
+        description=description,
+        complexity_score=complexity,
+        estimated_duration=duration,
+        dtstart=start.astimezone(dt_timezone.utc),
+        time_zone=tz.key,
+        **parse_rule(data['rule'], tz),
+    )
+    if series.until is not None and series.until < series.dtstart:
+        raise InvalidRecurrence('UNTIL is before the start')
+    series.next_occurrence = series.dtstart
+    return series
+
+
+class Rule:
+    """
+    Occurrence arithmetic of one series in its own time zone, so a 9:00 task
+    stays at 9:00 across DST changes.
+
+    dateutil.rrule would walk every occurrence since the series started to
+    reach a window; here the first period of the window is computed directly,
+    so reading a window costs the same however old the series is.
+    """
+
+    def __init__(self, series):
+        self.tz = ZoneInfo(series.time_zone)
+        self.interval = series.interval
+        self.frequency = series.frequency
+        self.until = series.until
+        self.start = series.dtstart.astimezone(self.tz).replace(tzinfo=None)  # local wall-clock time
+        if self.frequency == 'weekly':
+            days = series.weekdays.split(',') if series.weekdays else [WEEKDAYS[self.start.weekday()]]
+            self.weekdays = [WEEKDAYS.index(day) for day in days]
+            self.week_start = self.start - timedelta(days=self.start.weekday())
+
+    def local(self, instant):
+        return instant.astimezone(self.tz).replace(tzinfo=None)
+
+    def period_of(self, local):
+        """Index of the period containing local time `local`, rounded down to a multiple of the interval"""
+        if self.frequency == 'daily':
+            periods = (local.date() - self.start.date()).days
+        elif self.frequency == 'weekly':
+            periods = (local.date() - self.week_start.date()).days // 7
+        else:
+            periods = (local.year - self.start.year) * 12 + local.month - self.start.month
+        return max(0, periods // self.interval)
+
+    def period(self, index):
+        """(local start of the period, local occurrence times in it)"""
+        steps = index * self.interval
+        if self.frequency == 'daily':
+            day = self.start + timedelta(days=steps)
+            return day, [day]
+        if self.frequency == 'weekly':
+            week = self.week_start + timedelta(weeks=steps)
+            return week, [week + timedelta(days=weekday) for weekday in self.weekdays]
+        year, month = divmod(self.start.month - 1 + steps, 12)
+        year, month = self.start.year + year, month + 1
+        first = self.start.replace(year=year, month=month, day=1)
+        # Like RRULE, months without the start's day of month are skipped
+        if self.start.day > calendar.monthrange(year, month)[1]:
+            return first, []
+        return first, [first.replace(day=self.start.day)]
+
+    def between(self, after, before=None):
+        """Occurrences (UTC) from `after` inclusive to `before` exclusive; unbounded when `before` is None"""
+        # One period back covers DST offsets between wall-clock and UTC
+        index = max(0, self.period_of(self.local(after)) - 1)
+        end = min(filter(None, (before, self.until)), default=None)
+        end_local = self.local(end) + timedelta(days=1) if end is not None else None
+        while True:
+            period_start, candidates = self.period(index)
+            if end_local is not None and period_start > end_local:
+                return
+            for local in candidates:
+                if local < self.start:
+                    continue
+                instant = local.replace(tzinfo=self.tz).astimezone(dt_timezone.utc)
+                if self.until is not None and instant > self.until:
+                    return
+                if before is not None and instant >= before:
+                    return
+                if instant >= after:
+                    yield instant
+            index += 1
+
+
+def occurrence_task(series, deadline):
+    return Task(
+        owner_id=series.owner_id,
+        series=series,
+        occurrence=deadline,
+        title=series.title,
+        description=series.description,
+        deadline=deadline,
+        complexity_score=series.complexity_score,
+        estimated_duration=series.estimated_duration,
+    )
+
+
+def materialize_series(series, now, history_counts=None, series_history_counts=None):
+    """
+    Create the Task rows of the occurrences due before now + the window and
+    move series.next_occurrence past them. Occurrences already in the past
+    are skipped rather than created as failures. Returns the number created.
+    """
+    horizon = now + get_window()
+    if series.next_occurrence is None or series.next_occurrence >= horizon:
+        return 0
+    rule = Rule(series)
+    tasks = [occurrence_task(series, deadline) for deadline in rule.between(max(series.next_occurrence, now), horizon)]
+    for task in tasks:
+        task.risk_score = calculate_completion_probability(
+            task, history_counts=history_counts, series_history_counts=series_history_counts
+        )
+    # A retry after a failure below finds the same occurrences and skips them
+    Task.objects.bulk_create(tasks, ignore_conflicts=True)
+    # bulk_create sends no post_save, so the rows actually inserted (not the
+    # ones skipped as conflicts) get their duplicate index bands and reminders here
+    inserted_ids = set(Task.objects.filter(id__in=[task.id for task in tasks]).values_list('id', flat=True))
+    inserted = [task for task in tasks if task.id in inserted_ids]
+    index_tasks(inserted)
+    set_reminders(inserted, parse_offsets(None))
+    series.next_occurrence = next(rule.between(horizon), None)
+    series.save(update_fields=['next_occurrence', 'updated_at'])
+    return len(inserted)
+
+
+def materialize_recurring_tasks(now=None):
+    """Materialize every series with occurrences entering the window; returns the number of tasks created"""
+    now = now or timezone.now()
+    due = list(RecurringTask.objects.filter(next_occurrence__lt=now + get_window()))
+    if not due:
+        return 0
+    history_counts_by_owner = get_history_counts_by_owner()
+    history_counts_by_series = get_history_counts_by_series([series.id for series in due])
+    return sum(
+        materialize_series(
+            series, now,
+            history_counts=history_counts_by_owner.get(series.owner_id),
+            series_history_counts=history_counts_by_series.get(series.id),
+        )
+        for series in due
+    )
+
+
+def parse_calendar_range(params, now):
+    """start and end query parameters (ISO 8601); a week from now by default"""
+    try:
+        start = parser.isoparse(params['start']) if params.get('start') else now
+        end = parser.isoparse(params['end']) if params.get('end') else start + timedelta(days=7)
+    except ValueError:
+        raise InvalidRecurrence('start and end must be ISO 8601 dates and times')
+    start = start if start.tzinfo else start.replace(tzinfo=dt_timezone.utc)
+    end = end if end.tzinfo else end.replace(tzinfo=dt_timezone.utc)
+    if not start < end <= start + timedelta(days=MAX_CALENDAR_DAYS):
+        raise InvalidRecurrence(f'end must be after start and at most {MAX_CALENDAR_DAYS} days later')
+    return start, end
+
+
+def virtual_occurrence(series, deadline):
+    """A calendar entry for an occurrence not stored yet: the status it will have, marked `virtual`"""
+    return {
+        'id': None,
+        'series_id': str(series.id),
+        'title': series.title,
+        'description': series.description,
+        'deadline': deadline.isoformat(),
+        'status': 'ongoing',
+        'estimated_duration': series.estimated_duration,
+        'complexity_score': series.complexity_score,
+        'virtual': True,
+    }
+
+
+def calendar_entries(tasks_qs, owner_id, start, end, now=None):
+    """
+    The owner's tasks with a deadline in [start, end), plus the occurrences of
+    their recurring series that are not materialized yet, computed from the
+    rules and marked `virtual`. Sorted by deadline, at most MAX_CALENDAR_ENTRIES.
+    """
+    now = now or timezone.now()
+    entries = [
+        (task.deadline, dict(task.to_dict(now), virtual=False))
+        for task in tasks_qs.filter(deadline__gte=start, deadline__lt=end).order_by('deadline', 'id')[:MAX_CALENDAR_ENTRIES]
+    ]
+    for series in RecurringTask.objects.filter(owner_id=owner_id, next_occurrence__lt=end):
+        for deadline in Rule(series).between(max(series.next_occurrence, start), end):
+            entries.append((deadline, virtual_occurrence(series, deadline)))
+            if len(entries) >= 2 * MAX_CALENDAR_ENTRIES:
+                break
+    entries.sort(key=lambda entry: entry[0])
+    return [entry for _, entry in entries[:MAX_CALENDAR_ENTRIES]]
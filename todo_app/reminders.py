@@ -0,0 +1,186 @@
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .metrics import REMINDER_BATCH_DURATION_HISTOGRAM, REMINDER_DELIVERED_COUNTER, REMINDER_LAG_HISTOGRAM
+from .models import Reminder
+
+logger = logging.getLogger('todo_app')
+
+MAX_REMINDERS_PER_TASK = 5
+MAX_OFFSET_MINUTES = 30 * 24 * 60
+DEFAULT_BATCH_SIZE = 500
+
+
+class InvalidReminders(ValueError):
+    """Raised for an unusable `reminders` list in a task payload"""
+
+
+def parse_offsets(value):
+    """
+    Offsets from a task payload's `reminders`: minutes before the deadline.
+    None (the key is missing) means REMINDER_DEFAULT_OFFSETS.
+    """
+    if value is None:
+        value = getattr(settings, 'REMINDER_DEFAULT_OFFSETS', [])
+    if not isinstance(value, list) or len(value) > MAX_REMINDERS_PER_TASK:
+        raise InvalidReminders(f'reminders must be a list of at most {MAX_REMINDERS_PER_TASK} offsets in minutes')
+    offsets = set()
+    for minutes in value:
+        if isinstance(minutes, bool) or not isinstance(minutes, int) or not 0 <= minutes <= MAX_OFFSET_MINUTES:
+            raise InvalidReminders(f'Reminder offsets must be whole minutes between 0 and {MAX_OFFSET_MINUTES}')
+        offsets.add(timedelta(minutes=minutes))
+    return sorted(offsets)
+
+
+def set_reminders(tasks, offsets):
+    """Replace the reminders of `tasks` (saved tasks) with one per offset"""
+    Reminder.objects.filter(task__in=tasks).delete()
+    Reminder.objects.bulk_create([
+        Reminder(task=task, offset=offset, remind_at=task.deadline - offset)
+        for task in tasks
+        for offset in offsets
+    ])
+
+
+def reminder_offsets(task):
+    """The task's reminders as minutes before the deadline, for API responses"""
+    return [int(offset.total_seconds() // 60) for offset in task.reminders.order_by('offset').values_list('offset', flat=True)]
+
+
+def on_task_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    post_save receiver moving reminders along with the deadline. A reminder
+    already sent is sent again if the deadline moved it past its sending.
+    """
+    if created or (update_fields is not None and 'deadline' not in update_fields):
+        return
+    moved = []
+    for reminder in instance.reminders.all():
+        remind_at = instance.deadline - reminder.offset
+        if remind_at != reminder.remind_at:
+            reminder.remind_at = remind_at
+            if reminder.sent_at is not None and remind_at > reminder.sent_at:
+                reminder.sent_at = None
+            moved.append(reminder)
+    if moved:
+        Reminder.objects.bulk_update(moved, ['remind_at', 'sent_at'])
+
+
+class ReminderSink(ABC):
+    """Receives due reminders in batches; subclasses implement deliver()"""
+
+    name = 'base'
+
+    @abstractmethod
+    def deliver(self, reminders):
+        """Send a list of reminder_payload() dicts"""
+
+
+class LogSink(ReminderSink):
+    """Writes each reminder to the todo_app log"""
+
+    name = 'log'
+
+    def deliver(self, reminders):
+        for reminder in reminders:
+            logger.info("Reminder: %s is due %s", reminder['title'], reminder['deadline'])
+
+
+class MemorySink(ReminderSink):
+    """Keeps delivered reminders in `delivered`, for tests and local runs"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.delivered = []
+
+    def deliver(self, reminders):
+        self.delivered.extend(reminders)
+
+
+class FileSink(ReminderSink):
+    """Appends reminders as JSON lines to REMINDER_FILE"""
+
+    name = 'file'
+
+    def __init__(self):
+        self.path = getattr(settings, 'REMINDER_FILE', 'reminders.jsonl')
+
+    def deliver(self, reminders):
+        with open(self.path, 'a') as f:
+            f.writelines(json.dumps(reminder) + '\n' for reminder in reminders)
+
+
+_sinks = None
+_sinks_lock = threading.Lock()
+
+
+def get_sinks():
+    """Instances of the REMINDER_SINKS classes (dotted paths), created once per process"""
+    global _sinks
+    with _sinks_lock:
+        if _sinks is None:
+            paths = getattr(settings, 'REMINDER_SINKS', ['todo_app.reminders.LogSink'])
+            _sinks = [import_string(path)() for path in paths]
+        return _sinks
+
+
+def reminder_payload(reminder):
+    task = reminder.task
+    return {
+        'task_id': str(task.id),
+        'owner_id': task.owner_id,
+        'title': task.title,
+        'deadline': task.deadline.isoformat(),
+        'remind_at': reminder.remind_at.isoformat(),
+        'offset_minutes': int(reminder.offset.total_seconds() // 60),
+    }
+
+
+def deliver_due_reminders(now=None, batch_size=None, sinks=None):
+    """
+    Hand every unsent reminder due by `now` to the sinks, in batches of
+    `batch_size`, oldest first, and mark them sent. Due reminders are a range
+    of the partial reminder_due_idx index, so the cost follows the number of
+    due reminders, not of tasks. A batch is marked sent only after every sink
+    took it, so a failing sink means redelivery (at least once), not loss.
+    Returns the number delivered.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or getattr(settings, 'REMINDER_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    sinks = get_sinks() if sinks is None else sinks
+    due = (
+        Reminder.objects.filter(sent_at__isnull=True, remind_at__lte=now)
+        .select_related('task').order_by('remind_at')
+    )
+
+    delivered = 0
+    while True:
+        batch = list(due[:batch_size])
+        if not batch:
+            break
+        start = time.perf_counter()
+        # Tasks finished or expired since the reminder was set are skipped, but still marked sent
+        live = [reminder for reminder in batch if reminder.task.status == 'ongoing']
+        payloads = [reminder_payload(reminder) for reminder in live]
+        for sink in sinks:
+            if payloads:
+                sink.deliver(payloads)
+                REMINDER_DELIVERED_COUNTER.labels(sink.name).inc(len(payloads))
+        sent_at = timezone.now()
+        Reminder.objects.filter(id__in=[reminder.id for reminder in batch]).update(sent_at=sent_at)
+        for reminder in live:
+            REMINDER_LAG_HISTOGRAM.observe((sent_at - reminder.remind_at).total_seconds())
+        REMINDER_BATCH_DURATION_HISTOGRAM.observe(time.perf_counter() - start)
+        delivered += len(live)
+        if len(batch) < batch_size:
+            break
+    return delivered
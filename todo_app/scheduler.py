@@ -6,10 +6,21 @@ logger = logging.getLogger(__name__)
 
 from django.utils import timezone
 
-from .jobs import update_task_statuses_job
+from .jobs import (
+    update_task_statuses_job,
+    archive_terminal_tasks_job,
+    sync_analytics_store_job,
+    materialize_recurring_tasks_job,
+    deliver_reminders_job,
+)
+from .leader import LeaderElector
 from .metrics import start_metrics_server
 from django.conf import settings
 
+# Only the elected leader process has a running scheduler
+_scheduler = None
+_elector = None
+
 
 def start():
     # Start Prometheus metrics server
@@ -17,9 +28,21 @@ def start():
     start_metrics_server(port)
     logger.info(f"Started Prometheus metrics server on port {port}.")
 
+    """
+    Join scheduler leader election; the APScheduler only runs in the elected process.
+    """
+    global _elector
+    if _elector is not None:
+        return
+    _elector = LeaderElector(on_elected=start_scheduler, on_demoted=stop_scheduler)
+    _elector.start()
+
+
+def start_scheduler():
     """
     Initialize and start the APScheduler for updating task statuses.
     """
+    global _scheduler
     scheduler = BackgroundScheduler()
     scheduler.add_jobstore(DjangoJobStore(), 'default')
     
@@ -33,11 +56,68 @@ def start():
         max_instances=1
     )
 
+    # Move old terminal tasks to the archive so the live table stays bounded by active work
+    scheduler.add_job(
+        archive_terminal_tasks_job,
+        trigger='interval',
+        hours=1,
+        id='archive_terminal_tasks_job',
+        replace_existing=True,
+        max_instances=1
+    )
+
+    # Sync finished, changed and reopened tasks into the columnar analytics store
+    scheduler.add_job(
+        sync_analytics_store_job,
+        trigger='interval',
+        minutes=1,
+        id='sync_analytics_store_job',
+        replace_existing=True,
+        max_instances=1
+    )
+
+    # Create recurring task occurrences as they enter the RECURRENCE_WINDOW_DAYS window
+    scheduler.add_job(
+        materialize_recurring_tasks_job,
+        trigger='interval',
+        minutes=15,
+        id='materialize_recurring_tasks_job',
+        replace_existing=True,
+        max_instances=1
+    )
+
+    # Deliver due reminders; the interval bounds how late a reminder can be
+    scheduler.add_job(
+        deliver_reminders_job,
+        trigger='interval',
+        seconds=30,
+        id='deliver_reminders_job',
+        replace_existing=True,
+        max_instances=1
+    )
+
     # Register APScheduler events for logging
     register_events(scheduler)
 
     try:
         scheduler.start()
-        logger.info("APScheduler started: update_task_statuses_job scheduled every 1 minute.")
+        _scheduler = scheduler
+        logger.info("APScheduler started: update_task_statuses_job and sync_analytics_store_job scheduled every 1 minute, archive_terminal_tasks_job every hour, materialize_recurring_tasks_job every 15 minutes, deliver_reminders_job every 30 seconds.")
     except Exception as e:
         logger.error(f"Failed to start APScheduler: {e}")
+
+
+def stop_scheduler():
+    """
+    Shut down the APScheduler after this process loses leadership.
+    """
+    global _scheduler
+    if _scheduler is None:
+        return
+    try:
+        _scheduler.shutdown(wait=False)
+        logger.info("APScheduler stopped: scheduler leadership lost.")
+    except Exception as e:
+        logger.error(f"Failed to stop APScheduler: {e}")
+    finally:
+        _scheduler = None
@@ -0,0 +1,150 @@
+import re
+
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+
+from .models import Task
+
+# PostgreSQL: generated tsvector column with a GIN index (added in migration 0003)
+PG_SEARCH_COLUMN = 'search_vector'
+PG_SEARCH_INDEX = 'task_search_vector_gin'
+# SQLite: FTS5 table kept in sync with todo_app_task by triggers
+SQLITE_FTS_TABLE = 'todo_app_task_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _task_columns(alias):
+    return ', '.join(f'{alias}.{field.column}' for field in Task._meta.concrete_fields)
+
+
+def install_search_index(conn):
+    """Create the full-text index for the given connection's backend"""
+    table = Task._meta.db_table
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            # Title matches (weight A) rank above description matches (weight B)
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {PG_SEARCH_COLUMN} tsvector "
+                f"GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+                f") STORED"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_SEARCH_INDEX} ON {table} USING GIN ({PG_SEARCH_COLUMN})"
+            )
+        elif conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+                f"USING fts5(task_id UNINDEXED, title, description)"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {SQLITE_FTS_TABLE}(task_id, title, description) "
+                f"VALUES (new.id, new.title, new.description); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+                f"DELETE FROM {SQLITE_FTS_TABLE} WHERE task_id = old.id; END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au "
+                f"AFTER UPDATE OF title, description ON {table} BEGIN "
+                f"UPDATE {SQLITE_FTS_TABLE} SET title = new.title, description = new.description "
+                f"WHERE task_id = old.id; END"
+            )
+            # Django rebuilds SQLite tables on some schema changes, dropping the
+            # triggers above, so the index is repopulated whenever this runs
+            cursor.execute(f"DELETE FROM {SQLITE_FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {SQLITE_FTS_TABLE}(task_id, title, description) "
+                f"SELECT id, title, description FROM {table}"
+            )
+
+
+def uninstall_search_index(conn):
+    table = Task._meta.db_table
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {PG_SEARCH_INDEX}")
+            cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {PG_SEARCH_COLUMN}")
+        elif conn.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}")
+
+
+def _fts5_query(query):
+    # Quote every token so user input can't inject FTS5 syntax; the last
+    # token is a prefix match so results update while the user is typing
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_tasks(query, limit, offset=0, owner_id=None):
+    """
+    Rank the owner's tasks matching `query` by relevance.
+
+    Returns up to `limit` Task instances, each with a `rank` attribute,
+    using the backend's full-text index instead of an icontains scan.
+    """
+    table = Task._meta.db_table
+    if owner_id is None:
+        owner_sql, owner_params = "t.owner_id IS NULL", []
+    else:
+        owner_sql, owner_params = "t.owner_id = %s", [owner_id]
+    if connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT {_task_columns('t')}, ts_rank(t.{PG_SEARCH_COLUMN}, q) AS rank "
+            f"FROM {table} t, websearch_to_tsquery('english', %s) q "
+            f"WHERE t.{PG_SEARCH_COLUMN} @@ q AND {owner_sql} "
+            f"ORDER BY rank DESC, t.id LIMIT %s OFFSET %s"
+        )
+        params = [query, *owner_params, limit, offset]
+    elif connection.vendor == 'sqlite':
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        # bm25() is lower-is-better; column weights favour title over description
+        sql = (
+            f"SELECT {_task_columns('t')}, -bm25({SQLITE_FTS_TABLE}, 0.0, 2.0, 1.0) AS rank "
+            f"FROM {SQLITE_FTS_TABLE} f JOIN {table} t ON t.id = f.task_id "
+            f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND {owner_sql} "
+            f"ORDER BY rank DESC, t.id LIMIT %s OFFSET %s"
+        )
+        params = [match, *owner_params, limit, offset]
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {connection.vendor}")
+    return list(Task.objects.raw(sql, params))
+
+
+def search_queryset(queryset, query):
+    """
+    Narrow a Task queryset to the rows matching `query`, through the same
+    full-text index as search_tasks() (no ranking); for the admin's search box.
+    """
+    if connection.vendor == 'postgresql':
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT id FROM {Task._meta.db_table} WHERE {PG_SEARCH_COLUMN} @@ websearch_to_tsquery('english', %s)",
+            [query],
+        ))
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(query)
+        if match is None:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT task_id FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s", [match]
+        ))
+    raise NotImplementedError(f"Full-text search is not supported on {connection.vendor}")
+
+
+def refresh_sqlite_search_index(sender, using='default', **kwargs):
+    """post_migrate handler restoring FTS5 triggers dropped by SQLite table rebuilds"""
+    conn = connections[using]
+    if conn.vendor == 'sqlite' and SQLITE_FTS_TABLE in conn.introspection.table_names():
+        install_search_index(conn)
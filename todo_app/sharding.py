@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .ai_features import calculate_completion_probability
+from .estimator import expire_overdue
+from .models import ShardLease, Task
+
+DEFAULT_LEASE_SECONDS = 120
+UPDATE_BATCH_SIZE = 500
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shard_count():
+    return max(1, getattr(settings, 'SCHEDULER_SHARD_COUNT', 1))
+
+
+def shard_bounds(shard, count):
+    """
+    UUID range [low, high) covered by `shard`.
+
+    Task ids are random uuid4 values, so equal slices of the id space are an
+    even hash partition, and the primary key index serves each shard's range.
+    """
+    span = (1 << 128) // count
+    low = uuid.UUID(int=shard * span)
+    high = uuid.UUID(int=(shard + 1) * span) if shard < count - 1 else None
+    return low, high
+
+
+def shard_queryset(queryset, shard, count):
+    low, high = shard_bounds(shard, count)
+    queryset = queryset.filter(id__gte=low)
+    if high is not None:
+        queryset = queryset.filter(id__lt=high)
+    return queryset
+
+
+def _lease_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_shards(job_id, count, now=None):
+    """
+    Claim every shard of `job_id` whose lease is free or expired.
+
+    The claim is a conditional UPDATE, so when several processes or nodes
+    race for a shard exactly one of them gets it. Returns a list of
+    (shard, lag_seconds), lag being the time since the shard last completed.
+    """
+    now = now or timezone.now()
+    lease_seconds = getattr(settings, 'SCHEDULER_SHARD_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+    ShardLease.objects.bulk_create(
+        [ShardLease(job_id=job_id, shard=shard) for shard in range(count)], ignore_conflicts=True
+    )
+    owner = _lease_owner()
+    claimed = []
+    for lease in ShardLease.objects.filter(job_id=job_id, shard__lt=count).order_by('shard'):
+        won = ShardLease.objects.filter(
+            Q(leased_until__isnull=True) | Q(leased_until__lt=now), pk=lease.pk
+        ).update(owner=owner, leased_until=now + timedelta(seconds=lease_seconds))
+        if won:
+            lag = (now - lease.last_completed_at).total_seconds() if lease.last_completed_at else 0.0
+            claimed.append((lease.shard, lag))
+    return claimed
+
+
+def release_shard(job_id, shard, completed=True):
+    updates = {'leased_until': None, 'owner': ''}
+    if completed:
+        updates['last_completed_at'] = timezone.now()
+    ShardLease.objects.filter(job_id=job_id, shard=shard, owner=_lease_owner()).update(**updates)
+
+
+def score_shard(shard, count, now, history_counts_by_owner, history_counts_by_series):
+    """
+    Expire overdue tasks and rescore ongoing tasks whose id falls in `shard`.
+
+    Runs in the scheduler process or in a pool worker. Returns
+    (shard, expired_count, rescored_count, duration_seconds).
+    """
+    start = time.perf_counter()
+    expired_count = expire_overdue(shard_queryset(Task.objects.all(), shard, count), now)
+    rescored_count = rescore_tasks(
+        shard_queryset(Task.objects.all(), shard, count), history_counts_by_owner, history_counts_by_series
+    )
+    return shard, expired_count, rescored_count, time.perf_counter() - start
+
+
+def rescore_tasks(tasks_qs, history_counts_by_owner, history_counts_by_series):
+    """
+    Recompute the risk scores of the ongoing tasks of `tasks_qs` and write the
+    changed ones in batches; returns how many changed.
+    """
+    changed = []
+    rescored_count = 0
+    ongoing = tasks_qs.filter(status='ongoing').only(
+        'id', 'owner_id', 'series_id', 'deadline', 'complexity_score', 'estimated_duration', 'risk_score'
+    )
+    for task in ongoing.order_by().iterator(chunk_size=2000):
+        new_risk_score = calculate_completion_probability(
+            task,
+            history_counts=history_counts_by_owner.get(task.owner_id),
+            series_history_counts=history_counts_by_series.get(task.series_id),
+        )
+        if task.risk_score != new_risk_score:
+            task.risk_score = new_risk_score
+            changed.append(task)
+        if len(changed) >= UPDATE_BATCH_SIZE:
+            save_scores(changed)
+            rescored_count += len(changed)
+            changed = []
+    if changed:
+        save_scores(changed)
+        rescored_count += len(changed)
+    return rescored_count
+
+
+def save_scores(tasks):
+    # scored_at, not updated_at, tells incremental readers (planning.PlanCache)
+    # about new scores; stamped at write time, not job start, so they can't miss it
+    scored_at = timezone.now()
+    for task in tasks:
+        task.scored_at = scored_at
+    Task.objects.bulk_update(tasks, ['risk_score', 'scored_at'])
+
+
+def _init_pool_worker():
+    # Workers are spawned from the scheduler process; keep them from joining
+    # leader election or starting schedulers of their own during setup
+    os.environ.pop('RUN_MAIN', None)
+    os.environ['SCHEDULER_AUTOSTART'] = 'false'
+    import django
+    django.setup()
+
+
+def get_executor():
+    """Process pool shared by every run of a sharded job, or None to run shards inline"""
+    global _executor
+    workers = getattr(settings, 'SCHEDULER_SHARD_WORKERS', 1)
+    if workers <= 1:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_pool_worker,
+            )
+        return _executor
+
+
+def run_shards(shards, count, now, history_counts_by_owner, history_counts_by_series):
+    """Score `shards` inline or in the process pool; returns score_shard results"""
+    global _executor
+    executor = get_executor()
+    if executor is None:
+        return [score_shard(shard, count, now, history_counts_by_owner, history_counts_by_series) for shard in shards]
+    futures = [
+        executor.submit(score_shard, shard, count, now, history_counts_by_owner, history_counts_by_series)
+        for shard in shards
+    ]
+    try:
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A dead worker poisons the pool; start a fresh one on the next run
+        with _executor_lock:
+            _executor = None
+        raise
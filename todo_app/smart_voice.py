@@ -39,5 +39,5 @@ def smart_voice_process_api(request):
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
     except Exception as e:
-        logger.error(f"Error in smart_voice_process_api: {str(e)}", exc_info=True)
+        logger.error("Error in smart_voice_process_api: %s", e, exc_info=True)
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
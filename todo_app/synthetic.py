@@ -0,0 +1,65 @@
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Task
+
+# Marks rows created by the benchmark commands so they can be removed afterwards
+SEED_TITLE_PREFIX = '[bench] '
+
+VERBS = ['submit', 'review', 'prepare', 'call', 'write', 'fix', 'plan', 'organize', 'email', 'finish']
+NOUNS = ['report', 'budget', 'meeting notes', 'slides', 'invoice', 'project proposal',
+         'code review', 'groceries', 'presentation', 'tax return', 'newsletter', 'design doc']
+QUALIFIERS = ['', '', 'urgent', 'quick', 'simple', 'important', 'complex']
+
+
+def random_title(rng=random):
+    qualifier = rng.choice(QUALIFIERS)
+    title = f"{rng.choice(VERBS)} the {rng.choice(NOUNS)}"
+    return f"{qualifier} {title}".strip()
+
+
+def random_task(now, owner_id=None, rng=random):
+    """
+    One unsaved synthetic task with production-like shape: most deadlines lie
+    in the recent past or the next few weeks, past tasks are mostly finished,
+    and duration and risk grow with complexity.
+    """
+    complexity = min(100, max(0, int(rng.gauss(50, 18))))
+    risk = min(1.0, max(0.0, complexity / 150 + rng.gauss(0.2, 0.15)))
+    if rng.random() < 0.7:
+        deadline = now - timedelta(minutes=rng.expovariate(1 / (60 * 24 * 60)))
+        # Riskier tasks fail more often; a few overdue ones are not expired yet
+        roll = rng.random()
+        status = 'ongoing' if roll < 0.1 else 'failure' if roll < 0.1 + risk * 0.5 else 'success'
+    else:
+        deadline = now + timedelta(minutes=rng.expovariate(1 / (60 * 24 * 14)))
+        status = 'success' if rng.random() < 0.08 else 'ongoing'
+    return Task(
+        owner_id=owner_id,
+        title=f"{SEED_TITLE_PREFIX}{random_title(rng)}",
+        description=f"{random_title(rng)} for the {rng.choice(NOUNS)}",
+        deadline=deadline,
+        status=status,
+        created_at=min(now, deadline - timedelta(minutes=rng.randint(30, 60 * 24 * 30))),
+        complexity_score=complexity,
+        estimated_duration=int(15 + complexity * rng.uniform(0.5, 3)),
+        risk_score=round(risk, 3),
+    )
+
+
+def seed_tasks(count, batch_size=5000, owner_id=None, rng=random):
+    """Bulk-insert `count` synthetic tasks of `owner_id` (see random_task)"""
+    now = timezone.now()
+    created = 0
+    while created < count:
+        batch = [random_task(now, owner_id, rng) for _ in range(min(batch_size, count - created))]
+        Task.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+    return created
+
+
+def remove_seeded_tasks():
+    deleted, _ = Task.objects.filter(title__startswith=SEED_TITLE_PREFIX).delete()
+    return deleted
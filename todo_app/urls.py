@@ -5,9 +5,15 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'), 
     path('api/tasks', views.task_list_create_api, name='task-list-create-api'),
+    path('api/tasks/search', views.task_search_api, name='task-search-api'),
     path('api/tasks/<uuid:task_id>', views.task_detail_api, name='task-detail-api'),
     path('api/tasks/<uuid:task_id>/complete', views.complete_task_api, name='task-complete-api'), 
     path('api/voice-command', views.process_voice_command_api, name='voice-command-api'),
     path('api/smart-voice', views.smart_voice_process_api, name='smart-voice-api'),
     path('api/analytics', views.get_analytics_api, name='analytics-api'),
+    path('api/dashboard', views.dashboard_api, name='dashboard-api'),
+    path('api/plan', views.plan_api, name='plan-api'),
+    path('api/recurring', views.recurring_list_create_api, name='recurring-list-create-api'),
+    path('api/recurring/<uuid:series_id>', views.recurring_detail_api, name='recurring-detail-api'),
+    path('api/calendar', views.calendar_api, name='calendar-api'),
 ]
\ No newline at end of file
@@ -1,6 +1,8 @@
 from django.shortcuts import render, get_object_or_404, redirect, redirect
 from django.http import JsonResponse, HttpResponse, FileResponse
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import conditional_page, require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_headers
 from django.views.decorators.csrf import csrf_exempt # For simplicity in API, consider CSRF for web forms
 from django.utils import timezone
 from dateutil import parser # For robust ISO date string parsing
@@ -9,20 +11,34 @@ import os
 import logging # Import the logging module
 import datetime # Import the datetime module
 from django.conf import settings
+from django.db.models import Count, Q
 
-from .models import Task
+from .models import RecurringTask, Task
+from .archive import get_history_counts
 from .ai_features import (
-    calculate_task_complexity,
-    estimate_task_duration,
     calculate_completion_probability,
     parse_voice_command,
+    analyze_patterns_from_db,
     analyze_user_patterns
 )
 from .gemini_integration import process_with_gemini
+from .db_router import read_from_primary, unpinned_writes
+from .dedup import duplicates_payload, find_duplicates, get_duplicate_action, merge_into
+from .estimator import estimate_task, expire_overdue, learn_from_task
+from .owners import get_owner_id, owned_tasks
+from .pagination import InvalidCursor, after_cursor, get_page_size, paginate_by_deadline
+from .planning import InvalidPlanOptions, get_plan, parse_plan_options
+from .reminders import InvalidReminders, parse_offsets, reminder_offsets, set_reminders
+from .recurrence import InvalidRecurrence, build_series, calendar_entries, materialize_series, parse_calendar_range
+from .search import search_tasks
+from .wire import JSON, compact_header, encode_tasks, response_format, render as wire_render
 
 # Get an instance of a logger
 logger = logging.getLogger('todo_app') # Explicitly use the 'todo_app' logger
 
+# Ongoing tasks at or above this risk score are listed as high risk
+HIGH_RISK_THRESHOLD = 0.7
+
 # Serve static index.html
 def index(request):
     # Redirect to the Next.js frontend
@@ -30,28 +46,73 @@ def index(request):
     
     # For production, consider serving a built static HTML instead of redirecting
 
+@require_http_methods(["GET"])
+def task_search_api(request):
+    """Ranked full-text search over task titles and descriptions"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Query parameter q is required'}, status=400)
+    try:
+        limit = get_page_size(request.GET.get('limit'))
+        page = int(request.GET.get('page', 1))
+    except (InvalidCursor, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if page < 1:
+        return JsonResponse({'error': 'page must be positive'}, status=400)
+
+    # One extra row tells us whether a next page exists
+    tasks = search_tasks(query, limit + 1, (page - 1) * limit, owner_id=get_owner_id(request))
+    return JsonResponse({
+        'query': query,
+        'page': page,
+        'results': [dict(task.to_dict(), rank=round(task.rank, 4)) for task in tasks[:limit]],
+        'has_more': len(tasks) > limit
+    })
+
 @csrf_exempt # Use with caution, ensure proper auth/auth for production APIs
 @require_http_methods(["GET", "POST"])
 def task_list_create_api(request):
     if request.method == 'GET':
-        # Auto-transition any expired ongoing tasks to ‘failure’ before fetching
-        Task.objects.filter(deadline__lt=timezone.now(), status='ongoing').update(status='failure')
-        tasks = Task.objects.all()
-        ongoing_tasks = [task.to_dict() for task in tasks if task.status == 'ongoing']
-        success_tasks = [task.to_dict() for task in tasks if task.status == 'success']
-        failure_tasks = [task.to_dict() for task in tasks if task.status == 'failure']
-        
-        return JsonResponse({
-            'ongoing': ongoing_tasks,
-            'success': success_tasks,
-            'failure': failure_tasks
-        })
+        now = timezone.now()
+        fmt = response_format(request)
+        expire_overdue_tasks(owned_tasks(request), now)
+        try:
+            limit = get_page_size(request.GET.get('limit'))
+            status = request.GET.get('status')
+            if status:
+                # Single bucket, used by the frontend to load more rows on scroll
+                if status not in dict(Task.STATUS_CHOICES):
+                    return JsonResponse({'error': 'Invalid status'}, status=400)
+                tasks, next_cursor = paginate_by_deadline(
+                    owned_tasks(request).filter(status=status), request.GET.get('cursor'), limit
+                )
+                response = {
+                    'status': status,
+                    'tasks': encode_tasks(tasks, fmt, now),
+                    'next_cursor': next_cursor
+                }
+                if fmt != JSON:
+                    response['compact'] = compact_header(now)
+                return wire_render(response, fmt)
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # First page of every bucket
+        response = {'next_cursors': {}}
+        for status, _ in Task.STATUS_CHOICES:
+            tasks, next_cursor = paginate_by_deadline(owned_tasks(request).filter(status=status), limit=limit)
+            response[status] = encode_tasks(tasks, fmt, now)
+            response['next_cursors'][status] = next_cursor
+        if fmt != JSON:
+            response['compact'] = compact_header(now)
+
+        return wire_render(response, fmt)
 
     elif request.method == 'POST':
         try:
-            logger.debug(f"Received POST request to /api/tasks. Request body: {request.body}")
+            logger.debug("Received POST request to /api/tasks (%d bytes)", len(request.body))
             data = json.loads(request.body)
-            logger.debug(f"Parsed JSON data: {data}")
+            logger.debug("Parsed JSON data: %s", data)
             
             raw_deadline = data.get('deadline')
             if not raw_deadline:
@@ -76,11 +137,20 @@ def task_list_create_api(request):
 
             if not title:
                 return JsonResponse({'error': 'Title is required'}, status=400)
+            try:
+                offsets = parse_offsets(data.get('reminders'))
+            except InvalidReminders as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+            duplicates = find_duplicates(title, description, get_owner_id(request))
+            if duplicates and get_duplicate_action(data.get('on_duplicate')) == 'merge':
+                existing = merge_into(duplicates[0][0], description, deadline_dt)
+                return JsonResponse(dict(existing.to_dict(), merged=True, duplicates=duplicates_payload(duplicates)))
 
-            complexity = calculate_task_complexity(title, description)
-            duration = estimate_task_duration(title, description, complexity)
+            complexity, duration = estimate_task(title, description)
             
             task = Task(
+                owner_id=get_owner_id(request),
                 title=title,
                 description=description,
                 deadline=deadline_dt,
@@ -88,30 +158,37 @@ def task_list_create_api(request):
                 estimated_duration=duration
             )
             
-            user_history_qs = Task.objects.filter(status__in=['success', 'failure'])
+            user_history_qs = owned_tasks(request).filter(status__in=['success', 'failure'])
             task.risk_score = calculate_completion_probability(task, user_history_qs)
             
             task.save() # This will also set created_at and updated_at
+            set_reminders([task], offsets)
             
-            return JsonResponse(task.to_dict(), status=201)
+            return JsonResponse(dict(
+                task.to_dict(),
+                reminders=[int(offset.total_seconds() // 60) for offset in offsets],
+                duplicates=duplicates_payload(duplicates)
+            ), status=201)
         except json.JSONDecodeError as e:
-            logger.error(f"JSONDecodeError in create_task: {e}. Request body: {request.body}")
+            logger.error("JSONDecodeError in create_task: %s (%d byte body)", e, len(request.body))
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
         except Exception as e:
-            logger.error(f"Exception in create_task: {e}", exc_info=True) # exc_info=True will log the full traceback
+            logger.error("Exception in create_task: %s", e, exc_info=True) # exc_info=True will log the full traceback
             return JsonResponse({'error': str(e)}, status=400)
 
 @csrf_exempt # Use with caution
 @require_http_methods(["GET", "PUT", "DELETE"]) # GET for completeness, though not in Flask
 def task_detail_api(request, task_id):
-    task = get_object_or_404(Task, id=task_id)
+    task = get_object_or_404(owned_tasks(request), id=task_id)
 
     if request.method == 'GET':
-        return JsonResponse(task.to_dict())
+        return JsonResponse(dict(task.to_dict(), reminders=reminder_offsets(task)))
 
     elif request.method == 'PUT':
         try:
             data = json.loads(request.body)
+            was_ongoing = task.status == 'ongoing'
+            offsets = parse_offsets(data['reminders']) if 'reminders' in data else None
             
             if 'title' in data:
                 task.title = data['title']
@@ -135,13 +212,19 @@ def task_detail_api(request, task_id):
             # updated_at is handled by auto_now=True in the model
             task.save()
             # Recalculate risk score on update if relevant fields changed
-            user_history_qs = Task.objects.filter(status__in=['success', 'failure'])
+            user_history_qs = owned_tasks(request).filter(status__in=['success', 'failure'])
             task.risk_score = calculate_completion_probability(task, user_history_qs)
-            task.save() # Save again to store updated risk score
+            task.save(update_fields=['risk_score'])
+            if was_ongoing and task.status in ('success', 'failure'):
+                learn_from_task(task)
+            if offsets is not None:
+                set_reminders([task], offsets)
 
-            return JsonResponse(task.to_dict())
+            return JsonResponse(dict(task.to_dict(), reminders=reminder_offsets(task)))
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except InvalidReminders as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
 
@@ -160,11 +243,23 @@ def process_voice_command_api(request):
             return JsonResponse({'success': False, 'error': 'Command is required'}, status=400)
 
         parsed_task_data = parse_voice_command(command) # Returns timezone-aware deadline
+
+        duplicates = find_duplicates(parsed_task_data['title'], parsed_task_data.get('description', ''), get_owner_id(request))
+        if duplicates and get_duplicate_action(data.get('on_duplicate')) == 'merge':
+            existing = merge_into(duplicates[0][0], parsed_task_data.get('description', ''), parsed_task_data['deadline'])
+            return JsonResponse({
+                'success': True,
+                'task': existing.to_dict(),
+                'merged': True,
+                'duplicates': duplicates_payload(duplicates),
+                'parsed_command': parsed_task_data,
+                'original_command': command
+            })
         
-        complexity = calculate_task_complexity(parsed_task_data['title'], parsed_task_data.get('description', ''))
-        duration = estimate_task_duration(parsed_task_data['title'], parsed_task_data.get('description', ''), complexity)
+        complexity, duration = estimate_task(parsed_task_data['title'], parsed_task_data.get('description', ''))
         
         task = Task(
+            owner_id=get_owner_id(request),
             title=parsed_task_data['title'],
             description=parsed_task_data.get('description', ''),
             deadline=parsed_task_data['deadline'], # Already timezone-aware from parse_voice_command
@@ -172,14 +267,17 @@ def process_voice_command_api(request):
             estimated_duration=duration
         )
         
-        user_history_qs = Task.objects.filter(status__in=['success', 'failure'])
+        user_history_qs = owned_tasks(request).filter(status__in=['success', 'failure'])
         task.risk_score = calculate_completion_probability(task, user_history_qs)
         
         task.save()
+        offsets = parse_offsets(None)
+        set_reminders([task], offsets)
         
         return JsonResponse({
             'success': True,
-            'task': task.to_dict(),
+            'task': dict(task.to_dict(), reminders=[int(offset.total_seconds() // 60) for offset in offsets]),
+            'duplicates': duplicates_payload(duplicates),
             'parsed_command': parsed_task_data, # Send back what was parsed
             'original_command': command
         }, status=201)
@@ -192,31 +290,150 @@ def process_voice_command_api(request):
 @require_http_methods(["GET"])
 def get_analytics_api(request):
     try:
-        patterns = analyze_user_patterns()
-        
-        high_risk_tasks_qs = Task.objects.filter(
-            status='ongoing',
-            risk_score__gte=0.7 # Django ORM syntax for >=
-        )
-        
-        analytics = {
-            'user_patterns': patterns,
-            'high_risk_tasks': [task.to_dict() for task in high_risk_tasks_qs],
-            'total_high_risk': high_risk_tasks_qs.count(),
-            'risk_distribution': {
-                'high': Task.objects.filter(status='ongoing', risk_score__gte=0.7).count(),
-                'medium': Task.objects.filter(status='ongoing', risk_score__gte=0.4, risk_score__lt=0.7).count(),
-                'low': Task.objects.filter(status='ongoing', risk_score__lt=0.4).count()
-            }
-        }
-        return JsonResponse(analytics)
+        now = timezone.now()
+        fmt = response_format(request)
+        high_risk_tasks = list(owned_tasks(request).filter(status='ongoing', risk_score__gte=HIGH_RISK_THRESHOLD))
+        response = build_analytics(request, high_risk_tasks, fmt, now)
+        if fmt != JSON:
+            response['compact'] = compact_header(now)
+        return wire_render(response, fmt)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
+@require_http_methods(["GET"])
+@conditional_page
+@cache_control(no_cache=True)
+@vary_on_headers('Authorization', 'Accept')
+def dashboard_api(request):
+    """
+    Task buckets, analytics and high-risk list in one response for the frontend's
+    mount and 30-second poll.
+
+    Ongoing tasks are read once and serialized against a single `now`. The ETag
+    lets an unchanged poll end in 304 Not Modified; no-cache makes the browser
+    revalidate every time instead of reusing a stale copy. Clients can ask
+    for compact task lists with the Accept header (see wire.py).
+    """
+    now = timezone.now()
+    fmt = response_format(request)
+    tasks_qs = owned_tasks(request)
+    expire_overdue_tasks(tasks_qs, now)
+    try:
+        limit = get_page_size(request.GET.get('limit'))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    response = {'next_cursors': {}}
+    pages = {}
+    for status, _ in Task.STATUS_CHOICES:
+        pages[status], next_cursor = paginate_by_deadline(tasks_qs.filter(status=status), limit=limit)
+        response[status] = encode_tasks(pages[status], fmt, now)
+        response['next_cursors'][status] = next_cursor
+
+    # High-risk tasks on the first ongoing page are already loaded; only the ones past it are queried
+    high_risk_tasks = [task for task in pages['ongoing'] if task.risk_score >= HIGH_RISK_THRESHOLD]
+    ongoing_cursor = response['next_cursors']['ongoing']
+    if ongoing_cursor:
+        rest = after_cursor(tasks_qs.filter(status='ongoing', risk_score__gte=HIGH_RISK_THRESHOLD), ongoing_cursor)
+        high_risk_tasks += list(rest.order_by('deadline', 'id'))
+
+    # The full analysis needs numpy and the columnar store; /api/analytics serves it
+    response['analytics'] = build_analytics(request, high_risk_tasks, fmt, now, patterns=analyze_patterns_from_db)
+    if fmt != JSON:
+        response['compact'] = compact_header(now)
+    return wire_render(response, fmt)
+
+@require_http_methods(["GET"])
+def plan_api(request):
+    """
+    Earliest-deadline-first plan of the ongoing tasks over the user's working hours.
+    Query parameters: hours (per day), start (hour the working day starts), tz, limit.
+    """
+    try:
+        options = parse_plan_options(request.GET)
+    except InvalidPlanOptions as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(get_plan(get_owner_id(request), **options))
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def recurring_list_create_api(request):
+    """
+    GET lists the recurring tasks. POST creates one from title, description,
+    rule (RRULE subset, e.g. "FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20271231"), start
+    (deadline of the first occurrence) and timezone.
+    """
+    owner_id = get_owner_id(request)
+    if request.method == 'GET':
+        return JsonResponse({'recurring': [series.to_dict() for series in RecurringTask.objects.filter(owner_id=owner_id)]})
+
+    try:
+        series = build_series(owner_id, json.loads(request.body))
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except InvalidRecurrence as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    series.save()
+    # The first occurrences show up right away instead of on the next job run
+    user_history_qs = owned_tasks(request).filter(status__in=['success', 'failure'])
+    materialize_series(series, timezone.now(), history_counts=get_history_counts(user_history_qs, owner_id))
+    return JsonResponse(series.to_dict(), status=201)
+
+@csrf_exempt
+@require_http_methods(["GET", "DELETE"])
+def recurring_detail_api(request, series_id):
+    series = get_object_or_404(RecurringTask.objects.filter(owner_id=get_owner_id(request)), id=series_id)
+    if request.method == 'GET':
+        return JsonResponse(series.to_dict())
+    # Finished occurrences stay as history; the upcoming ones go with the series
+    series.occurrences.filter(status='ongoing').delete()
+    series.delete()
+    return HttpResponse(status=204)
+
+@require_http_methods(["GET"])
+def calendar_api(request):
+    """
+    Tasks due between the start and end query parameters (a week from now by
+    default), including upcoming occurrences of recurring tasks that are not
+    materialized yet (`virtual: true`, no id).
+    """
+    now = timezone.now()
+    try:
+        start, end = parse_calendar_range(request.GET, now)
+    except InvalidRecurrence as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'entries': calendar_entries(owned_tasks(request), get_owner_id(request), start, end, now),
+    })
+
+def build_analytics(request, high_risk_tasks, fmt=JSON, now=None, patterns=analyze_user_patterns):
+    """Analytics payload shared by /api/analytics and /api/dashboard"""
+    return {
+        'user_patterns': patterns(get_owner_id(request)),
+        'high_risk_tasks': encode_tasks(high_risk_tasks, fmt, now),
+        'total_high_risk': len(high_risk_tasks),
+        # One pass over the ongoing tasks for all three risk bands
+        'risk_distribution': owned_tasks(request).filter(status='ongoing').aggregate(
+            high=Count('id', filter=Q(risk_score__gte=HIGH_RISK_THRESHOLD)),
+            medium=Count('id', filter=Q(risk_score__gte=0.4, risk_score__lt=HIGH_RISK_THRESHOLD)),
+            low=Count('id', filter=Q(risk_score__lt=0.4)),
+        ),
+    }
+
+def expire_overdue_tasks(tasks_qs, now):
+    """Auto-transition any expired ongoing tasks in `tasks_qs` to ‘failure’ before fetching"""
+    with unpinned_writes():
+        expired = expire_overdue(tasks_qs, now)
+    if expired:
+        # A replica may not have the expiries yet; the buckets read next must show them
+        read_from_primary()
+
 @csrf_exempt # Use with caution
 @require_http_methods(["POST"]) # Changed to POST as it modifies data
 def complete_task_api(request, task_id):
-    task = get_object_or_404(Task, id=task_id)
+    task = get_object_or_404(owned_tasks(request), id=task_id)
     
     if task.status == 'ongoing':
         now = timezone.now()
@@ -227,6 +444,7 @@ def complete_task_api(request, task_id):
         
         # updated_at is handled by auto_now=True
         task.save()
+        learn_from_task(task)
     
     return JsonResponse(task.to_dict())
 
@@ -237,14 +455,14 @@ def smart_voice_process_api(request):
     try:
         data = json.loads(request.body)
         voice_text = data.get('voiceText', '')
-        logger.debug(f"smart_voice_process_api called with voiceText={voice_text}")
+        logger.debug("smart_voice_process_api called with voiceText=%s", voice_text)
         
         if not voice_text:
             return JsonResponse({'success': False, 'error': 'Voice text is required'}, status=400)
         
         # Process the voice input with Gemini
         gemini_result = process_with_gemini(voice_text)
-        logger.debug(f"Gemini result: {gemini_result}")
+        logger.debug("Gemini result: %s", gemini_result)
         
         if not gemini_result['success']:
             return JsonResponse({
@@ -253,15 +471,21 @@ def smart_voice_process_api(request):
                 'original_input': voice_text
             }, status=500)
             
+        # Nothing is created yet; the duplicates let the client warn before it posts the task
+        task_data = gemini_result['task_data']
+        duplicates = find_duplicates(task_data.get('title') or '', task_data.get('description') or '', get_owner_id(request))
+
         # Return the structured task data
         return JsonResponse({
             'success': True,
-            'task_data': gemini_result['task_data'],
-            'original_input': voice_text
+            'task_data': task_data,
+            'duplicates': duplicates_payload(duplicates),
+            'original_input': voice_text,
+            'shed': gemini_result.get('shed', False)
         })
         
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
     except Exception as e:
-        logger.error(f"Error in smart_voice_process_api: {str(e)}", exc_info=True)
+        logger.error("Error in smart_voice_process_api: %s", e, exc_info=True)
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
\ No newline at end of file
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+import time
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .admission import BATCH
+from .ai_features import parse_voice_command
+from .dedup import duplicates_payload, find_duplicates
+from .gemini_integration import process_with_gemini
+from .metrics import VOICE_STREAM_RESULT_HISTOGRAM, VOICE_STREAM_SPECULATION_COUNTER
+from .owners import InvalidCredentials, get_scope_owner_id
+
+logger = logging.getLogger('todo_app')
+
+VOICE_STREAM_PATH = '/ws/voice'
+MAX_TRANSCRIPT_LENGTH = 1000
+
+# Close codes in the 4000-4999 range reserved for applications
+CLOSE_INVALID_CREDENTIALS = 4001
+CLOSE_FORBIDDEN_ORIGIN = 4003
+CLOSE_NOT_FOUND = 4004
+
+# Gemini blocks on network I/O, so it runs on its own thread rather than the
+# shared sync thread that the ORM calls use
+run_gemini = sync_to_async(process_with_gemini, thread_sensitive=False)
+
+
+@sync_to_async
+def lookup_duplicates(task_data, owner_id):
+    return duplicates_payload(
+        find_duplicates(task_data.get('title') or '', task_data.get('description') or '', owner_id)
+    )
+
+
+def normalize_transcript(text):
+    return ' '.join(str(text).split())[:MAX_TRANSCRIPT_LENGTH]
+
+
+def preview_of(text):
+    """Local, regex-only parse of a partial transcript"""
+    parsed = parse_voice_command(text)
+    return {
+        'title': parsed['title'],
+        'description': parsed['description'],
+        # Whole seconds, so an unchanged relative deadline doesn't resend the preview
+        'deadline': parsed['deadline'].replace(microsecond=0).isoformat() if parsed['deadline'] else None,
+    }
+
+
+class VoiceSession:
+    """
+    One connection's utterances. Each partial transcript gets a local preview;
+    once the transcript has not changed for VOICE_STREAM_STABLE_MS, Gemini is
+    called speculatively, so by the time the final transcript arrives the
+    structured result is usually ready or in flight. A speculation whose text
+    no longer matches is discarded (the call itself still runs to completion).
+    """
+
+    def __init__(self, send_json, owner_id):
+        self.send_json = send_json
+        self.owner_id = owner_id
+        self.stable_seconds = getattr(settings, 'VOICE_STREAM_STABLE_MS', 600) / 1000
+        self.max_speculative_calls = getattr(settings, 'VOICE_STREAM_MAX_SPECULATIVE_CALLS', 3)
+        self.reset()
+
+    def reset(self):
+        self.text = ''
+        self.preview = None
+        self.timer = None
+        self.speculation = None  # (text, asyncio.Task running Gemini)
+        self.speculative_calls = 0
+
+    async def on_partial(self, text):
+        text = normalize_transcript(text)
+        if not text or text == self.text:
+            return
+        self.text = text
+        preview = preview_of(text)
+        if preview != self.preview:
+            self.preview = preview
+            await self.send_json({'type': 'preview', **preview})
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = asyncio.create_task(self.speculate_when_stable(text))
+
+    async def speculate_when_stable(self, text):
+        await asyncio.sleep(self.stable_seconds)
+        if text != self.text or self.speculative_calls >= self.max_speculative_calls:
+            return
+        if self.speculation is not None:
+            if self.speculation[0] == text:
+                return
+            self.drop_speculation()
+        self.speculative_calls += 1
+        self.speculation = (text, asyncio.create_task(run_gemini(text, priority=BATCH)))
+
+    def drop_speculation(self):
+        if self.speculation is not None:
+            VOICE_STREAM_SPECULATION_COUNTER.labels('miss').inc()
+            # Nobody awaits it any more; retrieve its exception so asyncio doesn't log it
+            self.speculation[1].add_done_callback(lambda task: task.cancelled() or task.exception())
+            self.speculation = None
+
+    async def on_final(self, text):
+        start = time.perf_counter()
+        text = normalize_transcript(text) or self.text
+        if self.timer is not None:
+            self.timer.cancel()
+        if not text:
+            await self.send_json({'type': 'result', 'success': False, 'error': 'Voice text is required'})
+            self.reset()
+            return
+
+        speculative = self.speculation is not None and self.speculation[0] == text
+        if speculative:
+            VOICE_STREAM_SPECULATION_COUNTER.labels('hit').inc()
+            pending = self.speculation[1]
+            self.speculation = None
+        else:
+            self.drop_speculation()
+            pending = run_gemini(text)
+
+        try:
+            result = await pending
+            if speculative and result.get('shed'):
+                # The speculation was shed to the local parser; now the user is waiting, so ask at interactive priority
+                speculative = False
+                result = await run_gemini(text)
+        except Exception as e:
+            logger.error("Error in voice stream: %s", e, exc_info=True)
+            result = {'success': False, 'error': str(e)}
+
+        message = {'type': 'result', 'success': result['success'], 'original_input': text, 'speculative': speculative}
+        if result['success']:
+            message['task_data'] = result['task_data']
+            message['shed'] = result.get('shed', False)
+            message['duplicates'] = await lookup_duplicates(result['task_data'], self.owner_id)
+        else:
+            message['error'] = result.get('error', 'Failed to process with Gemini')
+        await self.send_json(message)
+        VOICE_STREAM_RESULT_HISTOGRAM.labels(str(speculative).lower()).observe(time.perf_counter() - start)
+        self.reset()
+
+    def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.drop_speculation()
+
+
+def origin_allowed(scope):
+    """
+    The explicit CORS_ALLOWED_ORIGINS or the same host. The connection
+    carries the session cookie, so the allow-all CORS flag is deliberately
+    not honoured here. Clients without an Origin header are not browsers.
+    """
+    headers = dict(scope.get('headers', []))
+    origin = headers.get(b'origin', b'').decode('latin-1')
+    if not origin:
+        return True
+    host = headers.get(b'host', b'').decode('latin-1')
+    return origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', []) or urlsplit(origin).netloc == host
+
+
+async def voice_stream_app(scope, receive, send):
+    """
+    ASGI WebSocket endpoint at VOICE_STREAM_PATH.
+
+    The client sends {"type": "partial", "text": ...} while the user speaks and
+    {"type": "final", "text": ...} at the end of each utterance. The server
+    answers with {"type": "preview", "title", "description", "deadline"} when
+    the local parse changes, and one {"type": "result", ...} per final
+    transcript, shaped like the /api/smart-voice response.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if not origin_allowed(scope):
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN_ORIGIN})
+        return
+    try:
+        owner_id = await sync_to_async(get_scope_owner_id)(scope)
+    except InvalidCredentials:
+        await send({'type': 'websocket.close', 'code': CLOSE_INVALID_CREDENTIALS})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def send_json(data):
+        await send({'type': 'websocket.send', 'text': json.dumps(data, cls=DjangoJSONEncoder)})
+
+    session = VoiceSession(send_json, owner_id)
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] != 'websocket.receive':
+                continue
+            try:
+                data = json.loads(message.get('text') or message.get('bytes') or b'')
+                kind, text = data.get('type'), data.get('text', '')
+            except (ValueError, AttributeError):
+                await send_json({'type': 'error', 'error': 'Invalid JSON'})
+                continue
+            if kind == 'partial':
+                await session.on_partial(text)
+            elif kind == 'final':
+                await session.on_final(text)
+            else:
+                await send_json({'type': 'error', 'error': f'Unknown message type {kind!r}'})
+    finally:
+        session.close()
+
+
+async def websocket_router(scope, receive, send):
+    """Dispatches WebSocket connections by path; Django's ASGI handler only serves HTTP"""
+    if scope['path'] == VOICE_STREAM_PATH:
+        await voice_stream_app(scope, receive, send)
+        return
+    message = await receive()
+    if message['type'] == 'websocket.connect':
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
@@ -0,0 +1,126 @@
+import json
+
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import msgpack
+except ImportError:  # Optional: without it, clients asking for MessagePack get compact JSON
+    msgpack = None
+
+from .profiling import timed_span
+
+# Response formats, chosen from the Accept header (see response_format)
+JSON = 'json'
+COMPACT_JSON = 'compact'
+COMPACT_MSGPACK = 'msgpack'
+
+MEDIA_TYPES = {
+    COMPACT_JSON: 'application/vnd.todo.compact+json',
+    COMPACT_MSGPACK: 'application/vnd.todo.compact+msgpack',
+}
+
+# Bump when the column layout changes; the frontend decoder checks it
+COMPACT_VERSION = 1
+
+# Dictionary-encoded columns carry indexes into these lists
+STATUS_VALUES = ['ongoing', 'success', 'failure']
+RISK_LEVELS = ['low', 'medium', 'high', 'N/A']
+
+# to_dict() fields without time_remaining and completion_probability, which
+# the decoder derives from deadline, the response's `now` and risk_score
+TASK_COLUMNS = (
+    'id', 'title', 'description', 'deadline', 'status', 'created_at', 'updated_at',
+    'estimated_duration', 'complexity_score', 'risk_score', 'risk_level', 'series_id',
+)
+
+
+def accepted_values(header):
+    """Values listed in an Accept or Accept-Encoding header, without the ones refused with q=0"""
+    accepted = set()
+    for part in header.split(','):
+        value, *params = [piece.strip() for piece in part.split(';')]
+        try:
+            refused = any(param.startswith('q=') and float(param[2:]) == 0 for param in params)
+        except ValueError:
+            refused = False
+        if value and not refused:
+            accepted.add(value.lower())
+    return accepted
+
+
+def response_format(request):
+    """
+    The format the client accepts: MessagePack or JSON compact task lists when
+    the Accept header names their media type, the plain to_dict() JSON otherwise.
+    """
+    accepted = accepted_values(request.headers.get('Accept', ''))
+    if MEDIA_TYPES[COMPACT_MSGPACK] in accepted and msgpack is not None:
+        return COMPACT_MSGPACK
+    if MEDIA_TYPES[COMPACT_JSON] in accepted or MEDIA_TYPES[COMPACT_MSGPACK] in accepted:
+        return COMPACT_JSON
+    return JSON
+
+
+def epoch(instant):
+    return int(instant.timestamp()) if instant is not None else None
+
+
+@timed_span('serialize')
+def encode_tasks(tasks, fmt, now):
+    """
+    Tasks for a response: to_dict() rows in plain JSON, one array per column
+    otherwise. Key names then appear once per list instead of once per task,
+    timestamps are epoch seconds, and status and risk level are indexes into
+    the lists sent in compact_header().
+    """
+    if fmt == JSON:
+        return [task.to_dict(now) for task in tasks]
+    columns = {name: [] for name in TASK_COLUMNS}
+    for task in tasks:
+        columns['id'].append(str(task.id))
+        columns['title'].append(task.title)
+        columns['description'].append(task.description)
+        columns['deadline'].append(epoch(task.deadline))
+        columns['status'].append(STATUS_VALUES.index(task.status))
+        columns['created_at'].append(epoch(task.created_at))
+        columns['updated_at'].append(epoch(task.updated_at))
+        columns['estimated_duration'].append(task.estimated_duration)
+        columns['complexity_score'].append(task.complexity_score)
+        columns['risk_score'].append(round(task.risk_score, 4) if task.risk_score is not None else None)
+        columns['risk_level'].append(RISK_LEVELS.index(task.get_risk_level()))
+        columns['series_id'].append(str(task.series_id) if task.series_id else None)
+    return {'count': len(tasks), 'columns': columns}
+
+
+def compact_header(now):
+    """What the decoder needs besides the columns: the dictionaries and the server's now"""
+    return {'version': COMPACT_VERSION, 'now': epoch(now), 'status': STATUS_VALUES, 'risk_level': RISK_LEVELS}
+
+
+def render(data, fmt, status=200):
+    """Response in `fmt`; it varies on Accept, so caches and ETags keep the formats apart"""
+    if fmt == COMPACT_MSGPACK:
+        response = HttpResponse(msgpack.packb(data), content_type=MEDIA_TYPES[fmt], status=status)
+    elif fmt == COMPACT_JSON:
+        response = HttpResponse(json.dumps(data, separators=(',', ':')), content_type=MEDIA_TYPES[fmt], status=status)
+    else:
+        response = JsonResponse(data, status=status)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def decode_tasks(block, header):
+    """
+    Inverse of encode_tasks() for compact lists: to_dict()-shaped rows, with
+    timestamps left as epoch seconds and time_remaining left out. Mirrors the
+    frontend decoder; used by benchmark_wire.
+    """
+    columns = block['columns']
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    for row in rows:
+        row['status'] = header['status'][row['status']]
+        row['risk_level'] = header['risk_level'][row['risk_level']]
+        risk_score = row['risk_score']
+        row['completion_probability'] = round((1 - risk_score) * 100, 1) if risk_score is not None else None
+    return rows